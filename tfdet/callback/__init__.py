@@ -2,6 +2,12 @@ from .scheduler import (LearningRateScheduler, LearningRateSchedulerStep,
                         WarmUpLearningRateScheduler, LinearLearningRateScheduler, CosineLearningRateScheduler, 
                         WarmUpLinearLearningRateScheduler, WarmUpCosineLearningRateScheduler,
                         WarmUpLearningRateSchedulerStep, LinearLearningRateSchedulerStep, CosineLearningRateSchedulerStep, 
-                        WarmUpLinearLearningRateSchedulerStep, WarmUpCosineLearningRateSchedulerStep)
+                        WarmUpLinearLearningRateSchedulerStep, WarmUpCosineLearningRateSchedulerStep,
+                        LearningRateSchedule, LearningRateScheduleStep,
+                        WarmUpLearningRateSchedule, LinearLearningRateSchedule, CosineLearningRateSchedule,
+                        WarmUpLinearLearningRateSchedule, WarmUpCosineLearningRateSchedule,
+                        WarmUpLearningRateScheduleStep, LinearLearningRateScheduleStep, CosineLearningRateScheduleStep,
+                        WarmUpLinearLearningRateScheduleStep, WarmUpCosineLearningRateScheduleStep,
+                        get_schedule)
 from .metric import MeanAveragePrecision, CoCoMeanAveragePrecision, MeanIoU
 from .util import EMA
\ No newline at end of file
@@ -1,9 +1,65 @@
+import copy
+from collections import deque
+
 import tensorflow as tf
 import numpy as np
 
 from tfdet.core.metric import (MeanAveragePrecision as MeanAveragePrecisionMetric,
                                CoCoMeanAveragePrecision as CoCoMeanAveragePrecisionMetric,
                                MeanIoU as MeanIoUMetric)
+from tfdet.dataset.util import Executor
+
+def predict_detection(model, data, subset = None):
+    """
+    Generate (y_true, bbox_true, y_pred, bbox_pred) of numpy by batch.(subset > first N batches of data)
+    """
+    input_key = [inp.name for inp in model.inputs]
+    input_cnt = len(input_key)
+    if isinstance(data, tf.data.Dataset):
+        data = data.take(subset) if subset is not None else data
+    else:
+        data = [data]
+    for batch in data:
+        if not isinstance(batch, dict):
+            x = batch[:input_cnt]
+            y_true, bbox_true = list(batch[input_cnt:])[:2]
+        else:
+            x = [batch[k] for k in input_key if k in batch]
+            y_true, bbox_true = batch["y_true"], batch["bbox_true"]
+
+        y_pred, bbox_pred = model.predict(x, verbose = 0)[:2]
+        yield np.array(y_true), np.array(bbox_true), y_pred, bbox_pred
+        del batch, x, y_true, bbox_true, y_pred, bbox_pred
+
+def add_metric(metric, args):
+    metric = copy.deepcopy(metric)
+    metric.add(*args)
+    return metric
+
+def evaluate_metric(model, data, metric, executor = None, num_workers = 4, subset = None):
+    """
+    executor = None > predict and match batch by batch.
+    executor = "thread" or "process" > match in background workers while the next batch is predicted.(partial metrics are merged in batch order)
+    executor = Executor(reset metric, ...) > reuse the worker pool of executor.(not closed)
+    """
+    metric.reset()
+    if executor is None:
+        for args in predict_detection(model, data, subset = subset):
+            metric.add(*args)
+    else:
+        pool = executor if isinstance(executor, Executor) else Executor(copy.deepcopy(metric), executor, num_workers = num_workers, shared_memory = False)
+        try:
+            pending = deque()
+            for args in predict_detection(model, data, subset = subset):
+                pending.append(pool.apply_async(add_metric, args))
+                while 0 < len(pending) and (pool.num_workers * 2 < len(pending) or pending[0].ready()):
+                    metric.merge(pending.popleft().get())
+            while 0 < len(pending):
+                metric.merge(pending.popleft().get())
+        finally:
+            if pool is not executor:
+                pool.close()
+    return metric.evaluate()
 
 class MeanAveragePrecision(tf.keras.callbacks.Callback):
     """
@@ -12,8 +68,11 @@ class MeanAveragePrecision(tf.keras.callbacks.Callback):
     scale_range = [32, 96] > area_range = [[None, 32^2], [32^2, 96^2], [96^2, None]] # 0~32^2, 32^2~96^2, 96^2~INF
     scale_range = [None, 32, 96] > area_range = [[None, None], [None, 32^2], [32^2, 96^2], [96^2, None]] #0~INF, 0~32^2, 32^2~96^2, 96^2~INF
     scale_range = [32, None, 96] > area_range = [[None, 32^2], [32^2, None], [None, 96^2], [96^2, None]] #0~32^2, 32^2~INF, 0~96^2, 96^2~INF
+    num_bin = None > keep every prediction.(exact), num_bin = 1000 > per-class score histogram.(bounded memory for large validation set)
+    executor = None > serial, "thread" or "process" > match in background workers while the next batch is predicted.(worker pool is created once, reused by epochs and closed at the end of training)
+    interval = evaluate every N epochs, subset = evaluate on the first N batches of data.(data shouldn't be reshuffled for deterministic subset)
     """
-    def __init__(self, data, iou_threshold = 0.5, score_threshold = 0.05, scale_range = None, mode = "normal", e = 1e-12, postfix = False, label = None, dtype = np.float32, verbose = True, name = "mean_average_precision", **kwargs):
+    def __init__(self, data, iou_threshold = 0.5, score_threshold = 0.05, scale_range = None, mode = "normal", e = 1e-12, postfix = False, label = None, dtype = np.float32, num_bin = None, executor = None, num_workers = 4, interval = 1, subset = None, verbose = True, name = "mean_average_precision", **kwargs):
         super(MeanAveragePrecision, self).__init__(**kwargs)
         self.data = data
         self.iou_threshold = iou_threshold
@@ -24,37 +83,35 @@ class MeanAveragePrecision(tf.keras.callbacks.Callback):
         self.postfix = postfix
         self.label = label
         self.dtype = dtype
+        self.num_bin = num_bin
+        self.executor = executor
+        self.num_workers = num_workers
+        self.interval = interval
+        self.subset = subset
         self.verbose = verbose
         self.name = name
+        self.pool = None
         
-        self.metric = MeanAveragePrecisionMetric(iou_threshold = self.iou_threshold, score_threshold = self.score_threshold, scale_range = self.scale_range, mode = self.mode, e = self.e, postfix = self.postfix, label = self.label, dtype = self.dtype)
+        self.metric = MeanAveragePrecisionMetric(iou_threshold = self.iou_threshold, score_threshold = self.score_threshold, scale_range = self.scale_range, mode = self.mode, e = self.e, postfix = self.postfix, label = self.label, dtype = self.dtype, num_bin = self.num_bin)
     
     def evaluate(self):
-        self.metric.reset()
-        input_key = [inp.name for inp in self.model.inputs]
-        input_cnt = len(input_key)
-        iterator = iter(self.data if isinstance(self.data, tf.data.Dataset) else [self.data])
-        while True:
-            try:
-                data = next(iterator)
-                if not isinstance(data, dict):
-                    x = data[:input_cnt]
-                    y_true, bbox_true = list(data[input_cnt:])[:2]
-                else:
-                    x = [data[k] for k in input_key if k in data]
-                    y_true, bbox_true = data["y_true"], data["bbox_true"]
-
-                y_pred, bbox_pred = self.model.predict(x, verbose = 0)[:2]
-                self.metric.add(y_true, bbox_true, y_pred, bbox_pred)
-                del data, x, y_true, bbox_true, y_pred, bbox_pred
-            except StopIteration:
-                break
-        return self.metric.evaluate()
+        if self.executor is not None and self.pool is None: #worker pool is reused by epochs and closed by on_train_end.
+            self.metric.reset()
+            self.pool = Executor(copy.deepcopy(self.metric), self.executor, num_workers = self.num_workers, shared_memory = False)
+        return evaluate_metric(self.model, self.data, self.metric, executor = self.pool, subset = self.subset)
     
     def on_epoch_begin(self, epoch, logs = None):
         self.metric.reset()
     
+    def on_train_end(self, logs = None):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+    
     def on_epoch_end(self, epoch, logs = {}):
+        if (epoch + 1) % self.interval != 0:
+            return
+        
         if self.postfix:
             min_iou_threshold = str(np.min(self.iou_threshold)).replace("0.", ".")
             max_iou_threshold = str(np.max(self.iou_threshold)).replace("0.", ".")
@@ -94,8 +151,11 @@ class CoCoMeanAveragePrecision(tf.keras.callbacks.Callback):
     scale_range = [32, 96] > area_range = [[None, 32^2], [32^2, 96^2], [96^2, None]] # 0~32^2, 32^2~96^2, 96^2~INF
     scale_range = [None, 32, 96] > area_range = [[None, None], [None, 32^2], [32^2, 96^2], [96^2, None]] #0~INF, 0~32^2, 32^2~96^2, 96^2~INF
     scale_range = [32, None, 96] > area_range = [[None, 32^2], [32^2, None], [None, 96^2], [96^2, None]] #0~32^2, 32^2~INF, 0~96^2, 96^2~INF
+    num_bin = None > keep every prediction.(exact), num_bin = 1000 > per-class score histogram.(bounded memory for large validation set)
+    executor = None > serial, "thread" or "process" > match in background workers while the next batch is predicted.(worker pool is created once, reused by epochs and closed at the end of training)
+    interval = evaluate every N epochs, subset = evaluate on the first N batches of data.(data shouldn't be reshuffled for deterministic subset)
     """
-    def __init__(self, data, iou_threshold = [0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95], score_threshold = 0.05, scale_range = None, mode = "normal", e = 1e-12, postfix = False, label = None, dtype = np.float32, verbose = True, name = "mean_average_precision", **kwargs):
+    def __init__(self, data, iou_threshold = [0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95], score_threshold = 0.05, scale_range = None, mode = "normal", e = 1e-12, postfix = False, label = None, dtype = np.float32, num_bin = None, executor = None, num_workers = 4, interval = 1, subset = None, verbose = True, name = "mean_average_precision", **kwargs):
         super(CoCoMeanAveragePrecision, self).__init__(**kwargs)
         self.data = data
         self.iou_threshold = iou_threshold
@@ -106,37 +166,35 @@ class CoCoMeanAveragePrecision(tf.keras.callbacks.Callback):
         self.postfix = postfix
         self.label = label
         self.dtype = dtype
+        self.num_bin = num_bin
+        self.executor = executor
+        self.num_workers = num_workers
+        self.interval = interval
+        self.subset = subset
         self.verbose = verbose
         self.name = name
+        self.pool = None
         
-        self.metric = CoCoMeanAveragePrecisionMetric(iou_threshold = self.iou_threshold, score_threshold = self.score_threshold, scale_range = self.scale_range, mode = self.mode, e = self.e, postfix = self.postfix, label = self.label, dtype = self.dtype)
+        self.metric = CoCoMeanAveragePrecisionMetric(iou_threshold = self.iou_threshold, score_threshold = self.score_threshold, scale_range = self.scale_range, mode = self.mode, e = self.e, postfix = self.postfix, label = self.label, dtype = self.dtype, num_bin = self.num_bin)
     
     def evaluate(self):
-        self.metric.reset()
-        input_key = [inp.name for inp in self.model.inputs]
-        input_cnt = len(input_key)
-        iterator = iter(self.data if isinstance(self.data, tf.data.Dataset) else [self.data])
-        while True:
-            try:
-                data = next(iterator)
-                if not isinstance(data, dict):
-                    x = data[:input_cnt]
-                    y_true, bbox_true = list(data[input_cnt:])[:2]
-                else:
-                    x = [data[k] for k in input_key if k in data]
-                    y_true, bbox_true = data["y_true"], data["bbox_true"]
-
-                y_pred, bbox_pred = self.model.predict(x, verbose = 0)[:2]
-                self.metric.add(y_true, bbox_true, y_pred, bbox_pred)
-                del data, x, y_true, bbox_true, y_pred, bbox_pred
-            except StopIteration:
-                break
-        return self.metric.evaluate()
+        if self.executor is not None and self.pool is None: #worker pool is reused by epochs and closed by on_train_end.
+            self.metric.reset()
+            self.pool = Executor(copy.deepcopy(self.metric), self.executor, num_workers = self.num_workers, shared_memory = False)
+        return evaluate_metric(self.model, self.data, self.metric, executor = self.pool, subset = self.subset)
     
     def on_epoch_begin(self, epoch, logs = None):
         self.metric.reset()
     
+    def on_train_end(self, logs = None):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+    
     def on_epoch_end(self, epoch, logs = {}):
+        if (epoch + 1) % self.interval != 0:
+            return
+        
         if self.postfix:
             min_iou_threshold = str(np.min(self.iou_threshold)).replace("0.", ".")
             max_iou_threshold = str(np.max(self.iou_threshold)).replace("0.", ".")
@@ -1,3 +1,5 @@
+import inspect
+
 import tensorflow as tf
 import numpy as np
 
@@ -207,4 +209,215 @@ class WarmUpCosineLearningRateSchedulerStep(LearningRateSchedulerStep):
             w = self.decay_rate + (1 - self.decay_rate) * (0.5 * (1 + np.cos(np.pi * ((epoch - self.warm_up_epoch) % self.cycle) / self.cycle)))
             w2 = self.decay_rate + (1 - self.decay_rate) * (0.5 * (1 + np.cos(np.pi * (((epoch + 1) - self.warm_up_epoch) % self.cycle) / self.cycle)))
             w = np.interp(step, [0, total_step], [w, w2])
-        return learning_rate * w
\ No newline at end of file
+        return learning_rate * w
+
+def warm_up_weight(epoch, warm_up_epoch):
+    return (epoch + 1) / warm_up_epoch
+
+def warm_up_step_weight(epoch, step, total_step, warm_up_epoch):
+    return (epoch + tf.minimum((step + 1) / total_step, 1.)) / warm_up_epoch
+
+def linear_weight(epoch, cycle, decay_rate, learning_rate):
+    return (1 - tf.math.floormod(epoch, cycle) / (cycle - 1)) * (1. - learning_rate * decay_rate) + learning_rate * decay_rate
+
+def cosine_weight(epoch, cycle, decay_rate):
+    return decay_rate + (1 - decay_rate) * (0.5 * (1 + tf.cos(np.pi * tf.math.floormod(epoch, cycle) / cycle)))
+
+class LearningRateSchedule(tf.keras.optimizers.schedules.LearningRateSchedule):
+    """
+    In-graph version of LearningRateScheduler.(evaluated in optimizer step without get_value/set_value)
+    schedule = lambda current_epoch, init_learning_rate: new_learning_rate (by tf ops)
+    current_epoch = initial_epoch + optimizer.iterations // total_step
+    total_step = step count of an epoch
+    """
+    def __init__(self, learning_rate, total_step, schedule = None, initial_epoch = 0, name = "learning_rate"):
+        super(LearningRateSchedule, self).__init__()
+        self.learning_rate = learning_rate
+        self.total_step = total_step
+        if schedule is not None:
+            self.schedule = schedule
+        self.initial_epoch = initial_epoch
+        self.name = name
+    
+    def __call__(self, step):
+        with tf.name_scope(self.name):
+            epoch = tf.cast(self.initial_epoch + tf.cast(step, tf.int64) // self.total_step, tf.float32)
+            return tf.cast(self.schedule(epoch, tf.constant(self.learning_rate, dtype = tf.float32)), tf.float32)
+    
+    def get_config(self):
+        return {"learning_rate":self.learning_rate, "total_step":self.total_step, "initial_epoch":self.initial_epoch, "name":self.name}
+
+class LearningRateScheduleStep(tf.keras.optimizers.schedules.LearningRateSchedule):
+    """
+    In-graph version of LearningRateSchedulerStep.(evaluated in optimizer step without get_value/set_value)
+    schedule = lambda current_epoch, current_step, total_step, init_learning_rate: new_learning_rate (by tf ops)
+    current_epoch = initial_epoch + optimizer.iterations // total_step, current_step = optimizer.iterations % total_step
+    total_step = step count of an epoch
+    step = learning rate is updated by N step(init_learning_rate before first update)
+    """
+    def __init__(self, learning_rate, total_step, schedule = None, step = None, initial_epoch = 0, name = "learning_rate"):
+        super(LearningRateScheduleStep, self).__init__()
+        self.learning_rate = learning_rate
+        self.total_step = total_step
+        if schedule is not None:
+            self.schedule = schedule
+        self.step = step
+        self.initial_epoch = initial_epoch
+        self.name = name
+    
+    def __call__(self, step):
+        with tf.name_scope(self.name):
+            step = tf.cast(step, tf.int64)
+            learning_rate = tf.constant(self.learning_rate, dtype = tf.float32)
+            if self.step is not None:
+                step = (step + 1) // self.step * self.step - 1
+            epoch = tf.cast(self.initial_epoch + tf.maximum(step, 0) // self.total_step, tf.float32)
+            current_step = tf.cast(tf.math.floormod(tf.maximum(step, 0), self.total_step), tf.float32)
+            new_learning_rate = tf.cast(self.schedule(epoch, current_step, tf.constant(self.total_step, dtype = tf.float32), learning_rate), tf.float32)
+            return tf.where(step < 0, learning_rate, new_learning_rate)
+    
+    def get_config(self):
+        return {"learning_rate":self.learning_rate, "total_step":self.total_step, "step":self.step, "initial_epoch":self.initial_epoch, "name":self.name}
+
+class WarmUpLearningRateSchedule(LearningRateSchedule):
+    def __init__(self, learning_rate, total_step, epoch = 5, initial_epoch = 0, name = "learning_rate"):
+        super(WarmUpLearningRateSchedule, self).__init__(learning_rate, total_step, initial_epoch = initial_epoch, name = name)
+        self.epoch = epoch
+    
+    def schedule(self, epoch, learning_rate):
+        w = tf.where(epoch < self.epoch, warm_up_weight(epoch, self.epoch), 1.)
+        return learning_rate * w
+    
+    def get_config(self):
+        config = super(WarmUpLearningRateSchedule, self).get_config()
+        config["epoch"] = self.epoch
+        return config
+
+class LinearLearningRateSchedule(LearningRateSchedule):
+    def __init__(self, learning_rate, total_step, cycle, decay_rate = 1e-2, initial_epoch = 0, name = "learning_rate"):
+        super(LinearLearningRateSchedule, self).__init__(learning_rate, total_step, initial_epoch = initial_epoch, name = name)
+        self.cycle = cycle
+        self.decay_rate = decay_rate
+    
+    def schedule(self, epoch, learning_rate):
+        w = linear_weight(epoch, self.cycle, self.decay_rate, learning_rate)
+        return learning_rate * w
+    
+    def get_config(self):
+        config = super(LinearLearningRateSchedule, self).get_config()
+        config["cycle"] = self.cycle
+        config["decay_rate"] = self.decay_rate
+        return config
+
+class CosineLearningRateSchedule(LinearLearningRateSchedule):
+    def schedule(self, epoch, learning_rate):
+        w = cosine_weight(epoch, self.cycle, self.decay_rate)
+        return learning_rate * w
+
+class WarmUpLinearLearningRateSchedule(LinearLearningRateSchedule):
+    def __init__(self, learning_rate, total_step, cycle, decay_rate = 1e-2, warm_up_epoch = 5, initial_epoch = 0, name = "learning_rate"):
+        super(WarmUpLinearLearningRateSchedule, self).__init__(learning_rate, total_step, cycle, decay_rate = decay_rate, initial_epoch = initial_epoch, name = name)
+        self.warm_up_epoch = warm_up_epoch
+    
+    def schedule(self, epoch, learning_rate):
+        w = tf.where(epoch < self.warm_up_epoch, warm_up_weight(epoch, self.warm_up_epoch), linear_weight((epoch + 1) - self.warm_up_epoch, self.cycle, self.decay_rate, learning_rate))
+        return learning_rate * w
+    
+    def get_config(self):
+        config = super(WarmUpLinearLearningRateSchedule, self).get_config()
+        config["warm_up_epoch"] = self.warm_up_epoch
+        return config
+
+class WarmUpCosineLearningRateSchedule(WarmUpLinearLearningRateSchedule):
+    def schedule(self, epoch, learning_rate):
+        w = tf.where(epoch < self.warm_up_epoch, warm_up_weight(epoch, self.warm_up_epoch), cosine_weight((epoch + 1) - self.warm_up_epoch, self.cycle, self.decay_rate))
+        return learning_rate * w
+
+class WarmUpLearningRateScheduleStep(LearningRateScheduleStep):
+    def __init__(self, learning_rate, total_step, epoch = 5, step = None, initial_epoch = 0, name = "learning_rate"):
+        super(WarmUpLearningRateScheduleStep, self).__init__(learning_rate, total_step, step = step, initial_epoch = initial_epoch, name = name)
+        self.epoch = epoch
+    
+    def schedule(self, epoch, step, total_step, learning_rate):
+        w = tf.where(epoch < self.epoch, warm_up_step_weight(epoch, step, total_step, self.epoch), 1.)
+        return learning_rate * w
+    
+    def get_config(self):
+        config = super(WarmUpLearningRateScheduleStep, self).get_config()
+        config["epoch"] = self.epoch
+        return config
+
+class LinearLearningRateScheduleStep(LearningRateScheduleStep):
+    def __init__(self, learning_rate, total_step, cycle, decay_rate = 1e-2, step = None, initial_epoch = 0, name = "learning_rate"):
+        super(LinearLearningRateScheduleStep, self).__init__(learning_rate, total_step, step = step, initial_epoch = initial_epoch, name = name)
+        self.cycle = cycle
+        self.decay_rate = decay_rate
+    
+    def weight(self, epoch, learning_rate):
+        return linear_weight(epoch, self.cycle, self.decay_rate, learning_rate)
+    
+    def schedule(self, epoch, step, total_step, learning_rate):
+        w = self.weight(epoch, learning_rate)
+        w2 = self.weight(epoch + 1, learning_rate)
+        w = w + (w2 - w) * step / total_step
+        return learning_rate * w
+    
+    def get_config(self):
+        config = super(LinearLearningRateScheduleStep, self).get_config()
+        config["cycle"] = self.cycle
+        config["decay_rate"] = self.decay_rate
+        return config
+
+class CosineLearningRateScheduleStep(LinearLearningRateScheduleStep):
+    def weight(self, epoch, learning_rate):
+        return cosine_weight(epoch, self.cycle, self.decay_rate)
+
+class WarmUpLinearLearningRateScheduleStep(LinearLearningRateScheduleStep):
+    def __init__(self, learning_rate, total_step, cycle, decay_rate = 1e-2, warm_up_epoch = 5, step = None, initial_epoch = 0, name = "learning_rate"):
+        super(WarmUpLinearLearningRateScheduleStep, self).__init__(learning_rate, total_step, cycle, decay_rate = decay_rate, step = step, initial_epoch = initial_epoch, name = name)
+        self.warm_up_epoch = warm_up_epoch
+    
+    def schedule(self, epoch, step, total_step, learning_rate):
+        w = self.weight(epoch - self.warm_up_epoch, learning_rate)
+        w2 = self.weight((epoch + 1) - self.warm_up_epoch, learning_rate)
+        w = tf.where(epoch < self.warm_up_epoch, warm_up_step_weight(epoch, step, total_step, self.warm_up_epoch), w + (w2 - w) * step / total_step)
+        return learning_rate * w
+    
+    def get_config(self):
+        config = super(WarmUpLinearLearningRateScheduleStep, self).get_config()
+        config["warm_up_epoch"] = self.warm_up_epoch
+        return config
+
+class WarmUpCosineLearningRateScheduleStep(WarmUpLinearLearningRateScheduleStep):
+    def weight(self, epoch, learning_rate):
+        return cosine_weight(epoch, self.cycle, self.decay_rate)
+
+SCHEDULE = {WarmUpLearningRateScheduler:WarmUpLearningRateSchedule,
+            LinearLearningRateScheduler:LinearLearningRateSchedule,
+            CosineLearningRateScheduler:CosineLearningRateSchedule,
+            WarmUpLinearLearningRateScheduler:WarmUpLinearLearningRateSchedule,
+            WarmUpCosineLearningRateScheduler:WarmUpCosineLearningRateSchedule,
+            WarmUpLearningRateSchedulerStep:WarmUpLearningRateScheduleStep,
+            LinearLearningRateSchedulerStep:LinearLearningRateScheduleStep,
+            CosineLearningRateSchedulerStep:CosineLearningRateScheduleStep,
+            WarmUpLinearLearningRateSchedulerStep:WarmUpLinearLearningRateScheduleStep,
+            WarmUpCosineLearningRateSchedulerStep:WarmUpCosineLearningRateScheduleStep}
+
+def get_schedule(scheduler, learning_rate, total_step = None):
+    """
+    In-graph LearningRateSchedule from the arguments of scheduler callback.(use it as learning_rate of optimizer instead of the callback)
+    total_step = step count of an epoch #if None, total_step of scheduler
+    
+    <example>
+    > scheduler = WarmUpCosineLearningRateSchedulerStep(cycle = epoch, decay_rate = decay_rate, step = update_step, total_step = total_step, warm_up_epoch = warm_up_epoch)
+    > optimizer = tf.keras.optimizers.SGD(get_schedule(scheduler, learning_rate = 1e-2), momentum = 0.9)
+    > model.fit(...) #without scheduler callback
+    """
+    if type(scheduler) not in SCHEDULE:
+        raise ValueError("unknown scheduler '{0}'".format(type(scheduler).__name__))
+    total_step = total_step if total_step is not None else getattr(scheduler, "total_step", None)
+    if total_step is None:
+        raise ValueError("total_step is required for in-graph schedule")
+    schedule = SCHEDULE[type(scheduler)]
+    keys = [k for k in inspect.signature(schedule.__init__).parameters.keys() if k not in ["self", "learning_rate", "total_step"]]
+    return schedule(learning_rate, total_step, **{k:getattr(scheduler, k) for k in keys})
@@ -26,7 +26,6 @@ class EMA(tf.keras.callbacks.Callback):
         self.name = name
         
         self.ema = None
-        self.model = None
         self._step = step
         self.step_count = 0
         
@@ -1,6 +1,76 @@
+import functools
+import inspect
+from collections import OrderedDict
+
 import tensorflow as tf
 import numpy as np
 
+GRID_CACHE = OrderedDict()
+GRID_CACHE_SIZE = 64
+
+def get_static_shape(x):
+    """
+    (height, width) of feature, image or shape if it is static, else None.
+    """
+    rank = (x.shape.rank if isinstance(x.shape, tf.TensorShape) else len(x.shape)) if not isinstance(x, (tuple, list, np.ndarray)) and hasattr(x, "shape") else None
+    if rank is not None and 2 < rank:
+        shape = tuple(x.shape)[-3:-1]
+    else:
+        x = tf.get_static_value(x) if tf.is_tensor(x) else x
+        if x is None:
+            return None
+        shape = np.array(x)
+        shape = shape.shape[-3:-1] if 2 < np.ndim(shape) else tuple(shape[-3:-1] if 2 < len(shape) else shape)
+    return tuple([int(v) for v in shape]) if len(shape) == 2 and all([v is not None for v in shape]) else None
+
+def freeze(x):
+    if isinstance(x, tf.dtypes.DType):
+        return x.name
+    elif isinstance(x, (tuple, list, np.ndarray)):
+        return tuple([freeze(v) for v in x])
+    elif isinstance(x, np.generic):
+        return x.item()
+    elif x is None or isinstance(x, (bool, int, float, str)):
+        return x
+    raise TypeError("unhashable argument '{0}'".format(type(x).__name__))
+
+def cache_grid(function):
+    """
+    Memoize anchor(or point) grid by (feature shapes, image_shape, arguments) for static shape.
+    Cached grid is returned as constant, dynamic shape(or tensor argument) is generated on the fly.
+    """
+    signature = inspect.signature(function)
+    
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        arguments = signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        arguments = dict(arguments.arguments)
+        feature = arguments.pop("feature")
+        image_shape = arguments.pop("image_shape")
+        
+        single = tf.is_tensor(feature) or not isinstance(feature, list) or isinstance(feature[0], int)
+        feature_shape = [get_static_shape(x) for x in ([feature] if single else feature)]
+        static_image_shape = get_static_shape(image_shape)
+        try:
+            key = (function.__name__, single, tuple(feature_shape), static_image_shape, freeze(sorted(arguments.items())))
+        except TypeError:
+            key = None
+        if key is None or static_image_shape is None or any([shape is None for shape in feature_shape]):
+            return function(feature, image_shape, **arguments)
+        
+        if key in GRID_CACHE:
+            GRID_CACHE.move_to_end(key)
+        else:
+            with tf.init_scope():
+                out = function(list(feature_shape[0]) if single else [list(shape) for shape in feature_shape], list(static_image_shape), **arguments)
+                GRID_CACHE[key] = tf.nest.map_structure(lambda x: x.numpy(), out)
+            while GRID_CACHE_SIZE < len(GRID_CACHE):
+                GRID_CACHE.popitem(last = False)
+        return tf.nest.map_structure(tf.constant, GRID_CACHE[key])
+    return wrapper
+
+@cache_grid
 def generate_anchors(feature, image_shape = [1024, 1024], scale = [32, 64, 128, 256, 512], ratio = [0.5, 1, 2], normalize = True, auto_scale = True, flatten = True, concat = False, dtype = tf.float32):
     """
     feature = feature or [features] or shape or [shapes]
@@ -87,6 +157,7 @@ def generate_anchors(feature, image_shape = [1024, 1024], scale = [32, 64, 128,
         out = tf.concat(out, axis = 0)
     return out
     
+@cache_grid
 def generate_yolo_anchors(feature, image_shape = [608, 608], size = [[ 10, 13], [ 16,  30], [ 33,  23],
                                                                      [ 30, 61], [ 62,  45], [ 59, 119],
                                                                      [116, 90], [156, 198], [373, 326]],
@@ -166,6 +237,7 @@ def generate_yolo_anchors(feature, image_shape = [608, 608], size = [[ 10, 13],
         out = tf.concat(out, axis = 0)
     return out
 
+@cache_grid
 def generate_points(feature, image_shape = [1024, 1024], stride = None, normalize = True, flatten = True, concat = False, dtype = tf.float32):
     if tf.is_tensor(feature) or not isinstance(feature, list) or isinstance(feature[0], int):
         feature = [feature]
@@ -1,7 +1,8 @@
 from .atss import atss
 from .center_region import center_region
-from .max_iou import max_iou
+from .max_iou import max_iou, batched_max_iou
 from .ota import sim_ota, align_ota
-from .point import point
+from .point import point, batched_point
+from .util import get_batch_assign
 
 from .sampler import random_sampler
\ No newline at end of file
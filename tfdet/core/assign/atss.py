@@ -1,35 +1,51 @@
 import tensorflow as tf
 
-from ..bbox import overlap_bbox, isin
+from ..bbox import iou
 from ..ops import euclidean_matrix
 
-def atss(y_true, bbox_true, y_pred, bbox_pred, k = 9, threshold = 0.01, min_threshold = 0.0001, extra_length = None, mode = "normal"):
+def atss(y_true, bbox_true, y_pred, bbox_pred, k = 9, threshold = 0.01, min_threshold = 0.0001, extra_length = None, mode = "normal", level_count = None):
+    """
+    level_count = anchor count of each level #[num_anchors_1, ..., num_anchors_n], k candidates are selected by each level.(if None, k candidates of all anchors)
+    """
     #https://arxiv.org/abs/1912.02424
-    k = tf.minimum(k, tf.shape(bbox_pred)[0])
-    overlaps = overlap_bbox(bbox_true, bbox_pred, mode = mode) #(T, P)
+    true_count = tf.shape(bbox_true)[0]
+    pred_count = tf.shape(bbox_pred)[0]
     dist = euclidean_matrix(bbox_true, bbox_pred) #(T, P)
-    sort_indices = tf.argsort(dist, axis = -1) #(T, P)
-    candidate_indices = sort_indices[..., :k] #(T, K)
-    
-    candidate_overlaps = tf.gather(overlaps, candidate_indices, batch_dims = -1) #(T, K)
+    if level_count is None:
+        candidate_indices = tf.nn.top_k(-dist, tf.minimum(k, pred_count)).indices #(T, K)
+    else:
+        candidate_indices = []
+        offset = 0
+        for level_dist in tf.split(dist, level_count, axis = -1):
+            candidate_indices.append(tf.nn.top_k(-level_dist, tf.minimum(k, tf.shape(level_dist)[1])).indices + offset)
+            offset += tf.shape(level_dist)[1]
+        candidate_indices = tf.concat(candidate_indices, axis = -1) #(T, K * n_level)
+
+    candidate_bbox = tf.gather(bbox_pred, candidate_indices) #(T, K, 4)
+    candidate_overlaps = iou(tf.expand_dims(bbox_true, axis = 1), candidate_bbox, mode = mode)[..., 0] #(T, K)
     candidate_threshold = tf.reduce_mean(candidate_overlaps, axis = -1) + tf.math.reduce_std(candidate_overlaps, axis = -1)
     candidate_flag = tf.greater_equal(candidate_overlaps, tf.expand_dims(candidate_threshold, axis = -1))
-    
-    true_count = tf.shape(bbox_true)[0]
-    pred_count = tf.shape(bbox_pred)[0]
-    candidate_flag = tf.concat([candidate_flag, tf.zeros((true_count, pred_count - k), dtype = tf.bool)], axis = -1) #(T, K) + (T, P - K)
-    candidate_flag = tf.gather(candidate_flag, tf.argsort(sort_indices, axis = -1), batch_dims = -1) #(T, P)
-    
-    isin_flag = isin(bbox_true, bbox_pred, extra_length = extra_length, mode = "rect") #(T, P)
-    overlaps = tf.where(tf.logical_and(candidate_flag, isin_flag), overlaps, 0) #(T, P)
-    overlaps = tf.transpose(overlaps) #(P, T)
-    
+
+    #center of candidate in bbox_true(isin with mode = "rect")
+    tx1, ty1, tx2, ty2 = tf.split(tf.expand_dims(bbox_true, axis = 1), 4, axis = -1)
+    px1, py1, px2, py2 = tf.split(candidate_bbox, 4, axis = -1)
+    pcx, pcy = (px1 + px2) / 2, (py1 + py2) / 2
+    if extra_length is not None:
+        tcx, tcy = (tx1 + tx2) / 2, (ty1 + ty2) / 2
+        tx1, ty1, tx2, ty2 = tcx - extra_length, tcy - extra_length, tcx + extra_length, tcy + extra_length
+    isin_flag = tf.logical_and(tf.logical_and(tx1 < pcx, pcx < tx2), tf.logical_and(ty1 < pcy, pcy < ty2))[..., 0]
+    candidate_overlaps = tf.where(tf.logical_and(candidate_flag, isin_flag), candidate_overlaps, 0) #(T, K)
+
+    true_indices = tf.tile(tf.expand_dims(tf.range(true_count), axis = -1), [1, tf.shape(candidate_indices)[1]])
+    indices = tf.reshape(tf.stack([candidate_indices, true_indices], axis = -1), [-1, 2])
+    overlaps = tf.scatter_nd(indices, tf.reshape(candidate_overlaps, [-1]), [pred_count, true_count]) #(P, T)
+
     max_iou = tf.reduce_max(overlaps, axis = -1)
     match = tf.where(max(threshold, min_threshold) <= max_iou, 1, -1)
-    
+
     positive_indices = tf.where(match == 1)[:, 0]
     negative_indices = tf.where(match == -1)[:, 0]
-    
+
     positive_overlaps = tf.gather(overlaps, positive_indices)
     true_indices = tf.cond(tf.greater(tf.shape(positive_overlaps)[1], 0), true_fn = lambda: tf.argmax(positive_overlaps, axis = -1), false_fn = lambda: tf.cast(tf.constant([]), tf.int64))
-    return true_indices, positive_indices, negative_indices
\ No newline at end of file
+    return true_indices, positive_indices, negative_indices
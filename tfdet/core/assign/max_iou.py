@@ -1,9 +1,9 @@
 import tensorflow as tf
 
-from ..bbox import overlap_bbox
+from ..bbox import overlap_bbox, iou
 
-def max_iou(y_true, bbox_true, y_pred, bbox_pred, positive_threshold = 0.5, negative_threshold = 0.4, min_threshold = 0.0001, match_low_quality = True, mode = "normal"):
-    overlaps = overlap_bbox(bbox_pred, bbox_true, mode = mode) #(P, T)
+def max_iou(y_true, bbox_true, y_pred, bbox_pred, positive_threshold = 0.5, negative_threshold = 0.4, min_threshold = 0.0001, match_low_quality = True, mode = "normal", chunk_size = None):
+    overlaps = overlap_bbox(bbox_pred, bbox_true, mode = mode, chunk_size = chunk_size) #(P, T)
     max_iou = tf.reduce_max(overlaps, axis = -1)
 
     match = tf.where(max_iou < negative_threshold, -1, 0)
@@ -19,4 +19,30 @@ def max_iou(y_true, bbox_true, y_pred, bbox_pred, positive_threshold = 0.5, nega
     
     positive_overlaps = tf.gather(overlaps, positive_indices)
     true_indices = tf.cond(tf.greater(tf.shape(positive_overlaps)[1], 0), true_fn = lambda: tf.argmax(positive_overlaps, axis = -1), false_fn = lambda: tf.cast(tf.constant([]), tf.int64))
-    return true_indices, positive_indices, negative_indices
\ No newline at end of file
+    return true_indices, positive_indices, negative_indices
+
+def batched_max_iou(y_true, bbox_true, y_pred, bbox_pred, positive_threshold = 0.5, negative_threshold = 0.4, min_threshold = 0.0001, match_low_quality = True, mode = "normal"):
+    """
+    max_iou for padded batch.(bbox_true of zeros is ignored)
+    
+    y_true = label #(N, padded_num_true, 1 or num_class)
+    bbox_true = [[x1, y1, x2, y2], ...] #(N, padded_num_true, 4)
+    y_pred = classifier logit #(N, num_anchors, num_class)
+    bbox_pred = [[x1, y1, x2, y2], ...] #(num_anchors, 4) or (N, num_anchors, 4)
+    
+    match = -1 : negative / 0 : neutral / 1 : positive #(N, num_anchors)
+    true_indices = index of matched bbox_true #(N, num_anchors)
+    """
+    bbox_true = tf.where(tf.reduce_any(tf.greater(bbox_true, 0), axis = -1, keepdims = True), bbox_true, 0) #iou of zeros is 0.
+    overlaps = iou(tf.expand_dims(bbox_true, axis = -2), tf.expand_dims(bbox_pred, axis = -3), mode = mode)[..., 0] #(N, T, P)
+    max_iou = tf.reduce_max(overlaps, axis = -2)
+    
+    match = tf.where(max_iou < negative_threshold, -1, 0)
+    match = tf.where(max(positive_threshold, min_threshold) <= max_iou, 1, match)
+    if match_low_quality:
+        max_gt_iou = tf.reduce_max(overlaps, axis = -1, keepdims = True)
+        max_gt_iou = tf.where(min_threshold <= max_gt_iou, max_gt_iou, -1)
+        low_match = tf.reduce_any(overlaps == max_gt_iou, axis = -2)
+        match = tf.where(low_match, 1, match)
+    true_indices = tf.argmax(overlaps, axis = -2)
+    return match, true_indices
@@ -4,32 +4,27 @@ from ..bbox import overlap_bbox, isin
 from ..loss import binary_cross_entropy
 
 def dynamic_k_match(cost_matrix, iou_matrix, k = 10, batch_size = 10):
-    num_true = tf.keras.backend.int_shape(cost_matrix)[1] if tf.keras.backend.int_shape(cost_matrix)[1] is not None else tf.shape(cost_matrix)[1]
-    match_matrix = tf.zeros_like(cost_matrix, dtype = tf.int32)
-    top_iou = tf.transpose(tf.nn.top_k(tf.transpose(iou_matrix), k = tf.minimum(k, tf.shape(cost_matrix)[0])).values)
-    dynamic_k = tf.cast(tf.maximum(tf.round(tf.reduce_sum(top_iou, axis = 0)), 1), tf.int32)
-    negativ_cost_matrix = tf.negative(cost_matrix)
-    if num_true != 0:
-        def calculate(index, match_matrix):
-            pos_indices = tf.nn.top_k(negativ_cost_matrix[:, index], k = dynamic_k[index]).indices
-            pos_indices = tf.stack([pos_indices, tf.fill([tf.shape(pos_indices)[0]], index)], axis = 1)
-            return tf.tensor_scatter_nd_update(match_matrix, pos_indices, tf.ones(tf.shape(pos_indices)[0], dtype = match_matrix.dtype))
-        match_matrix = tf.while_loop(lambda index, match_matrix: index < num_true,
-                                     lambda index, match_matrix: (index + 1, calculate(index, match_matrix)),
-                                     (0, match_matrix),
-                                     parallel_iterations = batch_size)[1]
-
-        prior_match_flag = tf.greater(tf.reduce_sum(match_matrix, axis = 1), 1)
-        if tf.greater(tf.reduce_sum(tf.cast(prior_match_flag, tf.int32)), 0):
-            min_cost = tf.reduce_min(cost_matrix, axis = 1)
-            min_cost = tf.where(prior_match_flag, min_cost, min_cost - 1)
-            prior_match_flag = tf.tile(tf.expand_dims(prior_match_flag, axis = -1), [1, num_true])
-            cost_flag = tf.equal(cost_matrix, tf.expand_dims(min_cost, axis = 1))
-            match_matrix = tf.where(prior_match_flag, 0, match_matrix)
-            match_matrix = tf.where(cost_flag, 1, match_matrix)
-    return tf.cast(match_matrix, tf.bool)
+    """
+    cost_matrix, iou_matrix = (P, T)
+    batch_size = not used.(candidates of all true are selected by a top_k and masked by dynamic k rank)
+    """
+    pred_count = tf.shape(cost_matrix)[0]
+    true_count = tf.shape(cost_matrix)[1]
+    k = tf.minimum(k, pred_count)
+    top_iou = tf.nn.top_k(tf.transpose(iou_matrix), k = k).values #(T, K)
+    dynamic_k = tf.cast(tf.maximum(tf.round(tf.reduce_sum(top_iou, axis = -1)), 1), tf.int32) #(T,)
+    
+    pos_indices = tf.nn.top_k(tf.negative(tf.transpose(cost_matrix)), k = k).indices #(T, K)
+    rank_flag = tf.less(tf.expand_dims(tf.range(k), axis = 0), tf.expand_dims(dynamic_k, axis = -1)) #(T, K)
+    true_indices = tf.tile(tf.expand_dims(tf.range(true_count), axis = -1), [1, k])
+    indices = tf.reshape(tf.stack([pos_indices, true_indices], axis = -1), [-1, 2])
+    match_matrix = tf.scatter_nd(indices, tf.reshape(tf.cast(rank_flag, tf.int32), [-1]), [pred_count, true_count]) #(P, T)
+    
+    prior_match_flag = tf.greater(tf.reduce_sum(match_matrix, axis = 1, keepdims = True), 1) #(P, 1)
+    cost_flag = tf.equal(cost_matrix, tf.reduce_min(cost_matrix, axis = 1, keepdims = True))
+    return tf.where(prior_match_flag, cost_flag, tf.greater(match_matrix, 0))
 
-def sim_ota(y_true, bbox_true, y_pred, bbox_pred, extra_length = None, k = 10, iou_weight = 3., class_weight = 1., cross_entropy = binary_cross_entropy, batch_size = 10, mode = "normal"):
+def sim_ota(y_true, bbox_true, y_pred, bbox_pred, extra_length = None, k = 10, iou_weight = 3., class_weight = 1., cross_entropy = binary_cross_entropy, batch_size = 10, mode = "normal", chunk_size = None):
     """
     https://github.com/Megvii-BaseDetection/YOLOX
     
@@ -51,16 +46,15 @@ def sim_ota(y_true, bbox_true, y_pred, bbox_pred, extra_length = None, k = 10, i
         bbox_pred = tf.gather(bbox_pred, valid_indices)
         valid_isin_flag = tf.gather(isin_flag, valid_indices)
 
-        overlaps = overlap_bbox(bbox_pred, bbox_true, mode = mode) #(P, T)
+        overlaps = overlap_bbox(bbox_pred, bbox_true, mode = mode, chunk_size = chunk_size) #(P, T)
         iou_cost = tf.negative(overlaps + tf.keras.backend.epsilon())
 
-        true_count = tf.shape(y_true)[0]
-        pred_count = tf.shape(y_pred)[0]
-        y_true = tf.reshape(tf.tile(y_true, [pred_count, 1]), [pred_count, true_count, -1])
-        y_pred = tf.reshape(tf.tile(y_pred, [1, true_count]), [pred_count, true_count, -1])
-
-        class_cost = cross_entropy(y_true, tf.sqrt(y_pred), reduce = False)
-        class_cost = tf.reduce_sum(class_cost, axis = -1)
+        #class_cost[p, t] = sum(ce(0, y_pred[p])) + sum(y_true[t] * (ce(1, y_pred[p]) - ce(0, y_pred[p]))), without (P, T, C) tile.
+        y_true = tf.cast(tf.cond(tf.logical_and(tf.equal(tf.shape(y_true)[-1], 1), tf.not_equal(tf.shape(y_pred)[-1], 1)), true_fn = lambda: tf.one_hot(tf.cast(y_true, tf.int32), tf.shape(y_pred)[-1])[:, 0], false_fn = lambda: y_true), y_pred.dtype)
+        y_pred = tf.sqrt(y_pred)
+        negative_cost = cross_entropy(tf.zeros_like(y_pred), y_pred, reduce = False) #(P, C)
+        positive_cost = cross_entropy(tf.ones_like(y_pred), y_pred, reduce = False) #(P, C)
+        class_cost = tf.reduce_sum(negative_cost, axis = -1, keepdims = True) + tf.matmul(positive_cost - negative_cost, y_true, transpose_b = True) #(P, T)
 
         inf = 100000.
         cost_matrix = class_cost * class_weight + iou_cost * iou_weight + tf.cast(tf.logical_not(valid_isin_flag), tf.float32) * inf
@@ -80,7 +74,7 @@ def sim_ota(y_true, bbox_true, y_pred, bbox_pred, extra_length = None, k = 10, i
         negative_indices = tf.where(tf.logical_not(valid_flag))[:, 0]
     return true_indices, positive_indices, negative_indices
 
-def align_ota(y_true, bbox_true, y_pred, bbox_pred, extra_length = None, k = 10, iou_weight = 3., class_weight = 1., cross_entropy = binary_cross_entropy, batch_size = 10, mode = "normal"):
+def align_ota(y_true, bbox_true, y_pred, bbox_pred, extra_length = None, k = 10, iou_weight = 3., class_weight = 1., cross_entropy = binary_cross_entropy, batch_size = 10, mode = "normal", chunk_size = None):
     """
     https://github.com/tinyvision/DAMO-YOLO
     
@@ -102,21 +96,15 @@ def align_ota(y_true, bbox_true, y_pred, bbox_pred, extra_length = None, k = 10,
         bbox_pred = tf.gather(bbox_pred, valid_indices)
         valid_isin_flag = tf.gather(isin_flag, valid_indices)
 
-        overlaps = overlap_bbox(bbox_pred, bbox_true, mode = mode) #(P, T)
+        overlaps = overlap_bbox(bbox_pred, bbox_true, mode = mode, chunk_size = chunk_size) #(P, T)
         iou_cost = tf.negative(overlaps + tf.keras.backend.epsilon())
 
-        true_count = tf.shape(y_true)[0]
-        pred_count = tf.shape(y_pred)[0]
+        #soft_y_true[p, t] = y_true[t] * overlaps[p, t], so only the class of true differs from cost of background(soft_y_true = 0).(without (P, T, C) tile)
         y_true = tf.cast(tf.cond(tf.equal(tf.shape(y_true)[-1], 1), true_fn = lambda: tf.one_hot(tf.cast(y_true, tf.int32), tf.shape(y_pred)[-1])[:, 0], false_fn = lambda: y_true), y_pred.dtype)
-        y_true = tf.reshape(tf.tile(y_true, [pred_count, 1]), [pred_count, true_count, -1])
-        y_pred = tf.reshape(tf.tile(y_pred, [1, true_count]), [pred_count, true_count, -1])
-        
-        soft_y_true = y_true * tf.expand_dims(overlaps, axis = -1)
-        scale_factor = soft_y_true - y_pred
-
-        class_cost = cross_entropy(soft_y_true, y_pred, reduce = False)
-        class_cost = class_cost * tf.pow(tf.abs(scale_factor), 2)
-        class_cost = tf.reduce_sum(class_cost, axis = -1)
+        negative_cost = cross_entropy(tf.zeros_like(y_pred), y_pred, reduce = False) * tf.pow(y_pred, 2) #(P, C)
+        true_y_pred = tf.matmul(y_pred, y_true, transpose_b = True) #(P, T)
+        positive_cost = cross_entropy(tf.expand_dims(overlaps, axis = -1), tf.expand_dims(true_y_pred, axis = -1), reduce = False)[..., 0] * tf.pow(overlaps - true_y_pred, 2) * tf.reduce_sum(y_true, axis = -1) #(P, T)
+        class_cost = tf.reduce_sum(negative_cost, axis = -1, keepdims = True) - tf.matmul(negative_cost, y_true, transpose_b = True) + positive_cost #(P, T)
 
         inf = 100000.
         cost_matrix = class_cost * class_weight + iou_cost * iou_weight + tf.cast(tf.logical_not(valid_isin_flag), tf.float32) * inf
@@ -2,8 +2,8 @@ import tensorflow as tf
 
 from ..bbox import overlap_point
 
-def point(y_true, bbox_true, y_pred, point_pred, regress_range = None, threshold = 0.0001, min_threshold = 0.0001):
-    overlaps = tf.transpose(overlap_point(bbox_true, point_pred, regress_range)) #(P, T)
+def point(y_true, bbox_true, y_pred, point_pred, regress_range = None, threshold = 0.0001, min_threshold = 0.0001, chunk_size = None):
+    overlaps = tf.transpose(overlap_point(bbox_true, point_pred, regress_range, chunk_size = chunk_size)) #(P, T)
     max_area = tf.reduce_max(overlaps, axis = -1)
     match = tf.where(max(threshold, min_threshold) <= max_area, 1, -1)
     
@@ -12,4 +12,37 @@ def point(y_true, bbox_true, y_pred, point_pred, regress_range = None, threshold
     
     positive_overlaps = tf.gather(overlaps, positive_indices)
     true_indices = tf.cond(tf.greater(tf.shape(positive_overlaps)[1], 0), true_fn = lambda: tf.argmax(positive_overlaps, axis = -1), false_fn = lambda: tf.cast(tf.constant([]), tf.int64))
-    return true_indices, positive_indices, negative_indices
\ No newline at end of file
+    return true_indices, positive_indices, negative_indices
+
+def batched_point(y_true, bbox_true, y_pred, point_pred, regress_range = None, threshold = 0.0001, min_threshold = 0.0001):
+    """
+    point for padded batch.(bbox_true of zeros is ignored)
+    
+    y_true = label #(N, padded_num_true, 1 or num_class)
+    bbox_true = [[x1, y1, x2, y2], ...] #(N, padded_num_true, 4)
+    y_pred = classifier logit #(N, num_points, num_class)
+    point_pred = [[x, y], ...] #(num_points, 2) or (N, num_points, 2)
+    regress_range = [[min, max], ...] #(num_points, 2) or (N, num_points, 2)
+    
+    match = -1 : negative / 1 : positive #(N, num_points)
+    true_indices = index of matched bbox_true #(N, num_points)
+    """
+    bbox_true = tf.where(tf.reduce_any(tf.greater(bbox_true, 0), axis = -1, keepdims = True), bbox_true, 0) #bbox of zeros doesn't contain point.
+    x1, y1, x2, y2 = tf.split(tf.expand_dims(bbox_true, axis = -2), 4, axis = -1) #(N, T, 1, 1)
+    px, py = tf.split(tf.expand_dims(point_pred[..., :2], axis = -3), 2, axis = -1) #(N, 1, P, 1)
+    area = ((x2 - x1) * (y2 - y1))[..., 0]
+    offset = tf.concat([px - x1, py - y1, x2 - px, y2 - py], axis = -1) #left, top, right, bottom
+    
+    overlap_flag = tf.greater(tf.reduce_min(offset, axis = -1), 0) #(N, T, P)
+    if regress_range is not None:
+        max_offset = tf.reduce_max(offset, axis = -1)
+        regress_range = tf.expand_dims(tf.cast(regress_range, max_offset.dtype), axis = -3)
+        range_flag = tf.logical_and(tf.greater(max_offset, regress_range[..., 0]), tf.less_equal(max_offset, regress_range[..., 1]))
+        overlap_flag = tf.logical_and(overlap_flag, range_flag)
+    pad_area = tf.where(overlap_flag, area, float("inf"))
+    overlaps = tf.where(tf.equal(area, tf.reduce_min(pad_area, axis = -2, keepdims = True)), area, 0)
+    
+    max_area = tf.reduce_max(overlaps, axis = -2)
+    match = tf.where(max(threshold, min_threshold) <= max_area, 1, -1)
+    true_indices = tf.argmax(overlaps, axis = -2)
+    return match, true_indices
@@ -0,0 +1,41 @@
+import functools
+import inspect
+
+from .max_iou import max_iou, batched_max_iou
+from .point import point, batched_point
+
+BATCH_ASSIGN = {max_iou:batched_max_iou, point:batched_point}
+
+def unwrap_partial(function):
+    keywords = {}
+    while isinstance(function, functools.partial):
+        keywords = {**function.keywords, **keywords}
+        function = function.func
+    return function, keywords
+
+def get_batch_assign(assign, batch_assign = True):
+    """
+    batched version of assign with the same keyword arguments.(assign or functools.partial of assign)
+    batch_assign = True > derived from assign, batched function(or partial) > checked that it is the batched version of assign.
+    
+    <example>
+    > get_batch_assign(functools.partial(max_iou, positive_threshold = 0.6)) #functools.partial(batched_max_iou, positive_threshold = 0.6)
+    """
+    func, keywords = unwrap_partial(assign)
+    if func not in BATCH_ASSIGN:
+        raise ValueError("assign '{0}' doesn't have batched version.(supported assign : {1})".format(getattr(func, "__name__", func), [f.__name__ for f in BATCH_ASSIGN]))
+    batch_func = BATCH_ASSIGN[func]
+    
+    keywords = {k:v for k, v in keywords.items() if k != "chunk_size"} #batched assign isn't chunked.
+    unknown = [k for k in keywords if k not in inspect.signature(batch_func).parameters]
+    if 0 < len(unknown):
+        raise ValueError("arguments {0} of assign aren't supported by '{1}'".format(unknown, batch_func.__name__))
+    if callable(batch_assign):
+        batch_assign, batch_keywords = unwrap_partial(batch_assign)
+        if batch_assign is not batch_func:
+            raise ValueError("batch_assign '{0}' isn't batched version of assign '{1}'.(use '{2}' or batch_assign = True)".format(getattr(batch_assign, "__name__", batch_assign), func.__name__, batch_func.__name__))
+        conflict = [k for k in keywords if k in batch_keywords and batch_keywords[k] != keywords[k]]
+        if 0 < len(conflict):
+            raise ValueError("arguments {0} of batch_assign are different from assign".format(conflict))
+        keywords = {**keywords, **batch_keywords}
+    return functools.partial(batch_func, **keywords) if 0 < len(keywords) else batch_func
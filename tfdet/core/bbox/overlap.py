@@ -3,50 +3,75 @@ import numpy as np
 
 from .util import iou, iou_numpy
 
-def overlap_bbox(bbox_true, bbox_pred, mode = "normal"):
+def map_chunk(function, data, step):
+    """
+    concat(function(data[i:i + step]) for i in range(0, len(data), step)) by while_loop.(peak memory of function is bounded by step)
+    """
+    count = tf.shape(data)[0]
+    step = tf.maximum(tf.cast(step, tf.int32), 1)
+    n_chunk = tf.maximum((count + step - 1) // step, 1)
+    out = tf.TensorArray(data.dtype, size = n_chunk, infer_shape = False)
+    def body(index, out):
+        out = out.write(index, function(data[index * step:(index + 1) * step]))
+        return index + 1, out
+    out = tf.while_loop(lambda index, out: index < n_chunk, body, (0, out))[1]
+    return out.concat()
+
+def overlap_bbox(bbox_true, bbox_pred, mode = "normal", chunk_size = None):
     """
     bbox_true = [[x1, y1, x2, y2], ...] #(N, bbox)
     bbox_pred = [[x1, y1, x2, y2], ...] #(M, bbox)
+    chunk_size = max pair count of iou at once.(if None, broadcast N x M at once)
     
     overlaps = true & pred iou matrix #(N, M)
     """
     if mode not in ("normal", "foreground", "general", "complete", "distance"):
         raise ValueError("unknown mode '{0}'".format(mode))
     
-    true_count = tf.shape(bbox_true)[0]
-    pred_count = tf.shape(bbox_pred)[0]
-        
-    bbox_true = tf.reshape(tf.tile(tf.expand_dims(bbox_true, 0), [1, 1, pred_count]), [-1, 4])
-    bbox_pred = tf.tile(bbox_pred, [true_count, 1])
-    
-    overlaps = iou(bbox_true, bbox_pred, mode = mode)
-    overlaps = tf.reshape(overlaps, [true_count, pred_count])
+    bbox_pred = tf.expand_dims(bbox_pred, axis = 0)
+    function = lambda bbox_true: iou(tf.expand_dims(bbox_true, axis = 1), bbox_pred, mode = mode)[..., 0]
+    if chunk_size is None:
+        overlaps = function(bbox_true)
+    else:
+        overlaps = map_chunk(function, bbox_true, chunk_size // tf.maximum(tf.shape(bbox_pred)[1], 1))
+        overlaps = tf.reshape(overlaps, [tf.shape(bbox_true)[0], tf.shape(bbox_pred)[1]])
     return overlaps
 
-def overlap_point(bbox_true, points, regress_range = None):
-    true_count = tf.shape(bbox_true)[0]
-    pred_count = tf.shape(points)[0]
-
-    bbox_true = tf.reshape(tf.tile(tf.expand_dims(bbox_true, 0), [1, 1, pred_count]), [-1, 4])
-    points = tf.tile(points, [true_count, 1])
+def overlap_point(bbox_true, points, regress_range = None, chunk_size = None):
+    """
+    bbox_true = [[x1, y1, x2, y2], ...] #(N, bbox)
+    points = [[x, y], ...] #(M, 2)
+    regress_range = [[min, max], ...] #(M, 2)
+    chunk_size = max pair count at once.(if None, broadcast N x M at once)
+    
+    overlaps = area of the smallest true bbox that contains point #(N, M)
+    """
+    x1, y1, x2, y2 = tf.split(tf.expand_dims(bbox_true, axis = 1), 4, axis = -1) #(N, 1, 1)
+    area = ((x2 - x1) * (y2 - y1))[..., 0]
+    max_area = tf.reduce_max(area)
     
-    x1, y1, x2, y2 = tf.split(bbox_true, 4, axis = -1)
-    px, py = tf.split(points, 2, axis = -1)
-    area = tf.reshape((x2 - x1) * (y2 - y1), [true_count, pred_count])
-    offset = tf.concat([px - x1, py - y1, x2 - px, y2 - py], axis = -1) #left, top, right, bottom
-    offset = tf.reshape(offset, [true_count, pred_count, 4])
-    min_offset = tf.reduce_min(offset, axis = -1)
+    def function(args):
+        points = args[..., :2]
+        px, py = tf.split(tf.expand_dims(points, axis = 0), 2, axis = -1) #(1, M, 1)
+        offset = tf.concat([px - x1, py - y1, x2 - px, y2 - py], axis = -1) #left, top, right, bottom
+        min_offset = tf.reduce_min(offset, axis = -1)
+        
+        overlap_flag = tf.greater(min_offset, 0)
+        if regress_range is not None:
+            max_offset = tf.reduce_max(offset, axis = -1)
+            range_flag = tf.logical_and(tf.greater(max_offset, args[..., 2]), tf.less_equal(max_offset, args[..., 3]))
+            overlap_flag = tf.logical_and(overlap_flag, range_flag)
+        pad_area = tf.where(overlap_flag, area, max_area + 1)
+        min_flag = tf.equal(area, tf.reduce_min(pad_area, axis = 0, keepdims = True))
+        overlaps = tf.where(min_flag, area, 0)
+        return overlaps
     
-    overlap_flag = tf.greater(min_offset, 0)
-    if regress_range is not None:
-        max_offset = tf.reduce_max(offset, axis = -1)
-        regress_range = tf.tile(regress_range, [true_count, 1])
-        regress_range = tf.reshape(regress_range, [true_count, pred_count, 2])
-        range_flag = tf.logical_and(tf.greater(max_offset, regress_range[..., 0]), tf.less_equal(max_offset, regress_range[..., 1]))
-        overlap_flag = tf.logical_and(overlap_flag, range_flag)
-    pad_area = tf.where(overlap_flag, area, tf.reduce_max(area) + 1)
-    min_flag = tf.equal(area, tf.reduce_min(pad_area, axis = 0, keepdims = True))
-    overlaps = tf.where(min_flag, area, 0)
+    args = points if regress_range is None else tf.concat([points, tf.cast(regress_range, points.dtype)], axis = -1)
+    if chunk_size is None:
+        overlaps = function(args)
+    else:
+        overlaps = map_chunk(lambda args: tf.transpose(function(args)), args, chunk_size // tf.maximum(tf.shape(bbox_true)[0], 1))
+        overlaps = tf.transpose(tf.reshape(overlaps, [tf.shape(points)[0], tf.shape(bbox_true)[0]]))
     return overlaps
 
 def overlap_bbox_numpy(bbox_true, bbox_pred, mode = "normal", e = 1e-12):
@@ -59,12 +84,5 @@ def overlap_bbox_numpy(bbox_true, bbox_pred, mode = "normal", e = 1e-12):
     if mode not in ("normal", "foreground", "general", "complete", "distance"):
         raise ValueError("unknown mode '{0}'".format(mode))
     
-    true_count = np.shape(bbox_true)[0]
-    pred_count = np.shape(bbox_pred)[0]
-        
-    bbox_true = np.reshape(np.tile(np.expand_dims(bbox_true, 0), [1, 1, pred_count]), [-1, 4])
-    bbox_pred = np.tile(bbox_pred, [true_count, 1])
-    
-    overlaps = iou_numpy(bbox_true, bbox_pred, mode = mode, e = e)
-    overlaps = np.reshape(overlaps, [true_count, pred_count])
+    overlaps = iou_numpy(np.expand_dims(bbox_true, axis = 1), np.expand_dims(bbox_pred, axis = 0), mode = mode, e = e)[..., 0]
     return overlaps
\ No newline at end of file
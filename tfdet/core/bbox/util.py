@@ -23,11 +23,8 @@ def isin(bbox_true, bbox_pred, extra_length = None, mode = "rect"):
     true_count = tf.shape(bbox_true)[0]
     pred_count = tf.shape(bbox_pred)[0]
         
-    bbox_true = tf.reshape(tf.tile(tf.expand_dims(bbox_true, 0), [1, 1, pred_count]), [-1, 4])
-    bbox_pred = tf.tile(bbox_pred, [true_count, 1])
-    
-    tx1, ty1, tx2, ty2 = tf.split(bbox_true, 4, axis = -1)
-    px1, py1, px2, py2 = tf.split(bbox_pred, 4, axis = -1)
+    tx1, ty1, tx2, ty2 = tf.split(tf.expand_dims(bbox_true, axis = 1), 4, axis = -1) #(N, 1, 1)
+    px1, py1, px2, py2 = tf.split(tf.expand_dims(bbox_pred, axis = 0), 4, axis = -1) #(1, M, 1)
     
     tcx, tcy = (tx1 + tx2) / 2, (ty1 + ty2) / 2
     pcx, pcy = (px1 + px2) / 2, (py1 + py2) / 2
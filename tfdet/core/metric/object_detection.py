@@ -5,10 +5,14 @@ from tfdet.core.util import metric2text
 from ..bbox import overlap_bbox_numpy as overlap_bbox
 
 class MeanAveragePrecision:
-    def __init__(self, iou_threshold = 0.5, score_threshold = 0.05, scale_range = None, mode = "normal", e = 1e-12, postfix = False, label = None, dtype = np.float32):
+    def __init__(self, iou_threshold = 0.5, score_threshold = 0.05, scale_range = None, mode = "normal", e = 1e-12, postfix = False, label = None, dtype = np.float32, vectorize = True, num_bin = None):
         """
         run = MeanAveragePrecision()(*args)
         batch run = self.add(*batch_args) -> self.evaluate()
+        merge run = self.add(*worker_batch_args) by each worker -> self.merge(*worker_metrics) -> self.evaluate()
+        vectorize = match all classes, area ranges and iou thresholds at once.(False > loop by class, area range and iou threshold)
+        num_bin = None > keep tp, fp and score of every prediction.(exact)
+        num_bin = 1000 > accumulate tp, fp into per-class score histogram of num_bin bins in 0~1.(bounded memory, predictions in the same bin are tied)
         
         scale_range = None > area_range = [[None, None]] # 0~INF (all scale)
         scale_range = [96] > area_range = [[None, 96^2], [96^2, None]] # 0~96^2, 96^2~INF
@@ -24,6 +28,8 @@ class MeanAveragePrecision:
         self.postfix = postfix
         self.label = label
         self.dtype = dtype
+        self.vectorize = vectorize
+        self.num_bin = num_bin
 
         if np.ndim(scale_range) == 0:
             scale_range = [scale_range]
@@ -37,9 +43,12 @@ class MeanAveragePrecision:
         self.reset()
         
     def reset(self):
-        self.tp = []
+        self.tp = [] #(num_area_range, num_pred, num_iou_threshold) bool
         self.fp = []
+        self.label_pred = []
         self.score_pred = []
+        self.tp_hist = None #(num_area_range, n_class, num_bin, num_iou_threshold) count
+        self.fp_hist = None
         self._num_true = None
         self._num_pred = None
     
@@ -219,97 +228,221 @@ class MeanAveragePrecision:
             true_area = (bbox_true[..., 3] - bbox_true[..., 1]) * (bbox_true[..., 2] - bbox_true[..., 0])
             pred_area = (bbox_pred[..., 3] - bbox_pred[..., 1]) * (bbox_pred[..., 2] - bbox_pred[..., 0])
             
-            tp = np.zeros((len(self.area_range), n_class, len(y_pred), len(self.iou_threshold)))
-            fp = np.zeros((len(self.area_range), n_class, len(y_pred), len(self.iou_threshold)))
-            for cls in range(n_class):
-                true_flag = y_true[..., 0] == cls
-                pred_flag = np.logical_and(label == cls, score_flag)
-                true_indices = np.argwhere(true_flag)[:, 0]
-                pred_indices = np.argwhere(pred_flag)[:, 0]
-                cls_true_area = true_area[true_flag]
-                cls_pred_area = pred_area[pred_flag]
-                if 0 < len(pred_indices) and 0 < len(true_indices):
-                    overlaps = overlap_bbox(bbox_pred[pred_flag], bbox_true[true_flag], mode = self.mode) #(P, T)
-                    max_iou = np.max(overlaps, axis = 1) #(P,)
-                    argmax_iou = np.argmax(overlaps, axis = 1) #(P,)
-                for a, (min_area, max_area) in enumerate(self.area_range):
-                    if 0 < len(true_indices):
-                        true_area_flag = np.ones(len(true_indices), dtype = bool) #(T,)
-                        if min_area is not None or max_area is not None:
-                            min_area_flag = np.greater_equal(cls_true_area, min_area) if min_area is not None else true_area_flag
-                            max_area_flag = np.less(cls_true_area, max_area) if max_area is not None else true_area_flag
-                            true_area_flag = np.logical_and(min_area_flag, max_area_flag)
-                        self._num_true[a, cls] += np.sum(true_area_flag)
-                    if 0 < len(pred_indices):
-                        pred_area_flag = np.ones(len(cls_pred_area), dtype = bool)
-                        if min_area is not None or max_area is not None:
-                            min_area_flag = np.greater_equal(cls_pred_area, min_area) if min_area is not None else pred_area_flag
-                            max_area_flag = np.less(cls_pred_area, max_area) if max_area is not None else pred_area_flag
-                            pred_area_flag = np.logical_and(min_area_flag, max_area_flag)
-                        self._num_pred[a, cls] += np.sum(pred_area_flag)
-                        if len(true_indices) == 0:
-                            fp[a, cls, pred_indices[pred_area_flag]] = 1
-                        else:
-                            for i, iou_threshold in enumerate(self.iou_threshold):
-                                iou_flag = iou_threshold <= max_iou #(P,)
-                                match_true_indices = argmax_iou[iou_flag]
-                                match_pred_indices = np.argwhere(iou_flag)[:, 0]
-                                filtered_flag = true_area_flag[match_true_indices]
-                                match_true_indices = match_true_indices[filtered_flag]
-                                match_pred_indices = match_pred_indices[filtered_flag]
-                                unmatch_pred_indices = np.argwhere(np.logical_and(~iou_flag, pred_area_flag))[:, 0]
-                                #match update
-                                for t in np.unique(match_true_indices):
-                                    p = match_pred_indices[match_true_indices == t]
-                                    tp[a, cls, p[0], i] = 1
-                                    fp[a, cls, p[1:], i] = 1
-                                #unmatch update
-                                fp[a, cls, unmatch_pred_indices, i] = 1
-            self.tp.append(tp)
-            self.fp.append(fp)
-            self.score_pred.append(score)
+            match = self.match if self.vectorize else self.match_loop
+            tp, fp, num_true, num_pred = match(y_true[..., 0].astype(int), bbox_true, true_area, label, bbox_pred, pred_area, score_flag, n_class)
+            self._num_true += num_true
+            self._num_pred += num_pred
+            if self.num_bin is None:
+                self.tp.append(tp)
+                self.fp.append(fp)
+                self.label_pred.append(label.astype(np.int32))
+                self.score_pred.append(score)
+            else:
+                if self.tp_hist is None:
+                    self.tp_hist = np.zeros((len(self.area_range), n_class, self.num_bin, len(self.iou_threshold)), dtype = np.uint32)
+                    self.fp_hist = np.zeros((len(self.area_range), n_class, self.num_bin, len(self.iou_threshold)), dtype = np.uint32)
+                index = np.clip((score * self.num_bin).astype(int), 0, self.num_bin - 1)
+                np.add.at(self.tp_hist, (slice(None), label, index), tp)
+                np.add.at(self.fp_hist, (slice(None), label, index), fp)
+    
+    def merge(self, *metrics):
+        """
+        Merge accumulated states of other metrics(ex. evaluated by each worker process) into self.
+        
+        <example>
+        > metric = MeanAveragePrecision(num_bin = 1000)
+        > metric.merge(*pool.map(evaluate_shard, shards)) #evaluate_shard returns MeanAveragePrecision(num_bin = 1000) after add
+        > metric.evaluate()
+        """
+        for metric in metrics:
+            if metric._num_true is None:
+                continue
+            if metric.num_bin != self.num_bin or len(metric.area_range) != len(self.area_range) or not np.array_equal(metric.iou_threshold, self.iou_threshold):
+                raise ValueError("metric to merge should have the same num_bin, scale_range and iou_threshold")
+            if self._num_true is None:
+                self._num_true = np.zeros_like(metric._num_true)
+                self._num_pred = np.zeros_like(metric._num_pred)
+            elif np.shape(metric._num_true) != np.shape(self._num_true):
+                raise ValueError("metric to merge should have the same n_class")
+            self._num_true += metric._num_true
+            self._num_pred += metric._num_pred
+            if self.num_bin is None:
+                self.tp.extend(metric.tp)
+                self.fp.extend(metric.fp)
+                self.label_pred.extend(metric.label_pred)
+                self.score_pred.extend(metric.score_pred)
+            elif metric.tp_hist is not None:
+                if self.tp_hist is None:
+                    self.tp_hist = np.zeros_like(metric.tp_hist)
+                    self.fp_hist = np.zeros_like(metric.fp_hist)
+                self.tp_hist += metric.tp_hist
+                self.fp_hist += metric.fp_hist
+        return self
+    
+    def get_area_flag(self, area):
+        """
+        area = (N,) > area_flag = (num_area_range, N)
+        """
+        area_flag = np.ones((len(self.area_range), len(area)), dtype = bool)
+        for a, (min_area, max_area) in enumerate(self.area_range):
+            if min_area is not None:
+                area_flag[a] &= np.greater_equal(area, min_area)
+            if max_area is not None:
+                area_flag[a] &= np.less(area, max_area)
+        return area_flag
+    
+    def match(self, y_true, bbox_true, true_area, label, bbox_pred, pred_area, score_flag, n_class):
+        """
+        Greedy matching for all classes, area ranges and iou thresholds at once.(pred is sorted by score)
+        
+        y_true = (T,), label = (P,), score_flag = (P,)
+        tp, fp = (num_area_range, P, num_iou_threshold) bool #for class of label
+        num_true, num_pred = (num_area_range, n_class, 1)
+        """
+        n_area, n_pred, n_threshold = len(self.area_range), len(label), len(self.iou_threshold)
+        true_area_flag = self.get_area_flag(true_area) #(A, T)
+        pred_area_flag = np.logical_and(self.get_area_flag(pred_area), score_flag) #(A, P)
+        num_true = np.stack([np.bincount(y_true[flag], minlength = n_class)[:n_class] for flag in true_area_flag])[..., None].astype(np.float64)
+        num_pred = np.stack([np.bincount(label[flag], minlength = n_class)[:n_class] for flag in pred_area_flag])[..., None].astype(np.float64)
+        
+        has_true = np.isin(label, y_true) #(P,)
+        match_iou = np.zeros(n_pred, dtype = self.dtype if self.dtype is not None else np.float32)
+        match_true = np.zeros(n_pred, dtype = int)
+        if 0 < len(y_true) and 0 < n_pred:
+            overlaps = overlap_bbox(bbox_pred, bbox_true, mode = self.mode) #(P, T)
+            overlaps = np.where(np.equal(label[:, None], y_true[None]), overlaps, -1) #class-aware
+            match_true = np.argmax(overlaps, axis = 1)
+            match_iou = overlaps[np.arange(n_pred), match_true]
+        
+        iou_flag = np.logical_and(np.logical_and(self.iou_threshold[None] <= match_iou[:, None], score_flag[:, None]), has_true[:, None]) #(P, I)
+        match_flag = np.logical_and(iou_flag[None], true_area_flag[:, match_true][..., None]) if 0 < len(y_true) else np.zeros((n_area, n_pred, n_threshold), dtype = bool) #(A, P, I)
+        
+        #first(highest score) pred of each true
+        order = np.argsort(match_true, kind = "stable")
+        sorted_true = match_true[order]
+        sorted_flag = match_flag[:, order]
+        count = np.cumsum(sorted_flag, axis = 1)
+        group_start = np.searchsorted(sorted_true, sorted_true, side = "left")
+        base = np.where((0 < group_start)[None, :, None], count[:, np.maximum(group_start - 1, 0)], 0)
+        first_flag = np.zeros_like(match_flag)
+        first_flag[:, order] = np.logical_and(sorted_flag, (count - base) == 1)
+        
+        unmatch_flag = np.logical_and(np.logical_and(~iou_flag, has_true[:, None])[None], pred_area_flag[..., None]) #(A, P, I)
+        no_true_flag = np.logical_and(~has_true[None], pred_area_flag)[..., None] #(A, P, 1)
+        
+        tp = first_flag
+        fp = np.logical_or(np.logical_or(np.logical_and(match_flag, ~first_flag), unmatch_flag), no_true_flag)
+        return tp, fp, num_true, num_pred
+    
+    def match_loop(self, y_true, bbox_true, true_area, label, bbox_pred, pred_area, score_flag, n_class):
+        """
+        Greedy matching by loop of class, area range and iou threshold.(reference of match)
+        """
+        num_true = np.zeros((len(self.area_range), n_class, 1))
+        num_pred = np.zeros((len(self.area_range), n_class, 1))
+        tp = np.zeros((len(self.area_range), n_class, len(label), len(self.iou_threshold)))
+        fp = np.zeros((len(self.area_range), n_class, len(label), len(self.iou_threshold)))
+        for cls in range(n_class):
+            true_flag = y_true == cls
+            pred_flag = np.logical_and(label == cls, score_flag)
+            true_indices = np.argwhere(true_flag)[:, 0]
+            pred_indices = np.argwhere(pred_flag)[:, 0]
+            cls_true_area = true_area[true_flag]
+            cls_pred_area = pred_area[pred_flag]
+            if 0 < len(pred_indices) and 0 < len(true_indices):
+                overlaps = overlap_bbox(bbox_pred[pred_flag], bbox_true[true_flag], mode = self.mode) #(P, T)
+                max_iou = np.max(overlaps, axis = 1) #(P,)
+                argmax_iou = np.argmax(overlaps, axis = 1) #(P,)
+            for a, (min_area, max_area) in enumerate(self.area_range):
+                if 0 < len(true_indices):
+                    true_area_flag = np.ones(len(true_indices), dtype = bool) #(T,)
+                    if min_area is not None or max_area is not None:
+                        min_area_flag = np.greater_equal(cls_true_area, min_area) if min_area is not None else true_area_flag
+                        max_area_flag = np.less(cls_true_area, max_area) if max_area is not None else true_area_flag
+                        true_area_flag = np.logical_and(min_area_flag, max_area_flag)
+                    num_true[a, cls] += np.sum(true_area_flag)
+                if 0 < len(pred_indices):
+                    pred_area_flag = np.ones(len(cls_pred_area), dtype = bool)
+                    if min_area is not None or max_area is not None:
+                        min_area_flag = np.greater_equal(cls_pred_area, min_area) if min_area is not None else pred_area_flag
+                        max_area_flag = np.less(cls_pred_area, max_area) if max_area is not None else pred_area_flag
+                        pred_area_flag = np.logical_and(min_area_flag, max_area_flag)
+                    num_pred[a, cls] += np.sum(pred_area_flag)
+                    if len(true_indices) == 0:
+                        fp[a, cls, pred_indices[pred_area_flag]] = 1
+                    else:
+                        for i, iou_threshold in enumerate(self.iou_threshold):
+                            iou_flag = iou_threshold <= max_iou #(P,)
+                            match_true_indices = argmax_iou[iou_flag]
+                            match_pred_indices = np.argwhere(iou_flag)[:, 0]
+                            filtered_flag = true_area_flag[match_true_indices]
+                            match_true_indices = match_true_indices[filtered_flag]
+                            match_pred_indices = pred_indices[match_pred_indices[filtered_flag]]
+                            unmatch_pred_indices = pred_indices[np.argwhere(np.logical_and(~iou_flag, pred_area_flag))[:, 0]]
+                            #match update
+                            for t in np.unique(match_true_indices):
+                                p = match_pred_indices[match_true_indices == t]
+                                tp[a, cls, p[0], i] = 1
+                                fp[a, cls, p[1:], i] = 1
+                            #unmatch update
+                            fp[a, cls, unmatch_pred_indices, i] = 1
+        pred_indices = np.arange(len(label))
+        return tp[:, label, pred_indices] != 0, fp[:, label, pred_indices] != 0, num_true, num_pred
     
     def evaluate(self, reduce = True, return_precision_n_recall = False, mode = "area", return_summary = False):
         if self._num_pred is not None and 0 < np.sum(self._num_pred): #self._num_true is not None:
             if mode not in ["area", "11points"]:
                 raise ValueError("unknown mode '{0}'".format(mode))
 
-            sort_indices = np.argsort(-np.hstack(self.score_pred))
-            tp = np.concatenate(self.tp, axis = -2)[..., sort_indices, :]
-            fp = np.concatenate(self.fp, axis = -2)[..., sort_indices, :]
-            tp = np.cumsum(tp, axis = -2)
-            fp = np.cumsum(fp, axis = -2)
-            num_true = np.expand_dims(self._num_true, axis = -2)
+            #group by class(score order in class)
+            n_class = np.shape(self._num_true)[1]
+            if self.num_bin is None:
+                label = np.hstack(self.label_pred)
+                sort_indices = np.argsort(-np.hstack(self.score_pred))
+                sort_indices = sort_indices[np.argsort(label[sort_indices], kind = "stable")]
+                label = label[sort_indices]
+                tp = np.concatenate(self.tp, axis = 1)[:, sort_indices] #(A, N, I)
+                fp = np.concatenate(self.fp, axis = 1)[:, sort_indices]
+            else:
+                label = np.repeat(np.arange(n_class), self.num_bin)
+                tp = np.zeros((len(self.area_range), n_class * self.num_bin, len(self.iou_threshold)), dtype = np.uint32) if self.tp_hist is None else self.tp_hist[:, :, ::-1].reshape([len(self.area_range), -1, len(self.iou_threshold)])
+                fp = np.zeros_like(tp) if self.fp_hist is None else self.fp_hist[:, :, ::-1].reshape([len(self.area_range), -1, len(self.iou_threshold)])
+            start = np.searchsorted(label, np.arange(n_class), side = "left")
+            end = np.searchsorted(label, np.arange(n_class), side = "right")
+            pred_flag = start < end
+            
+            #cumulative count in class
+            tp = np.cumsum(tp, axis = 1, dtype = np.float64)
+            fp = np.cumsum(fp, axis = 1, dtype = np.float64)
+            zeros = np.zeros((len(self.area_range), 1, len(self.iou_threshold)))
+            tp = tp - np.concatenate([zeros, tp], axis = 1)[:, start][:, label]
+            fp = fp - np.concatenate([zeros, fp], axis = 1)[:, start][:, label]
+            num_true = self._num_true[:, label] #(A, N, 1)
             true_flag = num_true != 0
             precision = tp / np.maximum(tp + fp, self.e)
             recall = tp / np.maximum(num_true, self.e)
             precision = np.where(true_flag, precision, 0)
             recall = np.where(true_flag, recall, 0)
             
-            n_class = np.shape(self.tp[0])[-3]
             average_precision = np.zeros((len(self.area_range), n_class, len(self.iou_threshold)))
-            if not return_precision_n_recall:
+            if not return_precision_n_recall and np.any(pred_flag):
                 if mode == "area":
-                    zeros = np.zeros((len(self.area_range), n_class, 1, len(self.iou_threshold)))
-                    ones = np.ones((len(self.area_range), n_class, 1, len(self.iou_threshold)))
-                    mpre = np.concatenate([zeros, precision, zeros], axis = -2)
-                    mrec = np.concatenate([zeros, recall, ones], axis = -2)
-                    for i in range(np.shape(mpre)[-2] - 1, 0, -1):
-                        mpre[..., i - 1, :] = np.maximum(mpre[..., i - 1, :], mpre[..., i, :])
-                    
-                    for a in range(len(self.area_range)):
-                        for cls in range(n_class):
-                            for th in range(len(self.iou_threshold)):
-                                indices = np.where(mrec[a, cls, 1:, th] != mrec[a, cls, :-1, th])[0]
-                                average_precision[a, cls, th] = np.sum((mrec[a, cls, indices + 1, th] - mrec[a, cls, indices, th]) * mpre[a, cls, indices + 1, th])
+                    #precision envelope(max precision of higher recall in class)
+                    envelope = np.empty_like(precision)
+                    for cls in np.argwhere(pred_flag)[:, 0]:
+                        envelope[:, start[cls]:end[cls]] = np.maximum.accumulate(precision[:, start[cls]:end[cls]][:, ::-1], axis = 1)[:, ::-1]
+                    prev_recall = np.concatenate([zeros, recall[:, :-1]], axis = 1)
+                    prev_recall[:, start[pred_flag]] = 0
+                    average_precision[:, pred_flag] = np.add.reduceat((recall - prev_recall) * envelope, start[pred_flag], axis = 1)
                 elif mode in "11points":
-                    zeros = np.zeros_like(precision)
                     for recall_threshold in np.linspace(0., 1., 11):
-                        pre = np.where(recall_threshold <= recall, precision, zeros)
-                        average_precision += np.max(pre, axis = -2)
+                        pre = np.where(recall_threshold <= recall, precision, 0)
+                        average_precision[:, pred_flag] += np.maximum.reduceat(pre, start[pred_flag], axis = 1)
                     average_precision /= 11
-            precision = precision[..., -1, :]
-            recall = recall[..., -1, :]
+            
+            #last precision and recall of class
+            precision = np.where(pred_flag[None, :, None], precision[:, np.maximum(end - 1, 0)], 0)
+            recall = np.where(pred_flag[None, :, None], recall[:, np.maximum(end - 1, 0)], 0)
             
             if reduce:
                 precision, recall, average_precision = self.reduce([precision, recall, average_precision])
@@ -331,10 +464,12 @@ class MeanAveragePrecision:
             return average_precision
 
 class CoCoMeanAveragePrecision:
-    def __init__(self, iou_threshold = [0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95], score_threshold = 0.05, scale_range = None, mode = "normal", e = 1e-12, postfix = False, label = None, dtype = np.float32):
+    def __init__(self, iou_threshold = [0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95], score_threshold = 0.05, scale_range = None, mode = "normal", e = 1e-12, postfix = False, label = None, dtype = np.float32, num_bin = None):
         """
         run = CoCoMeanAveragePrecision()(*args)
         batch run = self.add(*batch_args) -> self.evaluate()
+        merge run = self.add(*worker_batch_args) by each worker -> self.merge(*worker_metrics) -> self.evaluate()
+        num_bin = None > keep every prediction.(exact), num_bin = 1000 > per-class score histogram.(bounded memory)
         
         scale_range = None > area_range = [[None, None]] # 0~INF (all scale)
         scale_range = [96] > area_range = [[None, 96^2], [96^2, None]] # 0~96^2, 96^2~INF
@@ -350,12 +485,18 @@ class CoCoMeanAveragePrecision:
         self.postfix = postfix
         self.label = label
         self.dtype = dtype
+        self.num_bin = num_bin
         
         self.reset()
         
     def reset(self):
-        self.metric = MeanAveragePrecision(iou_threshold = self.iou_threshold, score_threshold = self.score_threshold, scale_range = self.scale_range, mode = self.mode, e = self.e, dtype = self.dtype)
-        self.sub_metric = MeanAveragePrecision(iou_threshold = [0.5, 0.75], score_threshold = self.score_threshold, scale_range = None, mode = self.mode, e = self.e, dtype = self.dtype)
+        self.metric = MeanAveragePrecision(iou_threshold = self.iou_threshold, score_threshold = self.score_threshold, scale_range = self.scale_range, mode = self.mode, e = self.e, dtype = self.dtype, num_bin = self.num_bin)
+        self.sub_metric = MeanAveragePrecision(iou_threshold = [0.5, 0.75], score_threshold = self.score_threshold, scale_range = None, mode = self.mode, e = self.e, dtype = self.dtype, num_bin = self.num_bin)
+    
+    def merge(self, *metrics):
+        self.metric.merge(*[metric.metric for metric in metrics])
+        self.sub_metric.merge(*[metric.sub_metric for metric in metrics])
+        return self
     
     @property
     def num_true(self):
@@ -1,6 +1,8 @@
 from .distance import *
 from .feature_extract import *
+from .filter import *
 from .initializer import *
+from .knn import *
 from .nms import *
 from .pooling import *
 from .roi_extract import *
\ No newline at end of file
@@ -5,6 +5,47 @@ def mahalanobis(u, v, VI):
     out = tf.sqrt(tf.matmul(tf.matmul(tf.expand_dims(delta, axis = -2), VI), tf.expand_dims(delta, axis = -1)))
     return tf.squeeze(out, axis = -1)
     
+def mahalanobis_factor(VI, rank = None, eps = 1e-10):
+    """
+    Factor W and isotropic scale s of VI(VI = W @ W^T + s * I) for batched mahalanobis.
+    
+    rank = None > cholesky factor(exact, s = 0), int > eigen vectors of the largest rank eigen values and mean of the others(low rank)
+    VI = (..., C, C) > W = (..., C, C or rank), s = (...)
+    factor is calculated by float64 from symmetrized VI(+ eps * mean diagonal jitter for cholesky).
+    if cholesky fails(nearly singular or not positive definite by float32 cast), factor of the matrix is sqrt of eigen decomposition with clipped eigen values.
+    """
+    dtype = VI.dtype if tf.is_tensor(VI) else tf.float32
+    VI = tf.cast(VI, tf.float64)
+    VI = (VI + tf.linalg.matrix_transpose(VI)) / 2
+    batch_shape = tf.shape(VI)[:-2]
+    c = VI.shape[-1]
+    if rank is None or c <= rank:
+        jitter = eps * tf.reduce_mean(tf.abs(tf.linalg.diag_part(VI)), axis = -1)
+        W = tf.reshape(tf.linalg.cholesky(VI + jitter[..., None, None] * tf.eye(c, dtype = VI.dtype)), [-1, c, c])
+        invalid_indices = tf.where(tf.logical_not(tf.reduce_all(tf.math.is_finite(W), axis = [1, 2])))[:, 0]
+        e, v = tf.linalg.eigh(tf.gather(tf.reshape(VI, [-1, c, c]), invalid_indices))
+        W = tf.tensor_scatter_nd_update(W, tf.expand_dims(invalid_indices, axis = -1), v * tf.sqrt(tf.maximum(e[..., None, :], 0)))
+        W = tf.reshape(W, tf.concat([batch_shape, [c, c]], axis = 0))
+        return tf.cast(W, dtype), tf.zeros(batch_shape, dtype = dtype)
+    e, v = tf.linalg.eigh(VI) #ascending eigen value
+    scale = tf.maximum(tf.reduce_mean(e[..., :-rank], axis = -1), 0)
+    W = v[..., -rank:] * tf.sqrt(tf.maximum(e[..., None, -rank:] - scale[..., None, None], 0))
+    return tf.cast(W, dtype), tf.cast(scale, dtype)
+
+def mahalanobis_batch(u, v, W, scale = None):
+    """
+    mahalanobis of every position at once by factor(W, scale) of VI.
+    
+    u = (..., P, C), v = (P, C), W = (P, C, R), scale = (P,) > (..., P)
+    """
+    shape = tf.shape(u)[:-1]
+    delta = tf.transpose(tf.reshape(u, [-1, *u.shape[-2:]]) - v, [1, 0, 2]) #(P, N, C)
+    out = tf.matmul(tf.cast(delta, W.dtype), W) #(P, N, R)
+    dist = tf.reduce_sum(tf.square(tf.cast(out, tf.float32)), axis = -1)
+    if scale is not None:
+        dist = dist + tf.expand_dims(scale, axis = -1) * tf.reduce_sum(tf.square(delta), axis = -1)
+    return tf.reshape(tf.transpose(tf.sqrt(tf.maximum(dist, 0))), shape)
+
 def euclidean(u, v):
     return tf.sqrt(tf.reduce_sum(tf.square(u - v), axis = -1))
 
@@ -13,3 +54,24 @@ def euclidean_matrix(u, v):
     v_norm = tf.reduce_sum(tf.square(v), axis = -1, keepdims = True)
     dist = tf.sqrt(tf.maximum(tf.add(tf.transpose(v_norm) - 2 * tf.matmul(u, v, transpose_b = True), u_norm), 0))
     return dist
+
+def euclidean_topk(u, v, k = 1, batch_size = 16384):
+    """
+    Sorted euclidean distance of k nearest v for each u.(chunked by batch_size of v, without materializing the full matrix)
+    
+    u = (N, C), v = (M, C) > (N, min(k, M))
+    """
+    v_size = v.shape[0] if tf.is_tensor(v) else len(v)
+    k = min(k, v_size)
+    if batch_size is None or v_size <= batch_size:
+        return tf.sort(euclidean_matrix(u, v), axis = -1)[..., :k]
+    u_norm = tf.reduce_sum(tf.square(u), axis = -1, keepdims = True)
+    dist = None
+    for index in range(0, v_size, batch_size):
+        _v = tf.cast(v[index:index + batch_size], u.dtype)
+        v_norm = tf.reduce_sum(tf.square(_v), axis = -1, keepdims = True)
+        _dist = tf.add(tf.transpose(v_norm) - 2 * tf.matmul(u, _v, transpose_b = True), u_norm)
+        if dist is not None:
+            _dist = tf.concat([dist, _dist], axis = -1)
+        dist = -tf.math.top_k(-_dist, k = min(k, _dist.shape[-1])).values
+    return tf.sqrt(tf.maximum(dist, 0))
@@ -1,3 +1,6 @@
+import os
+from multiprocessing.pool import ThreadPool
+
 import tensorflow as tf
 import numpy as np
 
@@ -50,7 +53,69 @@ def feature_extract(feature, sampling_index = None, pool_size = 1, sub_sampling
         feature = feature[0]
     return feature
 
-def core_sampling(*args, n_sample = 3, n_feature = "auto", eps = 0.9, index = False):
+def greedy_coreset(data, n_sample, n_start = None, batch_size = 1, num_workers = None, chunk_size = 65536, seed = None, verbose = True):
+    """
+    Indices of k center greedy selection.(incremental min squared distance by float32 matmul, chunked in multi thread)
+    
+    n_start = None > min distance initialized by data[0], int > initialized by n_start random samples.(approximate seeding)
+    batch_size = select batch_size farthest samples at once.(approximate, 1 > exact greedy)
+    """
+    data = np.ascontiguousarray(data, dtype = np.float32)
+    n_sample = min(n_sample, len(data))
+    norm = np.einsum("ij,ij->i", data, data)
+    min_dist = np.full(len(data), np.inf, dtype = np.float32)
+    chunks = [slice(index, index + chunk_size) for index in range(0, len(data), chunk_size)]
+    num_workers = min(num_workers if num_workers is not None else (os.cpu_count() or 1), len(chunks))
+    pool = ThreadPool(num_workers) if 1 < num_workers else None
+    
+    def update(chunk, target, target_norm):
+        dist = norm[chunk, None] - 2 * np.matmul(data[chunk], target.T) + target_norm
+        np.minimum(min_dist[chunk], np.min(dist, axis = -1), out = min_dist[chunk])
+    
+    def update_all(target):
+        target_norm = np.einsum("ij,ij->i", target, target)[None]
+        if pool is not None:
+            pool.map(lambda chunk: update(chunk, target, target_norm), chunks)
+        else:
+            for chunk in chunks:
+                update(chunk, target, target_norm)
+    
+    indices = []
+    try:
+        if 0 < n_sample:
+            start = [0] if n_start is None else np.random.RandomState(seed).choice(len(data), min(n_start, len(data)), replace = False)
+            update_all(data[start])
+        progress = None
+        if verbose:
+            try:
+                from tqdm import tqdm
+                progress = tqdm(total = n_sample, desc = "greedy sampling top-k center")
+            except:
+                pass
+        while len(indices) < n_sample:
+            size = min(batch_size, n_sample - len(indices))
+            index = [np.argmax(min_dist)] if size == 1 else np.argpartition(-min_dist, size - 1)[:size]
+            min_dist[index] = 0
+            indices.extend(index)
+            if len(indices) < n_sample:
+                update_all(data[index])
+            if progress is not None:
+                progress.update(size)
+        if progress is not None:
+            progress.close()
+    finally:
+        if pool is not None:
+            pool.close()
+    return [int(index) for index in indices]
+
+def core_sampling(*args, n_sample = 3, n_feature = "auto", eps = 0.9, index = False, n_start = None, batch_size = 1, num_workers = None, seed = None):
+    """
+    Coreset of args by k center greedy selection on random projected args[0].
+    
+    n_start = None > start from args[0][0], int > start from n_start random samples.(approximate seeding)
+    batch_size = select batch_size farthest samples at once.(approximate, 1 > exact greedy)
+    num_workers = threads of distance update.(None > cpu count)
+    """
     try:
         from sklearn.random_projection import SparseRandomProjection, johnson_lindenstrauss_min_dim
     except Exception as e:
@@ -62,25 +127,10 @@ def core_sampling(*args, n_sample = 3, n_feature = "auto", eps = 0.9, index = Fa
     if n_feature == "auto":
         b, c = np.shape(args[0])
         n_feature = max(min(johnson_lindenstrauss_min_dim(b, eps = eps), c), 1)
-    m = SparseRandomProjection(n_components = n_feature, eps = eps)
-    trans_data = m.fit_transform(args[0])
+    m = SparseRandomProjection(n_components = n_feature, eps = eps, random_state = seed)
+    trans_data = m.fit_transform(args[0]).astype(np.float32)
     
-    indices = []
-    min_dist = None
-    target = np.expand_dims(trans_data[0], axis = 0)
-    iter_range = range(n_sample)
-    try:
-        from tqdm import tqdm
-        iter_range = tqdm(iter_range, total = n_sample, desc = "greedy sampling top-k center")
-    except:
-        pass
-    for j in iter_range: #k center greedy
-        dist = np.linalg.norm(trans_data - target, axis = -1, keepdims = True)
-        min_dist = np.minimum(dist, min_dist) if min_dist is not None else dist
-        min_index = np.argmax(min_dist)
-        target = np.expand_dims(trans_data[min_index], axis = 0)
-        min_dist[min_index] = 0
-        indices.append(min_index)
+    indices = greedy_coreset(trans_data, n_sample, n_start = n_start, batch_size = batch_size, num_workers = num_workers, seed = seed)
     
     if not index:
         args = [(np.array(arg) if not isinstance(arg, np.ndarray) else arg)[indices] for arg in args]
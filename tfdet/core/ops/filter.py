@@ -0,0 +1,118 @@
+import numpy as np
+import tensorflow as tf
+
+def gaussian_kernel(sigma, size = None):
+    """
+    1-D gaussian kernel.(same as cv2.getGaussianKernel)
+    size = kernel size #if None, 2 * round(4 * sigma) + 1
+    """
+    if size is None:
+        size = 2 * round(4 * sigma) + 1
+    x = np.arange(size, dtype = np.float64) - (size - 1) / 2
+    kernel = np.exp(-np.square(x) / (2 * sigma ** 2))
+    return kernel / np.sum(kernel)
+
+def reflect_indices(size, pad):
+    """
+    indices of reflect_101 padding(cv2.BORDER_REFLECT_101, gfedcb|abcdefgh|gfedcba) for any pad size.
+    """
+    indices = tf.range(-pad, size + pad)
+    period = tf.maximum(2 * (size - 1), 1)
+    indices = tf.math.floormod(tf.abs(indices), period)
+    return tf.minimum(tf.where(size <= indices, period - indices, indices), size - 1)
+
+def gaussian_blur(x, sigma, size = None, method = "conv", fft_size = 32):
+    """
+    Separable gaussian smoothing in graph.(result is same as cv2.GaussianBlur(x, (size, size), sigma) with default border)
+    x = (N, H, W, C) or (H, W, C)
+    size = kernel size #if None, 2 * round(4 * sigma) + 1
+    method = "conv"(two 1-D convolutions), "fft"(2-D fft convolution, faster for large kernel but irfft2d isn't a tflite builtin op), "auto"(fft if fft_size <= size)
+
+    <example>
+    > mask = gaussian_blur(mask, sigma = 4) #(N, H, W, 1)
+    """
+    if size is None:
+        size = 2 * round(4 * sigma) + 1
+    if method == "auto":
+        method = "fft" if fft_size <= size else "conv"
+    if method not in ["conv", "fft"]:
+        raise ValueError("unknown method '{0}'".format(method))
+
+    x = tf.convert_to_tensor(x)
+    ndim = len(x.shape)
+    if ndim == 3:
+        x = tf.expand_dims(x, axis = 0)
+    dtype = x.dtype
+    out = tf.cast(x, tf.float32) if dtype != tf.float32 else x
+    shape = tf.shape(out)
+
+    #(N, H, W, C) > (N * C, H, W, 1)
+    out = tf.reshape(tf.transpose(out, [0, 3, 1, 2]), [-1, shape[1], shape[2], 1])
+    pad = size // 2
+    out = tf.gather(out, reflect_indices(shape[1], pad), axis = 1)
+    out = tf.gather(out, reflect_indices(shape[2], pad), axis = 2)
+
+    kernel = gaussian_kernel(sigma, size).astype(np.float32)
+    if method == "conv":
+        out = tf.nn.depthwise_conv2d(out, tf.constant(kernel.reshape([size, 1, 1, 1])), strides = [1, 1, 1, 1], padding = "VALID")
+        out = tf.nn.depthwise_conv2d(out, tf.constant(kernel.reshape([1, size, 1, 1])), strides = [1, 1, 1, 1], padding = "VALID")
+    else:
+        out = out[..., 0]
+        fft_shape = tf.shape(out)[1:]
+        kernel = tf.constant(np.outer(kernel, kernel))
+        out = tf.signal.irfft2d(tf.signal.rfft2d(out, fft_shape) * tf.signal.rfft2d(kernel, fft_shape), fft_shape)
+        out = tf.expand_dims(out[:, size - 1:size - 1 + shape[1], size - 1:size - 1 + shape[2]], axis = -1)
+
+    #(N * C, H, W, 1) > (N, H, W, C)
+    out = tf.transpose(tf.reshape(out, [shape[0], shape[3], shape[1], shape[2]]), [0, 2, 3, 1])
+    if dtype != tf.float32:
+        out = tf.cast(out, dtype)
+    if ndim == 3:
+        out = out[0]
+    return out
+
+def pad_window(x, kernel_size, value):
+    """
+    pad x(N, H, W, C) by anchor of kernel(kernel_size // 2, same as cv2) for "VALID" window.
+    """
+    if not isinstance(kernel_size, (tuple, list)):
+        kernel_size = [kernel_size] * 2
+    paddings = [[0, 0]] + [[k // 2, k - 1 - k // 2] for k in kernel_size] + [[0, 0]]
+    return tf.pad(x, paddings, constant_values = value), kernel_size
+
+def dilate(x, kernel_size = 3):
+    """
+    Dilation by rectangular kernel in graph.(same as cv2.dilate(x, np.ones(kernel_size)) with default border)
+    x = (N, H, W, C)
+    """
+    x = tf.convert_to_tensor(x)
+    out, kernel_size = pad_window(x, kernel_size, x.dtype.min)
+    return tf.nn.max_pool2d(out, kernel_size, strides = 1, padding = "VALID")
+
+def erode(x, kernel_size = 3):
+    """
+    Erosion by rectangular kernel in graph.(same as cv2.erode(x, np.ones(kernel_size)) with default border)
+    x = (N, H, W, C)
+    """
+    x = tf.convert_to_tensor(x)
+    out, kernel_size = pad_window(-x, kernel_size, x.dtype.min)
+    return -tf.nn.max_pool2d(out, kernel_size, strides = 1, padding = "VALID")
+
+def morphology(x, kernel_size = 3, method = "open"):
+    """
+    Morphological transformation by rectangular kernel in graph.(same as cv2.morphologyEx)
+    x = (N, H, W, C)
+    method = "open"(erode > dilate), "close"(dilate > erode), "erode", "dilate"
+
+    <example>
+    > mask = morphology(mask, 4, method = "open")
+    """
+    if method == "open":
+        return dilate(erode(x, kernel_size), kernel_size)
+    elif method == "close":
+        return erode(dilate(x, kernel_size), kernel_size)
+    elif method == "erode":
+        return erode(x, kernel_size)
+    elif method == "dilate":
+        return dilate(x, kernel_size)
+    raise ValueError("unknown method '{0}'".format(method))
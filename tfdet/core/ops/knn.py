@@ -0,0 +1,152 @@
+import tensorflow as tf
+import numpy as np
+
+def assign_cluster(x, centroid, batch_size = 16384):
+    centroid_norm = np.sum(np.square(centroid), axis = -1)
+    label = [np.argmin(centroid_norm - 2 * np.matmul(x[index:index + batch_size], centroid.T), axis = -1) for index in range(0, len(x), batch_size)]
+    return np.concatenate(label).astype(np.int32) if 0 < len(label) else np.zeros(0, dtype = np.int32)
+
+def kmeans(x, n_cluster = 8, n_iter = 20, batch_size = 16384, seed = 0):
+    """
+    Lloyd's k-means by numpy.
+    
+    x = (N, C) > centroid(n_cluster, C), label(N,)
+    """
+    random = np.random.RandomState(seed)
+    x = np.asarray(x, dtype = np.float32)
+    n_cluster = max(min(n_cluster, len(x)), 1)
+    centroid = x[random.choice(len(x), n_cluster, replace = False)]
+    for _ in range(n_iter):
+        label = assign_cluster(x, centroid, batch_size = batch_size)
+        count = np.bincount(label, minlength = n_cluster)
+        order = np.argsort(label, kind = "stable")
+        exist = np.argwhere(0 < count)[:, 0]
+        centroid = centroid.copy()
+        centroid[exist] = np.add.reduceat(x[order], np.cumsum(count)[exist] - count[exist], axis = 0) / count[exist, None]
+        if len(exist) < n_cluster: #reinitialize empty cluster
+            empty = np.argwhere(count == 0)[:, 0]
+            centroid[empty] = x[random.choice(len(x), len(empty), replace = False)]
+    return centroid, assign_cluster(x, centroid, batch_size = batch_size)
+
+class KNNIndex:
+    def __init__(self, feature_vector, n_list = "auto", n_probe = 8, n_subvector = None, n_centroid = 256, refine = 4, n_train = 32768, n_iter = 10, seed = 0):
+        """
+        Inverted file index(IVF) for approximate k nearest neighbor by euclidean distance.
+        Each query searches only n_probe of n_list clusters.(optionally product quantized residual(IVF-PQ) for memory)
+        
+        n_list = coarse cluster count("auto" > sqrt(N)), n_probe = coarse clusters to search for each query
+        n_subvector = None > keep vectors(IVF-Flat), int > code bytes per vector(largest divisor of channel under n_subvector, smaller memory with refine = 0 but slower lookup)
+        n_centroid = centroids per subvector(<= 256)
+        refine = re-rank k * refine candidates of product quantizer by exact distance(0 > vectors aren't kept)
+        n_train = samples for training centroids
+        
+        <example>
+        > index = KNNIndex(feature_vector, n_probe = 8)
+        > dist = index.search(feature, k = 9) #(N, k) sorted
+        """
+        feature_vector = np.reshape(np.asarray(feature_vector, dtype = np.float32), [len(feature_vector), -1])
+        n_vector, n_channel = np.shape(feature_vector)
+        if n_list == "auto":
+            n_list = int(np.sqrt(n_vector))
+        self.n_probe = n_probe
+        self.n_subvector = max([d for d in range(1, max(min(n_subvector, n_channel), 1) + 1) if n_channel % d == 0]) if n_subvector is not None else None
+        self.n_centroid = max(min(n_centroid, 256), 1)
+        self.refine = refine if self.n_subvector is not None else 0
+        self.size = n_vector
+        
+        random = np.random.RandomState(seed)
+        train_indices = random.choice(n_vector, min(n_train, n_vector), replace = False)
+        
+        #coarse quantizer
+        self.centroid = kmeans(feature_vector[train_indices], max(min(n_list, n_vector), 1), n_iter = n_iter, seed = seed)[0]
+        self.n_list = len(self.centroid)
+        self.n_probe = max(min(self.n_probe, self.n_list), 1)
+        label = assign_cluster(feature_vector, self.centroid)
+        order = np.argsort(label, kind = "stable")
+        self.offset = np.concatenate([[0], np.cumsum(np.bincount(label, minlength = self.n_list))]).astype(np.int32)
+        
+        self.codebook = self.code = None
+        if self.n_subvector is not None:
+            #product quantizer of residual
+            residual = (feature_vector - self.centroid[label]).reshape([n_vector, self.n_subvector, -1])
+            codebook, code = [], []
+            for j in range(self.n_subvector):
+                _codebook = kmeans(residual[train_indices, j], self.n_centroid, n_iter = n_iter, seed = seed + j)[0]
+                codebook.append(np.pad(_codebook, [[0, self.n_centroid - len(_codebook)], [0, 0]])) #padded centroid isn't used by code
+                code.append(assign_cluster(residual[:, j], _codebook))
+            self.codebook = np.stack(codebook) #(n_subvector, n_centroid, sub_channel)
+            self.code = np.stack(code, axis = -1)[order].astype(np.uint8) #(N, n_subvector)
+        self.feature_vector = np.concatenate([feature_vector[order], np.zeros([1, n_channel], dtype = np.float32)]) if self.n_subvector is None or 0 < self.refine else None #last row is dummy for padded candidate
+        self.tensors = {}
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["tensors"] = {}
+        return state
+    
+    def __len__(self):
+        return self.size
+    
+    @property
+    def nbytes(self):
+        return sum([arr.nbytes for arr in [self.centroid, self.offset, self.codebook, self.code, self.feature_vector] if arr is not None])
+    
+    def get_tensor(self, name):
+        if name not in self.tensors:
+            with tf.init_scope(): #captured by reference instead of embedding constant into every graph
+                self.tensors[name] = tf.constant(getattr(self, name))
+        return self.tensors[name]
+    
+    def search(self, u, k = 1):
+        """
+        u = (N, C) > sorted approximate euclidean distance of k nearest vectors (N, k)
+        """
+        u = tf.convert_to_tensor(u, dtype = tf.float32) if not tf.is_tensor(u) else u
+        k = min(k, self.size)
+        n_candidate = k * self.refine if 0 < self.refine else k
+        centroid = tf.cast(self.get_tensor("centroid"), u.dtype)
+        offset = self.get_tensor("offset")
+        feature_vector = tf.cast(self.get_tensor("feature_vector"), u.dtype) if self.feature_vector is not None else None
+        
+        #coarse search
+        coarse_dist = tf.reduce_sum(tf.square(centroid), axis = -1)[None] - 2 * tf.matmul(u, centroid, transpose_b = True)
+        probe = tf.math.top_k(-coarse_dist, k = self.n_probe).indices #(N, P)
+        
+        #fine search by cluster(queries that probe the cluster)
+        def search_cluster(cluster, dist, indices):
+            query_indices = tf.where(tf.reduce_any(tf.equal(probe, cluster), axis = -1))[:, 0]
+            _u = tf.gather(u, query_indices)
+            start, end = offset[cluster], offset[cluster + 1]
+            if self.code is None:
+                v = feature_vector[start:end]
+                _dist = tf.reduce_sum(tf.square(_u), axis = -1, keepdims = True) + tf.reduce_sum(tf.square(v), axis = -1)[None] - 2 * tf.matmul(_u, v, transpose_b = True)
+            else:
+                residual = tf.reshape(_u - centroid[cluster], [-1, self.n_subvector, self.centroid.shape[-1] // self.n_subvector])
+                codebook = tf.cast(self.get_tensor("codebook"), u.dtype)
+                table = tf.transpose(tf.reduce_sum(tf.square(residual), axis = -1))[..., None] - 2 * tf.einsum("njd,jsd->jns", residual, codebook) + tf.reduce_sum(tf.square(codebook), axis = -1)[:, None] #(M, S, n_centroid)
+                code = tf.transpose(tf.cast(self.get_tensor("code")[start:end], tf.int32)) #(M, L)
+                _dist = tf.reduce_sum(tf.gather(table, code, axis = 2, batch_dims = 1), axis = 0) #(S, L)
+            _indices = tf.tile(tf.range(start, end)[None], [tf.shape(_dist)[0], 1])
+            _dist = tf.concat([tf.gather(dist, query_indices), _dist], axis = -1)
+            _indices = tf.concat([tf.gather(indices, query_indices), _indices], axis = -1)
+            _dist, top_indices = tf.math.top_k(-_dist, k = n_candidate)
+            _indices = tf.gather(_indices, top_indices, batch_dims = 1)
+            query_indices = tf.expand_dims(query_indices, axis = -1)
+            return cluster + 1, tf.tensor_scatter_nd_update(dist, query_indices, -_dist), tf.tensor_scatter_nd_update(indices, query_indices, _indices)
+        
+        n = tf.shape(u)[0]
+        dist = tf.fill([n, n_candidate], np.inf)
+        indices = tf.fill([n, n_candidate], self.size)
+        dist, indices = tf.while_loop(lambda cluster, dist, indices: cluster < self.n_list, search_cluster, (0, dist, indices))[1:]
+        
+        #refine
+        if self.code is not None and 0 < self.refine:
+            vector = tf.gather(feature_vector, indices) #(N, K, C)
+            dist = tf.where(indices < self.size, tf.reduce_sum(tf.square(tf.expand_dims(u, axis = 1) - vector), axis = -1), np.inf)
+            dist = -tf.math.top_k(-dist, k = k).values
+        
+        #not enough candidate > the farthest found distance
+        valid_flag = tf.math.is_finite(dist)
+        max_dist = tf.reduce_max(tf.where(valid_flag, dist, 0), axis = -1, keepdims = True)
+        dist = tf.where(valid_flag, dist, max_dist)
+        return tf.sqrt(tf.maximum(dist, 0))
@@ -4,8 +4,10 @@ from ..bbox.coder import delta2bbox
 
 @tf.function
 def multiclass_nms(y_pred, bbox_pred, anchors = None, mask_pred = None, proposal_count = 100, iou_threshold = 0.5, score_threshold = 0.05, soft_nms = False, 
-                   ignore_label = 0, performance_count = 5000, coder_func = delta2bbox, **kwargs):
+                   ignore_label = 0, performance_count = 5000, coder_func = delta2bbox, suppression = "greedy", candidate_count = 500, **kwargs):
     """
+    suppression > "greedy"(nms by class), "fast" or "matrix"(parallel_nms by batched_multiclass_nms)
+    
     y_pred = logit #(n_anchor, n_class)
     bbox_pred = delta #(n_anchor, 4) or n_class delta #(n_anchor, n_clss, 4)
     anchors = anchors #(n_anchor, 4) or points #(n_anchor, 2)
@@ -15,6 +17,11 @@ def multiclass_nms(y_pred, bbox_pred, anchors = None, mask_pred = None, proposal
     bbox_pred = normalized proposal [[x1, y1, x2, y2], ...] #(proposal_count, 4)
     mask_pred = mask #(proposal_count, H, W, 1)
     """
+    if suppression != "greedy":
+        result = batched_multiclass_nms(*[tf.expand_dims(arg, axis = 0) if arg is not None else None for arg in [y_pred, bbox_pred, anchors, mask_pred]], proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, 
+                                        ignore_label = ignore_label, performance_count = performance_count, coder_func = coder_func, suppression = suppression, candidate_count = candidate_count, **kwargs)
+        return tuple([r[0] for r in result])
+    
     n_class = tf.keras.backend.int_shape(y_pred)[-1]
     score_threshold = [score_threshold] * n_class if isinstance(score_threshold, float) else score_threshold
     soft_nms_sigma = soft_nms
@@ -105,4 +112,202 @@ def multiclass_nms(y_pred, bbox_pred, anchors = None, mask_pred = None, proposal
         mask_pred = tf.pad(mask_pred, [[0, pad_count], [0, 0], [0, 0], [0, 0]])
         mask_pred = tf.reshape(mask_pred, [proposal_count, h, w, 1])
         result = y_pred, bbox_pred, mask_pred
-    return result
\ No newline at end of file
+    return result
+
+@tf.function
+def batched_multiclass_nms(y_pred, bbox_pred, anchors = None, mask_pred = None, proposal_count = 100, iou_threshold = 0.5, score_threshold = 0.05, soft_nms = False, 
+                           ignore_label = 0, performance_count = 5000, coder_func = delta2bbox, suppression = "greedy", candidate_count = 500, batch_size = 1, **kwargs):
+    """
+    multiclass_nms of whole batch by single non_max_suppression_padded.(class-aware by coordinate offset, same outputs as multiclass_nms by image if proposal_count boxes are kept in top candidate_count candidates)
+    soft_nms is mapped by image with multiclass_nms.(batch_size > parallel iterations)
+    suppression > "greedy"(padded_nms), "fast" or "matrix"(parallel_nms) of top candidate_count candidates
+    
+    y_pred = logit #(batch_size, n_anchor, n_class)
+    bbox_pred = delta #(batch_size, n_anchor, 4) or n_class delta #(batch_size, n_anchor, n_clss, 4)
+    anchors = anchors #(n_anchor, 4) or (batch_size, n_anchor, 4) or points #(n_anchor, 2) or (batch_size, n_anchor, 2)
+    mask_pred = mask #(batch_size, n_anchor, H, W, 1 or n_class)
+
+    y_pred = logit #(batch_size, proposal_count, n_class)
+    bbox_pred = normalized proposal [[x1, y1, x2, y2], ...] #(batch_size, proposal_count, 4)
+    mask_pred = mask #(batch_size, proposal_count, H, W, 1)
+    """
+    if suppression not in ("greedy", "fast", "matrix"):
+        raise ValueError("unknown suppression '{0}'".format(suppression))
+    if suppression == "greedy" and soft_nms is not False and soft_nms != 0.:
+        args = [arg for arg in [y_pred, bbox_pred, anchors, mask_pred] if arg is not None]
+        if anchors is not None and tf.keras.backend.ndim(anchors) == 2:
+            args[2] = tf.tile(tf.expand_dims(anchors, axis = 0), [tf.shape(y_pred)[0], 1, 1])
+        dtype = tuple([y_pred.dtype] * (2 if mask_pred is None else 3))
+        func = lambda args: multiclass_nms(*args[:2], *([args[2]] if anchors is not None else []), **({"mask_pred":args[-1]} if mask_pred is not None else {}), proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, soft_nms = soft_nms, 
+                                           ignore_label = ignore_label, performance_count = performance_count, coder_func = coder_func, **kwargs)
+        return tf.map_fn(func, tuple(args), fn_output_signature = dtype, parallel_iterations = batch_size)
+    
+    n_class = tf.keras.backend.int_shape(y_pred)[-1]
+    score_threshold = [score_threshold] * n_class if isinstance(score_threshold, float) else score_threshold
+    if n_class == 1:
+        ignore_label = None
+    else:
+        ignore_label = [ignore_label] if isinstance(ignore_label, int) else ignore_label
+    keep_label = [i for i in range(n_class) if ignore_label is None or i not in ignore_label]
+    
+    #filtered by label
+    valid_flag = None
+    if ignore_label is not None:
+        label = tf.argmax(y_pred, axis = -1)
+        valid_flag = tf.ones_like(label, dtype = tf.bool)
+        for cls in ignore_label:
+            valid_flag = tf.logical_and(valid_flag, label != cls)
+    
+    #reduce by performance_count
+    if isinstance(performance_count, int) and 0 < performance_count:
+        max_score = tf.reduce_max(y_pred, axis = -1)
+        if valid_flag is not None:
+            max_score = tf.where(valid_flag, max_score, max_score.dtype.min)
+        top_indices = tf.nn.top_k(max_score, tf.minimum(performance_count, tf.shape(y_pred)[1]), sorted = True).indices
+        y_pred = tf.gather(y_pred, top_indices, batch_dims = 1)
+        bbox_pred = tf.gather(bbox_pred, top_indices, batch_dims = 1)
+        if anchors is not None:
+            anchors = tf.gather(anchors, top_indices, batch_dims = 1 if tf.keras.backend.ndim(anchors) == 3 else 0)
+        if mask_pred is not None:
+            mask_pred = tf.gather(mask_pred, top_indices, batch_dims = 1)
+        if valid_flag is not None:
+            valid_flag = tf.gather(valid_flag, top_indices, batch_dims = 1)
+    
+    bbox_flag = (tf.keras.backend.ndim(bbox_pred) == 4)
+    mask_flag = (mask_pred is not None and tf.keras.backend.int_shape(mask_pred)[-1] != 1)
+    if bbox_flag or mask_flag:
+        if n_class == 1:
+            label_indices = tf.zeros(tf.shape(y_pred)[:2], dtype = tf.int32)
+        else:
+            label_indices = tf.argmax(y_pred, axis = -1, output_type = tf.int32)
+        if bbox_flag:
+            bbox_pred = tf.gather(bbox_pred, label_indices, batch_dims = 2)
+        if mask_flag:
+            mask_pred = tf.transpose(mask_pred, [0, 1, 4, 2, 3])
+            mask_pred = tf.gather(mask_pred, label_indices, batch_dims = 2)
+            mask_pred = tf.expand_dims(mask_pred, axis = -1)
+        
+    if anchors is not None and callable(coder_func):
+        bbox_pred = coder_func(anchors, bbox_pred, **kwargs)
+        bbox_pred = tf.clip_by_value(bbox_pred, 0, 1)
+    x1, y1, x2, y2 = tf.split(tf.cast(bbox_pred, tf.float32), 4, axis = -1)
+    bbox = tf.concat([y1, x1, y2, x2], axis = -1)
+    
+    #candidates > valid anchor, keep label and score over threshold of label
+    score = tf.cast(y_pred, tf.float32)
+    flag = None
+    if 1 < len(set(score_threshold)):
+        flag = tf.greater(score, tf.cast(score_threshold, tf.float32))
+    if len(keep_label) < n_class:
+        keep_flag = tf.cast([i in keep_label for i in range(n_class)], tf.bool)
+        flag = tf.logical_and(flag, keep_flag) if flag is not None else tf.broadcast_to(keep_flag, tf.shape(score))
+    if valid_flag is not None:
+        flag = tf.logical_and(flag, tf.expand_dims(valid_flag, axis = -1)) if flag is not None else tf.broadcast_to(tf.expand_dims(valid_flag, axis = -1), tf.shape(score))
+    if flag is not None:
+        score = tf.where(flag, score, float("-inf"))
+    
+    if suppression == "greedy":
+        indices, valid_mask = padded_nms(bbox, score, proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = min(score_threshold), candidate_count = candidate_count)
+    else:
+        indices, valid_mask = parallel_nms(bbox, score, proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, method = suppression, candidate_count = candidate_count)
+    
+    y_pred = tf.gather(y_pred, indices, batch_dims = 1)
+    bbox_pred = tf.gather(bbox_pred, indices, batch_dims = 1)
+    y_pred = tf.where(tf.expand_dims(valid_mask, axis = -1), y_pred, tf.zeros_like(y_pred))
+    bbox_pred = tf.where(tf.expand_dims(valid_mask, axis = -1), bbox_pred, tf.zeros_like(bbox_pred))
+    
+    y_pred = tf.reshape(y_pred, [-1, proposal_count, n_class])
+    bbox_pred = tf.reshape(bbox_pred, [-1, proposal_count, 4])
+    result = y_pred, bbox_pred
+    if mask_pred is not None:
+        h, w = tf.keras.backend.int_shape(mask_pred)[-3:-1]
+        mask_pred = tf.gather(mask_pred, indices, batch_dims = 1)
+        mask_pred = tf.where(valid_mask[..., None, None, None], mask_pred, tf.zeros_like(mask_pred))
+        mask_pred = tf.reshape(mask_pred, [-1, proposal_count, h, w, 1])
+        result = y_pred, bbox_pred, mask_pred
+    return result
+
+
+def padded_nms(bbox, score, proposal_count = 100, iou_threshold = 0.5, score_threshold = 0.05, candidate_count = 500):
+    """
+    greedy class-aware nms of batch by non_max_suppression_padded of top max(candidate_count, proposal_count) (anchor, label) candidates.
+    class is separated by coordinate offset of candidate boxes(float64 for iou of offset boxes), and anchor indices are carried by candidate indices.
+    same as nms by class if proposal_count candidates are kept in candidates.(kept candidate is decided by higher score candidates only)
+    
+    bbox = [[y1, x1, y2, x2], ...] #(batch_size, n_anchor, 4)
+    score = score #(batch_size, n_anchor, n_class)
+    
+    indices = anchor indices #(batch_size, proposal_count), sorted by score
+    valid_mask = valid flag of indices #(batch_size, proposal_count)
+    """
+    n_class = tf.keras.backend.int_shape(score)[-1]
+    candidate_count = max(candidate_count, proposal_count)
+    
+    flat_score = tf.reshape(score, [tf.shape(score)[0], -1])
+    candidate_score, candidate_indices = tf.nn.top_k(flat_score, tf.minimum(candidate_count, tf.shape(flat_score)[1]), sorted = True)
+    anchor_indices = candidate_indices // n_class
+    label = candidate_indices % n_class
+    
+    candidate_bbox = tf.cast(tf.gather(bbox, anchor_indices, batch_dims = 1), tf.float64)
+    offset = tf.reduce_max(candidate_bbox, axis = [1, 2]) - tf.reduce_min(candidate_bbox, axis = [1, 2]) + 1
+    candidate_bbox = candidate_bbox + tf.expand_dims(tf.cast(label, tf.float64) * tf.expand_dims(offset, axis = -1), axis = -1)
+    top_indices, valid_count = tf.image.non_max_suppression_padded(candidate_bbox, candidate_score, proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, pad_to_max_output_size = True, sorted_input = True, tile_size = 64) #small tile > fewer self suppression iterations
+    
+    indices = tf.gather(anchor_indices, top_indices, batch_dims = 1)
+    valid_mask = tf.sequence_mask(valid_count, proposal_count)
+    return indices, valid_mask
+
+def parallel_nms(bbox, score, proposal_count = 100, iou_threshold = 0.5, score_threshold = 0.05, method = "matrix", candidate_count = 500, sigma = 2.):
+    """
+    class-aware nms of batch by one iou matrix of top max(candidate_count, proposal_count) (anchor, label) candidates.(without sequential loop, exportable by tf2onnx/tf2lite)
+    
+    method > "fast" : candidate is dropped if iou with higher score candidate of same label is over iou_threshold.(Fast NMS of YOLACT, dropped candidates can suppress too)
+             "matrix" : score is decayed by exp(-sigma * (iou ** 2 - compensate iou ** 2)) and candidate is dropped if decayed score isn't over score_threshold.(Matrix NMS of SOLOv2, iou_threshold isn't used)
+    
+    bbox = [[y1, x1, y2, x2], ...] #(batch_size, n_anchor, 4)
+    score = score #(batch_size, n_anchor, n_class)
+    
+    indices = anchor indices #(batch_size, proposal_count), sorted by (decayed) score
+    valid_mask = valid flag of indices #(batch_size, proposal_count)
+    """
+    if method not in ("fast", "matrix"):
+        raise ValueError("unknown method '{0}'".format(method))
+    n_class = tf.keras.backend.int_shape(score)[-1]
+    score_threshold = tf.cast([score_threshold] * n_class if isinstance(score_threshold, float) else score_threshold, score.dtype)
+    candidate_count = max(candidate_count, proposal_count)
+    
+    flat_score = tf.reshape(score, [tf.shape(score)[0], -1])
+    candidate_score, candidate_indices = tf.nn.top_k(flat_score, tf.minimum(candidate_count, tf.shape(flat_score)[1]), sorted = True)
+    anchor_indices = candidate_indices // n_class
+    label = candidate_indices % n_class
+    valid_flag = tf.greater(candidate_score, tf.gather(score_threshold, label))
+    
+    y1, x1, y2, x2 = tf.split(tf.gather(bbox, anchor_indices, batch_dims = 1), 4, axis = -1) #(batch_size, candidate_count, 1)
+    area = (y2 - y1) * (x2 - x1)
+    inter_h = tf.maximum(tf.minimum(y2, tf.transpose(y2, [0, 2, 1])) - tf.maximum(y1, tf.transpose(y1, [0, 2, 1])), 0)
+    inter_w = tf.maximum(tf.minimum(x2, tf.transpose(x2, [0, 2, 1])) - tf.maximum(x1, tf.transpose(x1, [0, 2, 1])), 0)
+    inter = inter_h * inter_w
+    overlaps = inter / tf.maximum(area + tf.transpose(area, [0, 2, 1]) - inter, tf.keras.backend.epsilon()) #(batch_size, candidate_count, candidate_count)
+    
+    #suppressor(row) should have higher score, same label and valid score.
+    r = tf.range(tf.shape(candidate_score)[1])
+    flag = tf.logical_and(tf.expand_dims(r, axis = -1) < tf.expand_dims(r, axis = 0), tf.equal(tf.expand_dims(label, axis = -1), tf.expand_dims(label, axis = 1)))
+    flag = tf.logical_and(flag, tf.expand_dims(valid_flag, axis = -1))
+    overlaps = tf.where(flag, overlaps, tf.zeros_like(overlaps))
+    max_overlaps = tf.reduce_max(overlaps, axis = 1)
+    
+    if method == "fast":
+        keep_flag = tf.logical_and(valid_flag, tf.less_equal(max_overlaps, iou_threshold))
+    else:
+        decay = tf.reduce_min(tf.exp(-sigma * (tf.square(overlaps) - tf.expand_dims(tf.square(max_overlaps), axis = -1))), axis = 1)
+        candidate_score = candidate_score * decay
+        keep_flag = tf.logical_and(valid_flag, tf.greater(candidate_score, tf.gather(score_threshold, label)))
+    candidate_score = tf.where(keep_flag, candidate_score, candidate_score.dtype.min)
+    
+    top_indices = tf.nn.top_k(candidate_score, tf.minimum(proposal_count, tf.shape(candidate_score)[1]), sorted = True).indices
+    indices = tf.gather(anchor_indices, top_indices, batch_dims = 1)
+    valid_mask = tf.gather(keep_flag, top_indices, batch_dims = 1)
+    pad_count = tf.maximum(proposal_count - tf.shape(indices)[1], 0)
+    indices = tf.pad(indices, [[0, 0], [0, pad_count]])
+    valid_mask = tf.pad(valid_mask, [[0, 0], [0, pad_count]])
+    return indices, valid_mask
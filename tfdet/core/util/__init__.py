@@ -1,4 +1,4 @@
 from .log import metric2text, concat_text
-from .random import set_python_seed, set_random_seed, set_numpy_seed, set_tensorflow_seed, set_seed
+from .random import set_python_seed, set_random_seed, set_numpy_seed, set_tensorflow_seed, set_seed, set_determinism, set_threads
 from .tf import get_batch_size, get_item, map_fn, convert_to_numpy, convert_to_pickle, convert_to_ragged_tensor, convert_to_tensor, py_func, to_categorical, pipeline, zip_pipeline, concat_pipeline, stack_pipeline, save_model, load_model, get_device, select_device, EMA
 from .wrapper import dict_function
\ No newline at end of file
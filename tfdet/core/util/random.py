@@ -15,9 +15,9 @@ def set_random_seed(seed = 0):
 def set_numpy_seed(seed = 0):
     np.random.seed(seed)
 
-def set_tensorflow_seed(seed = 0, determinism = False):
+def set_determinism(determinism = True):
     """
-    # This is the random seed initialization code that has to be at the beginning.
+    Deterministic op execution.(thread pools are kept, so multi-threaded execution is still available)
     """
     if determinism:
         tf_version = float(".".join(tf.__version__.split(".")[:2]))
@@ -34,15 +34,46 @@ def set_tensorflow_seed(seed = 0, determinism = False):
                     patch()
                 except:
                     print("Please install 'tensorflow-determinism', and it will be more specific.")
+    else:
+        if hasattr(tf.config.experimental, "disable_op_determinism"):
+            tf.config.experimental.disable_op_determinism()
+        for key in ["TF_DETERMINISTIC_OPS", "TF_CUDNN_DETERMINISTIC"]:
+            os.environ.pop(key, None)
+
+def set_threads(inter_op_threads = None, intra_op_threads = None):
+    """
+    threads = None > keep current(default by tensorflow), 0 > system picks, 1 > single thread
+    # This has to be at the beginning.(before tensorflow runtime is initialized)
+    """
+    if inter_op_threads is not None:
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    if intra_op_threads is not None:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+
+def set_tensorflow_seed(seed = 0, determinism = False, inter_op_threads = None, intra_op_threads = None):
+    """
+    # This is the random seed initialization code that has to be at the beginning.
+    determinism > deterministic op execution.(set_determinism)
+    inter_op_threads, intra_op_threads > thread pool size #None > keep current, 1 > single thread(strictest, slowest)
+    """
+    set_threads(inter_op_threads, intra_op_threads)
+    if determinism:
+        set_determinism(determinism)
     tf.random.set_seed(seed)
-    tf.config.threading.set_inter_op_parallelism_threads(1)
-    tf.config.threading.set_intra_op_parallelism_threads(1)
             
-def set_seed(seed = 0, determinism = False):
+def set_seed(seed = 0, determinism = False, inter_op_threads = None, intra_op_threads = None):
     """
     # This is the random seed initialization code that has to be at the beginning.
+    seed > python, random, numpy, tensorflow seed
+    determinism > deterministic op execution.(set_determinism)
+    inter_op_threads, intra_op_threads > thread pool size #None > keep current, 1 > single thread(strictest, slowest)
+    
+    <example>
+    > set_seed(0) #reproducible random state with multi-threaded execution
+    > set_seed(0, determinism = True) #+ deterministic ops
+    > set_seed(0, determinism = True, inter_op_threads = 1, intra_op_threads = 1) #+ single thread
     """
     set_python_seed(seed)
     set_random_seed(seed)
     set_numpy_seed(seed)
-    set_tensorflow_seed(seed, determinism = determinism)
\ No newline at end of file
+    set_tensorflow_seed(seed, determinism = determinism, inter_op_threads = inter_op_threads, intra_op_threads = intra_op_threads)
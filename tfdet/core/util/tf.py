@@ -149,7 +149,10 @@ def to_categorical(y, n_class = None, label_smoothing = 0.1):
     
 def pipeline(dataset, function = None,
              batch_size = 0, repeat = 1, shuffle = False, prefetch = False,
-             cache = False, num_parallel_calls = True):
+             cache = False, num_parallel_calls = True, bucket = None):
+    """
+    bucket = key function of element for bucketed padded batch(group_by_window like bucket_by_sequence_length) #ex. tfdet.dataset.util.BucketSampler
+    """
     if not isinstance(dataset, tf.data.Dataset):
         dataset = tf.data.Dataset.from_tensor_slices(dataset)
     for func in function if 0 < np.ndim(function) else [function]:
@@ -187,7 +190,10 @@ def pipeline(dataset, function = None,
                 padded_shape = padded_shape[0]
             elif isinstance(dataset.element_spec, tuple):
                 padded_shape = tuple(padded_shape)
-        dataset = dataset.padded_batch(batch_size, padded_shapes = padded_shape)
+        if callable(bucket):
+            dataset = dataset.group_by_window(lambda *args: tf.cast(bucket(*args), tf.int64), lambda key, window: window.padded_batch(batch_size, padded_shapes = padded_shape), window_size = batch_size)
+        else:
+            dataset = dataset.padded_batch(batch_size, padded_shapes = padded_shape)
     if 1 < repeat:
         dataset = dataset.repeat(repeat)
     if prefetch:
@@ -323,6 +329,8 @@ class EMA:
     https://www.tensorflow.org/api_docs/python/tf/train/ExponentialMovingAverage
     https://github.com/WongKinYiu/yolov7/blob/main/utils/torch_utils.py
     
+    shadow weights(and backup) are non-trainable tf.Variable keyed by variable path, so update/apply/restore are assign ops on device.(one graph call in eager, or ops in train step)
+    
     1) ema = EMA(model, decay = 0.9999)
     2) update_callback = tf.keras.callbacks.LambdaCallback(on_train_batch_end = lambda step, logs: ema.update() if (step + 1) % 4 == 0 else None)
     3) apply_callback = tf.keras.callbacks.LambdaCallback(on_epoch_end = lambda epoch, logs:ema.apply(), on_epoch_begin = lambda epoch, logs:ema.restroe())
@@ -330,37 +338,106 @@ class EMA:
                  callbacks=[...,
                             update_callback,
                             apply_callback])
+    or ema.update() in custom train_step(in-graph update)
     """
     def __init__(self, model, decay = 0.9999, n_update = 0, ramp = 2000, init_model = None):
         self.model = model
-        self.decay = ((lambda x: decay * (1 - np.exp(-x / ramp))) if isinstance(ramp, (int, float)) and ramp != 0 else (lambda x: decay))
-        self.n_update = n_update
+        self.decay = decay
+        self.ramp = ramp if isinstance(ramp, (int, float)) and ramp != 0 else None
+        with tf.init_scope():
+            self.step = tf.Variable(n_update, dtype = tf.int64, trainable = False, name = "ema_n_update")
         
         self.weights = {}
         self.backup = {}
+        self.applied = False
+        self.function = {}
         self.reset(init_model)
     
+    @property
+    def n_update(self):
+        return int(self.step.numpy())
+    
+    @n_update.setter
+    def n_update(self, value):
+        self.step.assign(value)
+    
+    def get_weights(self, model = None):
+        return (model if isinstance(model, tf.keras.Model) else self.model).trainable_weights
+    
+    def get_key(self, weight):
+        return getattr(weight, "path", None) or weight.name
+    
+    def get_decay(self, n_update):
+        if self.ramp is None:
+            return tf.constant(self.decay, dtype = tf.float32)
+        return self.decay * (1 - tf.exp(-tf.cast(n_update, tf.float32) / self.ramp))
+    
+    def track(self, weights, reset = False):
+        """
+        shadow(and backup) by variable path. shadow of new or reshaped weight starts from current value.(trainable set changed after reset, ex. unfreeze)
+        """
+        keys = [self.get_key(w) for w in weights]
+        for key, w in zip(keys, weights):
+            s = self.weights.get(key)
+            if s is None or s.shape != w.shape:
+                with tf.init_scope():
+                    self.weights[key] = tf.Variable(tf.convert_to_tensor(w), trainable = False, name = "ema_weight")
+                    self.backup[key] = tf.Variable(tf.convert_to_tensor(w), trainable = False, name = "ema_backup")
+                self.function = {}
+            elif reset:
+                s.assign(tf.cast(w, s.dtype))
+        if reset and len(self.weights) != len(set(keys)):
+            self.weights = {key:self.weights[key] for key in keys}
+            self.backup = {key:self.backup[key] for key in keys}
+            self.function = {}
+        return keys
+    
     def reset(self, model = None):
-        self.weights = {}
-        self.backup = {}
-        for w in (model if isinstance(model, tf.keras.Model) else self.model).trainable_weights:
-            self.weights[w.name] = np.array(w)
-            
+        self.track(self.get_weights(model), reset = True)
+        self.applied = False
+    
+    def run(self, name, model = None):
+        """
+        eager > cached tf.function by model and trainable weights(one graph call), graph > assign ops.
+        """
+        weights = self.get_weights(model)
+        keys = self.track(weights)
+        if not tf.executing_eagerly():
+            return getattr(self, "{0}_graph".format(name))(weights)
+        key = (name, id(model if isinstance(model, tf.keras.Model) else self.model), tuple(keys))
+        if key not in self.function:
+            self.function[key] = tf.function(functools.partial(getattr(self, "{0}_graph".format(name)), weights))
+        return self.function[key]()
+    
+    def update_graph(self, weights):
+        n_update = self.step.assign_add(1)
+        decay = self.get_decay(n_update)
+        for w in weights:
+            s = self.weights[self.get_key(w)]
+            if s.dtype.is_floating:
+                s.assign_sub((1 - tf.cast(decay, s.dtype)) * (s - tf.cast(w, s.dtype)))
+        return n_update
+    
+    def apply_graph(self, weights):
+        for w in weights:
+            key = self.get_key(w)
+            self.backup[key].assign(tf.cast(w, self.backup[key].dtype))
+            w.assign(tf.cast(self.weights[key], w.dtype))
+        return True
+    
+    def restore_graph(self, weights):
+        for w in weights:
+            w.assign(tf.cast(self.backup[self.get_key(w)], w.dtype))
+        return True
+    
     def update(self, model = None):
-        self.n_update += 1
-        decay = self.decay(self.n_update)
-        for w in (model if isinstance(model, tf.keras.Model) else self.model).trainable_weights:
-            if w.dtype.is_floating:
-                self.weights[w.name] = (1 - decay) * np.array(w) + (decay * self.weights[w.name])
-
+        return self.run("update", model)
+    
     def apply(self, model = None):
-        for w in (model if isinstance(model, tf.keras.Model) else self.model).trainable_weights:
-            self.backup[w.name] = np.array(w)
-            tf.keras.backend.set_value(w, self.weights[w.name])
+        self.run("apply", model)
+        self.applied = True
             
     def restore(self, model = None):
-        if 0 < len(self.backup):
-            for w in (model if isinstance(model, tf.keras.Model) else self.model).trainable_weights:
-                if w.name in self.backup:
-                    tf.keras.backend.set_value(w, self.backup[w.name])
-            self.backup = {}
+        if self.applied:
+            self.run("restore", model)
+            self.applied = False
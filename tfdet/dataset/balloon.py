@@ -6,6 +6,7 @@ import numpy as np
 import tensorflow as tf
 
 from .dataset import Dataset
+from .util.cache import exists_cache
 from .util.file import load_json
 from tfdet.core.util import pipeline, py_func
 
@@ -111,7 +112,7 @@ def load_dataset(path, mask = False,
     > pipe = tfdet.dataset.pipeline.key_map(pipe, batch_size = 16, shuffle = False, prefetch = True)
     > next(iter(dataset))
     """
-    if isinstance(cache, str) and os.path.exists(cache):
+    if exists_cache(cache):
         return Dataset(transform = transform, shuffle = shuffle, cache = cache, keys = ["x_true", "y_true", "bbox_true", "mask_true"])
     else:
         balloon = get(path, refresh = refresh)
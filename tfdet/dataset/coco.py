@@ -6,7 +6,7 @@ import numpy as np
 import tensorflow as tf
 
 from .dataset import Dataset
-from .util import load_json
+from .util import load_json, exists_cache
 from tfdet.core.util import pipeline, py_func
 
 LABEL = ["background", #background
@@ -255,7 +255,7 @@ def load_dataset(path, data_path, mask = False, crowd = False, label = LABEL,
     """
     transform = ([transform] if not isinstance(transform, (list, tuple)) else list(transform)) if transform is not None else []
     
-    if isinstance(cache, str) and os.path.exists(cache):
+    if exists_cache(cache):
         return Dataset(transform = [load_annotation] + transform, shuffle = shuffle, cache = cache, keys = ["x_true", "y_true", "bbox_true", "mask_true"])
     else:
         coco = get(path, refresh = refresh)
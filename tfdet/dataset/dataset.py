@@ -1,14 +1,16 @@
 import functools
+import hashlib
+import marshal
 import os
 import inspect
-from multiprocessing.pool import ThreadPool
 
 import numpy as np
 import tensorflow as tf
 
 from tfdet.builder import build_transform
 from tfdet.core.util import dict_function, py_func, pipeline
-from tfdet.dataset.util import save_pickle, load_pickle
+from tfdet.dataset.util import Executor, save_pickle, exists_cache, load_cache, pad_stack
+from tfdet.dataset.util.cache import is_pickle_cache, init_cache, get_shard_indices, get_shard_fingerprint, get_fingerprint, save_shard
 
 def multi_transform(function = None, sample_size = None):
     def wrapper(function):
@@ -23,12 +25,36 @@ def multi_transform(function = None, sample_size = None):
             function = None
     return wrapper
 
+def get_transform_fingerprint(transform):
+    """
+    fingerprint of transform spec.(function name, code and keyword arguments)
+    """
+    spec = []
+    for func in (transform if isinstance(transform, (tuple, list)) else [transform]):
+        if not callable(func):
+            continue
+        keywords = {}
+        while isinstance(func, functools.partial):
+            keywords = {**func.keywords, **keywords}
+            func = func.func
+        if hasattr(func, "__code__"):
+            func = (func.__module__, func.__qualname__, hashlib.md5(marshal.dumps(func.__code__)).hexdigest())
+        spec.append((func, get_fingerprint(keywords)))
+    return get_fingerprint(spec)
+
+def get_preprocess_item(dataset, index):
+    return dataset.get(index, transform = dataset.preprocess)
+
+def get_item(dataset, index):
+    return dataset.get(index)
+
 class Dataset:
-    def __init__(self, *args, transform = None, preprocess = None, shuffle = False, cache = None, keys = ["x_true", "y_true", "bbox_true", "mask_true"]):
+    def __init__(self, *args, transform = None, preprocess = None, shuffle = False, cache = None, keys = ["x_true", "y_true", "bbox_true", "mask_true"], executor = "thread", num_parallel_calls = 8):
         """
         args > x_true, y_true, bbox_true, mask_true(optional) style args or custom args(should change keys) or dataset
         transform or preprocess > {'name':transform name or func, **kwargs} or transform name or func #find module in tfdet.dataset.transform and map kwargs.
                                   kwargs["sample_size"] > Covnert transform into multi_transform.(If transform doesn't need sample_size.)
+        executor > "thread", "process" or worker count(thread) for preprocess.("process" pickles dataset to each worker once and returns image arrays by shared memory)
         
         <example>
         1. basic
@@ -41,8 +67,9 @@ class Dataset:
                                                        {"name":"normalize", "mean":[123.675, 116.28, 103.53], "std":[58.395, 57.12, 57.375]}], #post-apply transform
                                           preprocess = [], #pre-apply transform
                                           shuffle = False, #when item 0 is called, shuffle indices.(Recommended by 1 GPU)
-                                          cache = "dataset.cache", #save cache after preprocess
-                                          keys = ["x_true", "y_true", "bbox_true", "mask_true"]) #transform mapping keys for args
+                                          cache = "dataset.cache", #save cache after preprocess(sharded columnar cache directory that is loaded by memory map, pickle file if path ends with ".pkl")
+                                          keys = ["x_true", "y_true", "bbox_true", "mask_true"], #transform mapping keys for args
+                                          executor = "thread", num_parallel_calls = 8) #preprocess worker pool
         > dataset[i] #or next(iter(dataset))
         
         2. dataset
@@ -75,6 +102,8 @@ class Dataset:
         self.shuffle = shuffle
         self.cache = cache
         self.keys = keys
+        self.executor = executor
+        self.num_parallel_calls = num_parallel_calls
         
         self.prepare()
 
@@ -160,74 +189,159 @@ class Dataset:
         return item[0] if len(item) == 1 else tuple(item)
     
     def prepare(self):
-        if isinstance(self.cache, str) and os.path.exists(self.cache):
-            args = load_pickle(self.cache)
+        if exists_cache(self.cache):
+            args = load_cache(self.cache)
         else:
             self.set_length()
             self.set_indices()
             args = self.args
-            if any([callable(func) for func in self.preprocess]):
-                indices = self.indices
-
-                iter_data = ThreadPool(8).imap(lambda index: self.get(index, transform = self.preprocess), indices)
-                try:
-                    from tqdm import tqdm
-                    iter_data = tqdm(iter_data, total = len(indices), desc = "Preprocessing Data")
-                except:
-                    pass
-                
-                iter_data = list(iter_data)
-                args = self.stack(*iter_data)
-                if hasattr(iter_data, "close"):
-                    iter_data.close()
-            #args = (args,) if not isinstance(args, tuple) else args
-            if isinstance(self.cache, str) and not os.path.exists(self.cache):
-                save_pickle(args, self.cache)
+            preprocess = any([callable(func) for func in self.preprocess])
+            if isinstance(self.cache, str) and not is_pickle_cache(self.cache) and (preprocess or not isinstance(args[0], Dataset)):
+                self.build_cache(preprocess = preprocess)
+                args = load_cache(self.cache)
+            else:
+                if preprocess:
+                    args = self.stack(*self.run_preprocess(self.indices))
+                if isinstance(self.cache, str) and not os.path.exists(self.cache):
+                    save_pickle(args, self.cache)
         self.args = args
         self.set_length()
         self.set_indices()
     
+    def run_preprocess(self, indices, executor = None, desc = "Preprocessing Data"):
+        close = executor is None
+        if executor is None:
+            executor = Executor(self, self.executor, num_workers = self.num_parallel_calls)
+        iter_data = executor.imap(get_preprocess_item, indices, chunksize = 1 if not executor.is_process else max(len(indices) // (executor.num_workers * 16), 1))
+        try:
+            from tqdm import tqdm
+            iter_data = tqdm(iter_data, total = len(indices), desc = desc)
+        except:
+            pass
+        iter_data = list(iter_data)
+        if close:
+            executor.close()
+        return iter_data
+    
+    def fingerprint(self, indices, transform = None):
+        """
+        fingerprint of items by indices.(input args or fingerprint of inner dataset, and transform spec)
+        """
+        transform = self.transform if transform is None else transform
+        if isinstance(self.args[0], Dataset):
+            dataset = self.args[0]
+            args = (dataset.fingerprint(dataset.indices[indices]),)
+        else:
+            args = self.slice(*self.args, indices = indices)
+        return get_fingerprint(get_fingerprint(*args), get_transform_fingerprint(transform))
+    
+    def build_cache(self, preprocess = True):
+        """
+        Build sharded columnar cache. Shards whose input args(or inner dataset) and preprocess are not changed are reused.(partial rebuild)
+        """
+        init_cache(self.cache, self.length)
+        shard_indices = get_shard_indices(self.length)
+        with Executor(self, self.executor, num_workers = self.num_parallel_calls) as executor:
+            for shard, indices in enumerate(shard_indices):
+                fingerprint = self.fingerprint(indices, transform = self.preprocess if preprocess else [])
+                if get_shard_fingerprint(self.cache, shard) == fingerprint:
+                    continue
+                if preprocess:
+                    args = self.stack(*self.run_preprocess(indices, executor = executor, desc = "Preprocessing Data({0}/{1})".format(shard + 1, len(shard_indices))))
+                else:
+                    args = self.slice(*self.args, indices = indices)
+                save_shard(args, self.cache, shard, fingerprint = fingerprint)
+    
     def __getitem__(self, index):
         if index == 0 and self.shuffle:
             self.set_indices(self.shuffle)
         return self.get(self.indices[index])
     
 
-def PipeLoader(dataset, batch_size = 0, repeat = 1, shuffle = False, prefetch = False, num_parallel_calls = True, dtype = None):
+def PipeLoader(dataset, batch_size = 0, repeat = 1, shuffle = False, prefetch = False, num_parallel_calls = True, dtype = None, bucket = None,
+               batch_load = False, executor = "thread", num_workers = 8, output_signature = None):
     """
     Convert tf pipeline (=torch dataloader)
     
+    batch_load > load a batch of indices by one py_func call with executor(worker pool), and return stacked(padded) arrays.(batch_size > 0)
+    executor > "thread", "process" or worker count(thread) for batch_load.
+    output_signature > tf.TensorSpec(or tuple of them) of item. #dtype and shape without loading dataset[0] in construction
+    
     <example>
     > dataset = tfdet.dataset.Dataset(*args)
-    > pipe = tfdet.dataset.PipeLoader(dataset)
+    > pipe = tfdet.dataset.PipeLoader(dataset) #bucket = tfdet.dataset.util.BucketSampler(dataset) > batch by aspect ratio bucket
     > pipe = tfdet.dataset.pipeline.args2dict(pipe) #for train_model
     > pipe = tfdet.dataset.pipeline.collect(pipe) #optional for semantic segmentation
     > pipe = tfdet.dataset.pipeline.cast(pipe)
     > pipe = tfdet.dataset.pipeline.key_map(pipe, batch_size = 16, shuffle = False, prefetch = True)
     > next(iter(dataset))
+    
+    > pipe = tfdet.dataset.PipeLoader(dataset, batch_size = 16, batch_load = True, executor = "process", num_workers = 8,
+                                      output_signature = (tf.TensorSpec([None, None, 3], tf.float32), tf.TensorSpec([None, 1], tf.int32), tf.TensorSpec([None, 4], tf.float32)))
     """
-    args = dataset[0]
-    assert not isinstance(args, dict), "Dataset output is should not dictionary."
+    if output_signature is not None:
+        dtype = tf.nest.map_structure(lambda spec: spec.dtype, output_signature)
+        shape = [spec.shape for spec in (output_signature if isinstance(output_signature, (tuple, list)) else [output_signature])]
+        if isinstance(output_signature, list):
+            dtype = tuple(dtype)
+    else:
+        args = dataset[0]
+        assert not isinstance(args, dict), "Dataset output is should not dictionary."
+        if dtype is None:
+            dtype = tuple([tf.convert_to_tensor(v).dtype for v in ((args,) if not isinstance(args, tuple) else args)])
+            if not isinstance(args, tuple):
+                dtype = dtype[0]
+        shape = [tf.TensorShape([None] * np.ndim(v)) for v in ((args,) if not isinstance(args, tuple) else args)] if batch_load else None
     
     if shuffle:
         dataset.shuffle = False
     
+    def set_shape(out, shape):
+        if shape is not None:
+            for o, s in zip(out if isinstance(out, (tuple, list)) else [out], shape):
+                o.set_shape(s)
+        return tuple(out) if isinstance(out, list) else out
+    
+    if batch_load and 0 < batch_size:
+        if bucket is not None:
+            if not hasattr(bucket, "batches"):
+                raise ValueError("batch_load needs bucket with batches of indices(ex. tfdet.dataset.util.BucketSampler)")
+            if bucket.batch_size != batch_size:
+                raise ValueError("batch_size({0}) is different from bucket.batch_size({1})".format(batch_size, bucket.batch_size))
+        shuffle = shuffle or dataset.shuffle
+        dataset.shuffle = False #workers get raw indices, shuffle in tf.data.(dataset[0] reshuffles only the copy of worker)
+        pool = Executor(dataset, executor, num_workers = num_workers) #worker pool is terminated when pipeline is collected or at exit.
+        if bucket is not None:
+            indices = tf.data.Dataset.from_generator(lambda: iter(bucket.batches()), output_signature = tf.TensorSpec([None], tf.int64))
+        else:
+            indices = tf.data.Dataset.range(len(dataset))
+            if shuffle:
+                indices = indices.shuffle(buffer_size = len(dataset), reshuffle_each_iteration = True)
+            indices = indices.batch(batch_size)
+        
+        def load_batch_data(index):
+            data = dataset.stack(*pool.imap(get_item, index))
+            data = tuple([pad_stack(arg) for arg in data])
+            return data if isinstance(dtype, tuple) else data[0]
+        batch_shape = [tf.TensorShape([None]).concatenate(s) for s in shape]
+        load_func = lambda index: set_shape(py_func(load_batch_data, index, Tout = dtype), batch_shape)
+        return pipeline(indices, function = load_func,
+                        batch_size = 0, repeat = repeat, shuffle = False, prefetch = prefetch,
+                        num_parallel_calls = num_parallel_calls)
+    
     indices = np.expand_dims(np.arange(len(dataset)), axis = -1)
-    if dtype is None:
-        dtype = tuple([tf.convert_to_tensor(v).dtype for v in ((args,) if not isinstance(args, tuple) else args)])
-        if not isinstance(args, tuple):
-            dtype = dtype[0]
-
     def load_iter_data(index = None):
         if index is None:
             index = [np.random.randint(len(dataset))]
         return dataset[index[0]]
     load_func = functools.partial(py_func, load_iter_data, Tout = dtype)
+    if output_signature is not None:
+        load_func = lambda index: set_shape(py_func(load_iter_data, index, Tout = dtype), shape)
     return pipeline(indices, function = load_func,
                     batch_size = batch_size, repeat = repeat, shuffle = shuffle, prefetch = prefetch,
-                    num_parallel_calls = num_parallel_calls)
+                    num_parallel_calls = num_parallel_calls, bucket = bucket)
 
-def GenPipeLoader(dataset, batch_size = 0, repeat = 1, shuffle = False, prefetch = False, num_parallel_calls = True, dtype = None):
+def GenPipeLoader(dataset, batch_size = 0, repeat = 1, shuffle = False, prefetch = False, num_parallel_calls = True, dtype = None, bucket = None):
     """
     Convert tf pipeline by generator (=torch dataloader) #so slow
     
@@ -256,34 +370,59 @@ def GenPipeLoader(dataset, batch_size = 0, repeat = 1, shuffle = False, prefetch
     pipe = tf.data.Dataset.from_generator(load_generator, dtype)
     return pipeline(pipe,
                     batch_size = batch_size, repeat = repeat, shuffle = shuffle, prefetch = prefetch,
-                    num_parallel_calls = num_parallel_calls)
+                    num_parallel_calls = num_parallel_calls, bucket = bucket)
 
 class SequenceLoader(tf.keras.utils.Sequence):
-    def __init__(self, dataset, batch_size = 0, num_parallel_calls = True):
+    def __init__(self, dataset, batch_size = 0, num_parallel_calls = True, executor = "thread", initializer = None, initargs = (), bucket = None):
         """
         Convert keras sequence (=torch dataloader)
+        
+        executor > "thread", "process" or worker count(thread).("process" pickles dataset to each worker once and returns image arrays by shared memory)
+        initializer > called with initargs once by each worker process.
+        bucket > tfdet.dataset.util.BucketSampler, batches of indices in the same aspect ratio bucket.(batch_size and shuffle of bucket, reshuffled by epoch)
 
         <example>
         > dataset = tfdet.dataset.Dataset(*args)
-        > sequence = tfdet.dataset.SequenceLoader(dataset, batch_size = 16)
+        > sequence = tfdet.dataset.SequenceLoader(dataset, batch_size = 16, executor = "process", num_parallel_calls = 32)
         > dataset[i] #or next(iter(dataset))
+        > sequence.close() #release worker pool(or when sequence is collected)
         """
         self.dataset = dataset
         self.batch_size = batch_size
         self.num_parallel_calls = max(num_parallel_calls if not isinstance(num_parallel_calls, bool) else (8 if num_parallel_calls else 0), 1)
+        self.executor = Executor(dataset, executor, num_workers = self.num_parallel_calls, initializer = initializer, initargs = initargs)
+        self.bucket = bucket
         
-        self.indices = [np.arange(i * max(self.batch_size, 1), min(len(self.dataset), (i + 1) * max(self.batch_size, 1))) for i in range(int(np.ceil(len(self.dataset) / max(self.batch_size, 1))))]
+        if bucket is not None:
+            if 0 < batch_size and batch_size != bucket.batch_size:
+                raise ValueError("batch_size({0}) is different from bucket.batch_size({1})".format(batch_size, bucket.batch_size))
+            self.batch_size = bucket.batch_size
+            self.indices = bucket.indices
+        else:
+            self.indices = [np.arange(i * max(self.batch_size, 1), min(len(self.dataset), (i + 1) * max(self.batch_size, 1))) for i in range(int(np.ceil(len(self.dataset) / max(self.batch_size, 1))))]
 
     def __len__(self):
         return len(self.indices)
     
     def __getitem__(self, index):
         indices = self.indices[index]
-        data = ThreadPool(min(self.num_parallel_calls, len(indices))).imap(lambda index: self.dataset[index], indices)
+        if self.bucket is None:
+            if index == 0 and self.dataset.shuffle: #shuffle in main process, workers get the shuffled indices.
+                self.dataset.set_indices(self.dataset.shuffle)
+            indices = self.dataset.indices[indices]
+        data = self.executor.imap(get_item, indices)
         if 0 < self.batch_size:
             data = self.dataset.stack(*data)
         else:
             data = list(data)[0]
         data = (data,) if not isinstance(data, tuple) else data
-        data = [np.array(arg) if not isinstance(arg, np.ndarray) else arg for arg in data]
-        return data[0] if len(data) == 1 else tuple(data)
\ No newline at end of file
+        data = [(pad_stack(arg) if 0 < self.batch_size else np.array(arg)) if not isinstance(arg, np.ndarray) else arg for arg in data]
+        return data[0] if len(data) == 1 else tuple(data)
+    
+    def on_epoch_end(self):
+        if self.bucket is not None:
+            self.bucket.on_epoch_end()
+            self.indices = self.bucket.indices
+    
+    def close(self):
+        self.executor.close()
\ No newline at end of file
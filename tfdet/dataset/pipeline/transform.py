@@ -907,7 +907,7 @@ except:
 def key_map(x_true, y_true = None, bbox_true = None, mask_true = None, 
             map = {"x_true":"x_true", "y_true":"y_true", "bbox_true":"bbox_true", "mask_true":"mask_true"},
             batch_size = 0, repeat = 1, shuffle = False, prefetch = False,
-            cache = False, num_parallel_calls = True):
+            cache = False, num_parallel_calls = True, bucket = None):
     """
     x_true = (N, H, W, C) or pipe
     y_true(without bbox_true) = (N, 1 or n_class)
@@ -918,13 +918,13 @@ def key_map(x_true, y_true = None, bbox_true = None, mask_true = None,
     """
     return pipe(x_true, y_true, bbox_true, mask_true, function = T.key_map,
                 map = map,
-                batch_size = batch_size, repeat = repeat, shuffle = shuffle, prefetch = prefetch, num_parallel_calls = num_parallel_calls, cache = cache,
+                batch_size = batch_size, repeat = repeat, shuffle = shuffle, prefetch = prefetch, num_parallel_calls = num_parallel_calls, cache = cache, bucket = bucket,
                 tf_func = True)
 
 def collect(x_true, y_true = None, bbox_true = None, mask_true = None, 
             keys = ["x_true", "y_true", "bbox_true", "mask_true"],
             batch_size = 0, repeat = 1, shuffle = False, prefetch = False,
-            cache = False, num_parallel_calls = True):
+            cache = False, num_parallel_calls = True, bucket = None):
     """
     x_true = (N, H, W, C) or pipe
     y_true(without bbox_true) = (N, 1 or n_class)
@@ -935,13 +935,13 @@ def collect(x_true, y_true = None, bbox_true = None, mask_true = None,
     """
     return pipe(x_true, y_true, bbox_true, mask_true, function = T.collect,
                 keys = keys,
-                batch_size = batch_size, repeat = repeat, shuffle = shuffle, prefetch = prefetch, num_parallel_calls = num_parallel_calls, cache = cache,
+                batch_size = batch_size, repeat = repeat, shuffle = shuffle, prefetch = prefetch, num_parallel_calls = num_parallel_calls, cache = cache, bucket = bucket,
                 tf_func = True)
 
 def cast(x_true, y_true = None, bbox_true = None, mask_true = None, 
          map = {"x_true":tf.float32, "y_true":tf.float32, "bbox_true":tf.float32, "mask_true":tf.float32},
          batch_size = 0, repeat = 1, shuffle = False, prefetch = False,
-         cache = False, num_parallel_calls = True):
+         cache = False, num_parallel_calls = True, bucket = None):
     """
     x_true = (N, H, W, C) or pipe
     y_true(without bbox_true) = (N, 1 or n_class)
@@ -952,13 +952,13 @@ def cast(x_true, y_true = None, bbox_true = None, mask_true = None,
     """
     return pipe(x_true, y_true, bbox_true, mask_true, function = T.cast,
                 map = map,
-                batch_size = batch_size, repeat = repeat, shuffle = shuffle, prefetch = prefetch, num_parallel_calls = num_parallel_calls, cache = cache,
+                batch_size = batch_size, repeat = repeat, shuffle = shuffle, prefetch = prefetch, num_parallel_calls = num_parallel_calls, cache = cache, bucket = bucket,
                 tf_func = True)
 
 def reshape(x_true, y_true = None, bbox_true = None, mask_true = None, 
             map = {"x_true":None, "y_true":None, "bbox_true":None, "mask_true":None},
             batch_size = 0, repeat = 1, shuffle = False, prefetch = False,
-            cache = False, num_parallel_calls = True):
+            cache = False, num_parallel_calls = True, bucket = None):
     """
     x_true = (N, H, W, C) or pipe
     y_true(without bbox_true) = (N, 1 or n_class)
@@ -969,13 +969,13 @@ def reshape(x_true, y_true = None, bbox_true = None, mask_true = None,
     """
     return pipe(x_true, y_true, bbox_true, mask_true, function = T.reshape,
                 map = map,
-                batch_size = batch_size, repeat = repeat, shuffle = shuffle, prefetch = prefetch, num_parallel_calls = num_parallel_calls, cache = cache,
+                batch_size = batch_size, repeat = repeat, shuffle = shuffle, prefetch = prefetch, num_parallel_calls = num_parallel_calls, cache = cache, bucket = bucket,
                 tf_func = True)
 
 def args2dict(x_true, y_true = None, bbox_true = None, mask_true = None, 
               keys = ["x_true", "y_true", "bbox_true", "mask_true"],
               batch_size = 0, repeat = 1, shuffle = False, prefetch = False,
-              cache = False, num_parallel_calls = True):
+              cache = False, num_parallel_calls = True, bucket = None):
     """
     x_true = (N, H, W, C) or pipe
     y_true(without bbox_true) = (N, 1 or n_class)
@@ -986,13 +986,13 @@ def args2dict(x_true, y_true = None, bbox_true = None, mask_true = None,
     """
     return pipe(x_true, y_true, bbox_true, mask_true, function = T.args2dict,
                 keys = keys,
-                batch_size = batch_size, repeat = repeat, shuffle = shuffle, prefetch = prefetch, num_parallel_calls = num_parallel_calls, cache = cache,
+                batch_size = batch_size, repeat = repeat, shuffle = shuffle, prefetch = prefetch, num_parallel_calls = num_parallel_calls, cache = cache, bucket = bucket,
                 tf_func = True)
 
 def dict2args(x_true, y_true = None, bbox_true = None, mask_true = None, 
               keys = None,
               batch_size = 0, repeat = 1, shuffle = False, prefetch = False,
-              cache = False, num_parallel_calls = True):
+              cache = False, num_parallel_calls = True, bucket = None):
     """
     x_true = (N, H, W, C) or pipe
     y_true(without bbox_true) = (N, 1 or n_class)
@@ -1003,5 +1003,5 @@ def dict2args(x_true, y_true = None, bbox_true = None, mask_true = None,
     """
     return pipe(x_true, y_true, bbox_true, mask_true, function = T.dict2args,
                 keys = keys,
-                batch_size = batch_size, repeat = repeat, shuffle = shuffle, prefetch = prefetch, num_parallel_calls = num_parallel_calls, cache = cache,
+                batch_size = batch_size, repeat = repeat, shuffle = shuffle, prefetch = prefetch, num_parallel_calls = num_parallel_calls, cache = cache, bucket = bucket,
                 tf_func = True)
\ No newline at end of file
@@ -31,7 +31,7 @@ def convert_to_pickle(*args):
 def pipe(x_true, y_true = None, bbox_true = None, mask_true = None, function = None,
          batch_size = 0, repeat = 1, shuffle = False, prefetch = False,
          cache = False, num_parallel_calls = True,
-         py_func = dict_py_func, tf_func = False, dtype = None,
+         py_func = dict_py_func, tf_func = False, dtype = None, bucket = None,
          **kwargs):
     args = [arg for arg in [x_true, y_true, bbox_true, mask_true] if arg is not None]
     args = args[0] if len(args) == 1 else tuple(args)
@@ -70,4 +70,4 @@ def pipe(x_true, y_true = None, bbox_true = None, mask_true = None, function = N
             func = functools.partial(py_func, function, Tout = dtype, **kwargs) if callable(function) else None
     return pipeline(args, function = func,
                     batch_size = batch_size, repeat = repeat, shuffle = shuffle, prefetch = prefetch,
-                    cache = cache, num_parallel_calls = num_parallel_calls)
\ No newline at end of file
+                    cache = cache, num_parallel_calls = num_parallel_calls, bucket = bucket)
\ No newline at end of file
@@ -1,6 +1,10 @@
+from .bucket import BucketSampler, get_shape
+from .cache import CacheColumn, exists_cache, load_cache, save_cache
+from .executor import Executor, SharedArray, share_array, restore_array
 from .file import list_dir, walk_dir, tree_dir, load_file, save_file, load_csv, save_csv, load_json, save_json, load_yaml, save_yaml, load_pickle, save_pickle
-from .image import load_image, save_image, instance2semantic, instance2bbox, instance2panoptic, panoptic2instance, trim_bbox
-from .numpy import pad
+from .lru import LRUCache
+from .image import load_image, get_image_shape, save_image, instance2semantic, instance2bbox, instance2panoptic, panoptic2instance, trim_bbox
+from .numpy import pad, pad_stack
 from .xml import xml2dict, dict2xml
 
 from tfdet.core.util import convert_to_numpy, convert_to_pickle, convert_to_ragged_tensor, convert_to_tensor
\ No newline at end of file
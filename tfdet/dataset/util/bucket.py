@@ -0,0 +1,121 @@
+import numpy as np
+import tensorflow as tf
+
+from .image import get_image_shape
+
+def get_shape(dataset):
+    """
+    (N, 2) image shape(h, w) of dataset by annotation(path header or array shape, innermost args of dataset) or first item of dataset.
+    """
+    args = dataset.args
+    while hasattr(args[0], "args"):
+        args = args[0].args
+    x_true = args[0]["x_true"] if isinstance(args[0], dict) else args[0]
+    shape = []
+    for index in range(len(dataset)):
+        x = x_true[index] if index < len(x_true) else None
+        if isinstance(x, str) or (isinstance(x, np.ndarray) and 2 <= np.ndim(x)):
+            shape.append(get_image_shape(x))
+        else:
+            item = dataset.get(index)
+            shape.append(np.shape(item[0] if isinstance(item, tuple) else item)[:2])
+    return np.reshape(np.array(shape, dtype = np.int64), [-1, 2])
+
+def get_padding(shape, batches):
+    """
+    (padded area, image area) of batches.
+    """
+    padded = area = 0
+    for indices in batches:
+        h, w = shape[indices, 0], shape[indices, 1]
+        padded += len(indices) * int(np.max(h)) * int(np.max(w))
+        area += int(np.sum(h * w))
+    return padded - area, area
+
+class BucketSampler:
+    def __init__(self, shape, batch_size = 16, ratio_boundary = [0.75, 0.95, 1.05, 1.33], size_boundary = None, shuffle = True):
+        """
+        Group indices by aspect ratio(w / h) and size(h * w) for batches with less padding.
+        shape = (N, 2) image shape(h, w) of each index or dataset(computed once by get_shape)
+        ratio_boundary, size_boundary = bucket boundaries #size_boundary = None > bucket by aspect ratio only
+
+        SequenceLoader > batches of indices in the same bucket.
+        pipeline(PipeLoader, pipe) > key of bucket by shape of image(group_by_window like bucket_by_sequence_length)
+
+        <example>
+        > sampler = tfdet.dataset.util.BucketSampler(dataset, batch_size = 16)
+        > sequence = tfdet.dataset.SequenceLoader(dataset, bucket = sampler)
+        > pipe = tfdet.dataset.PipeLoader(dataset, batch_size = 16, bucket = sampler)
+        > pipe = tfdet.dataset.pipeline.key_map(pipe, batch_size = 16, bucket = sampler) #args2dict, collect, cast, reshape, key_map(dict pipe)
+        > sampler.info() #{"n_bucket", "padding", "random_padding", "saved"}
+        """
+        if not isinstance(shape, np.ndarray) and hasattr(shape, "args"):
+            shape = get_shape(shape)
+        self.shape = np.reshape(np.array(shape, dtype = np.int64), [-1, 2])
+        self.batch_size = batch_size
+        self.ratio_boundary = list(ratio_boundary) if ratio_boundary is not None else []
+        self.size_boundary = list(size_boundary) if size_boundary is not None else []
+        self.shuffle = shuffle
+
+        self.bucket = self.get_bucket(self.shape)
+        self.indices = self.batches()
+
+    def get_bucket(self, shape):
+        """
+        shape = (..., 2) image shape(h, w) #numpy or tensor
+        """
+        n_size = len(self.size_boundary) + 1
+        if tf.is_tensor(shape):
+            shape = tf.cast(shape, tf.float32)
+            ratio = shape[..., 1] / tf.maximum(shape[..., 0], 1.)
+            key = tf.reduce_sum(tf.cast(tf.expand_dims(ratio, axis = -1) >= tf.constant(self.ratio_boundary, dtype = tf.float32, shape = [len(self.ratio_boundary)]), tf.int64), axis = -1) * n_size
+            if 0 < len(self.size_boundary):
+                size = shape[..., 0] * shape[..., 1]
+                key += tf.reduce_sum(tf.cast(tf.expand_dims(size, axis = -1) >= tf.constant(self.size_boundary, dtype = tf.float32), tf.int64), axis = -1)
+        else:
+            shape = np.array(shape, dtype = np.float64)
+            ratio = shape[..., 1] / np.maximum(shape[..., 0], 1.)
+            key = np.searchsorted(self.ratio_boundary, ratio, side = "right") * n_size
+            if 0 < len(self.size_boundary):
+                key += np.searchsorted(self.size_boundary, shape[..., 0] * shape[..., 1], side = "right")
+        return key
+
+    def __call__(self, *args):
+        """
+        key of bucket for pipeline element.(shape of "x_true" or first item)
+        """
+        x = args[0]
+        if isinstance(x, dict):
+            x = x["x_true"] if "x_true" in x else list(x.values())[0]
+        return self.get_bucket(tf.shape(x)[:2])
+
+    def batches(self, shuffle = None):
+        shuffle = self.shuffle if shuffle is None else shuffle
+        batch_size = max(self.batch_size, 1)
+        batches = []
+        for key in np.unique(self.bucket):
+            indices = np.where(self.bucket == key)[0]
+            if shuffle:
+                np.random.shuffle(indices)
+            batches += [indices[i:i + batch_size] for i in range(0, len(indices), batch_size)]
+        if shuffle:
+            batches = [batches[i] for i in np.random.permutation(len(batches))]
+        return batches
+
+    def on_epoch_end(self):
+        self.indices = self.batches()
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __iter__(self):
+        return iter(self.indices)
+
+    def info(self):
+        """
+        padding = padded area / image area of bucket batches, random_padding = that of shuffled batches, saved = reduced padded area by bucket
+        """
+        pad, area = get_padding(self.shape, self.indices)
+        indices = np.random.permutation(len(self.shape))
+        random_pad, _ = get_padding(self.shape, [indices[i:i + max(self.batch_size, 1)] for i in range(0, len(indices), max(self.batch_size, 1))])
+        return {"n_bucket":len(np.unique(self.bucket)), "padding":pad / max(area, 1), "random_padding":random_pad / max(area, 1), "saved":1 - pad / max(random_pad, 1)}
@@ -0,0 +1,235 @@
+"""
+Sharded columnar cache
+
+path/meta.json > {"length", "shard_size", "n_shard"}
+path/shard_00000/meta.json > {"length", "fingerprint", "keys"(dict args) or None(tuple args), "column":[{"type", "dtype"}, ...]} #written last, so a shard without meta is rebuilt.
+path/shard_00000/{column}.{data, offset, shape, index}.npy > ragged arrays with offset indexes.(loaded by memory map)
+
+column type
+- scalar > (N,) array of str or number.
+- array > ndarray item. data(flatten), offset(N + 1), shape(N, ndim)
+- list > list of ndarray item.(ex. contours) data(flatten), offset(M + 1), shape(M, ndim), index(N + 1) for M arrays
+- pickle > any item. data(pickled bytes), offset(N + 1)
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+
+import numpy as np
+
+from .file import load_pickle, save_pickle
+
+PICKLE_EXT = [".pkl", ".pickle"]
+META_NAME = "meta.json"
+SHARD_SIZE = 10000
+
+def is_pickle_cache(path):
+    return os.path.isfile(path) or os.path.splitext(path)[1].lower() in PICKLE_EXT
+
+def exists_cache(path):
+    """
+    True if pickle cache or every shard of columnar cache exists.
+    """
+    if not isinstance(path, str) or not os.path.exists(path):
+        return False
+    if os.path.isfile(path):
+        return True
+    meta = load_meta(path)
+    return meta is not None and all([load_meta(os.path.join(path, get_shard_name(shard))) is not None for shard in range(meta["n_shard"])])
+
+def load_meta(path):
+    try:
+        with open(os.path.join(path, META_NAME), "rt") as file:
+            return json.load(file)
+    except:
+        return None
+
+def save_meta(meta, path):
+    tmp_path = os.path.join(path, "{0}.tmp".format(META_NAME))
+    with open(tmp_path, "wt") as file:
+        json.dump(meta, file)
+    os.replace(tmp_path, os.path.join(path, META_NAME))
+    return path
+
+def get_shard_name(shard):
+    return "shard_{0:05d}".format(shard)
+
+def get_shard_indices(length, shard_size = SHARD_SIZE):
+    shard_size = max(shard_size, 1)
+    return [np.arange(start, min(start + shard_size, length)) for start in range(0, length, shard_size)]
+
+def get_fingerprint(*args):
+    try:
+        data = pickle.dumps(args)
+    except:
+        data = repr(args).encode("UTF-8")
+    return hashlib.md5(data).hexdigest()
+
+def is_str_array(value):
+    return isinstance(value, np.ndarray) and value.dtype == object and all([isinstance(v, str) for v in value.flat])
+
+def is_array(value):
+    return isinstance(value, np.ndarray) and (value.dtype != object or is_str_array(value))
+
+def encode_column(values):
+    if len(set([type(v) for v in values])) == 1 and isinstance(values[0], (str, bool, int, float, np.bool_, np.number)):
+        return {"type":"scalar", "dtype":None}, {"data":np.array(values)}
+    if all([is_array(v) for v in values]) and len(set([np.ndim(v) for v in values])) == 1:
+        dtypes = set([v.dtype.str for v in values if v.dtype != object])
+        if len(dtypes) < 2 or all([v.dtype.kind == "U" or v.dtype == object for v in values]):
+            restore = "object" if any([v.dtype == object for v in values]) else None
+            data = [v.astype(str) if v.dtype == object else v for v in values]
+            return {"type":"array", "dtype":restore}, {"data":np.concatenate([np.ravel(v) for v in data]) if 0 < len(data) else np.zeros(0),
+                                                       "offset":np.cumsum([0] + [np.size(v) for v in data]).astype(np.int64),
+                                                       "shape":np.array([np.shape(v) for v in data], dtype = np.int64).reshape([len(data), -1])}
+    if all([isinstance(v, list) and all([is_array(a) and a.dtype != object for a in v]) for v in values]):
+        arrays = [a for v in values for a in v]
+        if len(set([a.dtype.str for a in arrays])) < 2 and len(set([np.ndim(a) for a in arrays])) < 2:
+            return {"type":"list", "dtype":None}, {"data":np.concatenate([np.ravel(a) for a in arrays]) if 0 < len(arrays) else np.zeros(0, dtype = np.float32),
+                                                   "offset":np.cumsum([0] + [np.size(a) for a in arrays]).astype(np.int64),
+                                                   "shape":np.array([np.shape(a) for a in arrays], dtype = np.int64).reshape([len(arrays), -1]),
+                                                   "index":np.cumsum([0] + [len(v) for v in values]).astype(np.int64)}
+    data = [pickle.dumps(v) for v in values]
+    return {"type":"pickle", "dtype":None}, {"data":np.frombuffer(b"".join(data), dtype = np.uint8),
+                                             "offset":np.cumsum([0] + [len(v) for v in data]).astype(np.int64)}
+
+class CacheColumn:
+    """
+    Lazy(memory map) column of sharded columnar cache. (copy-on-write view per item)
+    """
+    def __init__(self, path, column, shard_size, length):
+        self.path, self.column, self.shard_size, self.length = path, column, shard_size, length
+        self.shards = {}
+
+    def __getstate__(self):
+        return (self.path, self.column, self.shard_size, self.length)
+
+    def __setstate__(self, state):
+        self.path, self.column, self.shard_size, self.length = state
+        self.shards = {}
+
+    def __len__(self):
+        return self.length
+
+    def load_shard(self, shard):
+        if shard not in self.shards:
+            shard_path = os.path.join(self.path, get_shard_name(shard))
+            info = load_meta(shard_path)["column"][self.column]
+            arrays = {}
+            for name in ["data", "offset", "shape", "index"]:
+                file_path = os.path.join(shard_path, "{0}.{1}.npy".format(self.column, name))
+                if os.path.exists(file_path):
+                    try:
+                        arrays[name] = np.load(file_path, mmap_mode = "c")
+                    except: #empty array can't be mapped.
+                        arrays[name] = np.load(file_path)
+            self.shards[shard] = (info, arrays)
+        return self.shards[shard]
+
+    def get(self, index):
+        if index < 0:
+            index += self.length
+        if not (0 <= index < self.length):
+            raise IndexError("index {0} is out of range for length {1}".format(index, self.length))
+        shard, index = divmod(int(index), self.shard_size)
+        info, arrays = self.load_shard(shard)
+        data = arrays["data"]
+        if info["type"] == "scalar":
+            return data[index].item()
+        elif info["type"] == "array":
+            offset = arrays["offset"]
+            value = data[offset[index]:offset[index + 1]].reshape(arrays["shape"][index])
+            return value.astype(info["dtype"]) if info["dtype"] is not None else value
+        elif info["type"] == "list":
+            offset, shape = arrays["offset"], arrays["shape"]
+            return [data[offset[i]:offset[i + 1]].reshape(shape[i]) for i in range(arrays["index"][index], arrays["index"][index + 1])]
+        else:
+            offset = arrays["offset"]
+            return pickle.loads(data[offset[index]:offset[index + 1]].tobytes())
+
+    def __getitem__(self, index):
+        if 0 < np.ndim(index):
+            return [self.get(i) for i in index]
+        elif isinstance(index, slice):
+            return [self.get(i) for i in range(*index.indices(self.length))]
+        return self.get(index)
+
+    def __iter__(self):
+        for index in range(self.length):
+            yield self.get(index)
+
+def init_cache(path, length, shard_size = SHARD_SIZE):
+    """
+    Create(or reuse) columnar cache directory and remove shards that are not valid for length and shard_size.
+    """
+    meta = load_meta(path) if os.path.isdir(path) else None
+    if meta is not None and meta["shard_size"] != shard_size:
+        shutil.rmtree(path)
+        meta = None
+    os.makedirs(path, exist_ok = True)
+    n_shard = len(get_shard_indices(length, shard_size))
+    for name in os.listdir(path):
+        if name.startswith("shard_") and (not name[6:].isdigit() or n_shard <= int(name[6:])):
+            shutil.rmtree(os.path.join(path, name), ignore_errors = True)
+    save_meta({"length":int(length), "shard_size":int(shard_size), "n_shard":n_shard}, path)
+    return path
+
+def get_shard_fingerprint(path, shard):
+    meta = load_meta(os.path.join(path, get_shard_name(shard)))
+    return meta["fingerprint"] if meta is not None else None
+
+def save_shard(args, path, shard, fingerprint = None):
+    """
+    args > tuple of column values or dict(keys of cache) of column values for items of shard.
+    """
+    keys = list(args[0].keys()) if isinstance(args[0], dict) else None
+    columns = [args[0][k] for k in keys] if keys is not None else list(args)
+    shard_path = os.path.join(path, get_shard_name(shard))
+    if os.path.exists(shard_path):
+        shutil.rmtree(shard_path)
+    os.makedirs(shard_path)
+    info = []
+    for column, values in enumerate(columns):
+        values = list(values)
+        column_info, arrays = encode_column(values)
+        for name, array in arrays.items():
+            np.save(os.path.join(shard_path, "{0}.{1}.npy".format(column, name)), array, allow_pickle = False)
+        info.append(column_info)
+    save_meta({"length":len(columns[0]) if 0 < len(columns) else 0, "fingerprint":fingerprint, "keys":keys, "column":info}, shard_path)
+    return shard_path
+
+def load_cache(path):
+    """
+    Load pickle cache or lazy columns of columnar cache.
+    """
+    if os.path.isfile(path):
+        return load_pickle(path)
+    meta = load_meta(path)
+    shard_meta = load_meta(os.path.join(path, get_shard_name(0))) if 0 < meta["n_shard"] else {"keys":None, "column":[]}
+    columns = [CacheColumn(path, column, meta["shard_size"], meta["length"]) for column in range(len(shard_meta["column"]))]
+    if shard_meta["keys"] is not None:
+        return ({k:v for k, v in zip(shard_meta["keys"], columns)},)
+    return tuple(columns)
+
+def save_cache(args, path, shard_size = SHARD_SIZE):
+    """
+    Save args(tuple of sequences or (dict of sequences,)) as pickle(path with ".pkl" or ".pickle") or sharded columnar cache.
+    Shards that have the same fingerprint of args are not rewritten.(partial rebuild)
+    """
+    if is_pickle_cache(path):
+        return save_pickle(args, path)
+    keys = list(args[0].keys()) if isinstance(args[0], dict) else None
+    length = len(args[0][keys[0]]) if keys is not None else len(args[0])
+    init_cache(path, length, shard_size = shard_size)
+    for shard, indices in enumerate(get_shard_indices(length, shard_size)):
+        if keys is not None:
+            shard_args = ({k:[args[0][k][i] for i in indices] for k in keys},)
+        else:
+            shard_args = tuple([[arg[i] for i in indices] for arg in args])
+        fingerprint = get_fingerprint(*shard_args)
+        if get_shard_fingerprint(path, shard) != fingerprint:
+            save_shard(shard_args, path, shard, fingerprint = fingerprint)
+    return path
@@ -0,0 +1,208 @@
+import multiprocessing
+import os
+import time
+import weakref
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+try:
+    from multiprocessing import resource_tracker
+    from multiprocessing.shared_memory import SharedMemory
+except: #python < 3.8
+    resource_tracker = SharedMemory = None
+
+def open_shared_memory(name = None, size = 0):
+    """
+    Shared memory is owned by SharedArray(not by the process that creates or attaches it), so it shouldn't be tracked by resource_tracker.
+    """
+    try: #python >= 3.13
+        return SharedMemory(name = name, create = name is None, size = size, track = False)
+    except TypeError:
+        shm = SharedMemory(name = name, create = name is None, size = size)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+def unlink_shared_memory(shm):
+    track = getattr(shm, "_track", True) #unlink unregisters the name by python < 3.13, so register it again.
+    if track:
+        resource_tracker.register(shm._name, "shared_memory")
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        if track:
+            resource_tracker.unregister(shm._name, "shared_memory")
+
+class SharedArray:
+    """
+    Reference of numpy array that is stored in shared memory.(returned by worker process)
+    """
+    __slots__ = ["name", "shape", "dtype"]
+
+    def __init__(self, name, shape, dtype):
+        self.name, self.shape, self.dtype = name, shape, dtype
+
+    def __getstate__(self):
+        return (self.name, self.shape, self.dtype)
+
+    def __setstate__(self, state):
+        self.name, self.shape, self.dtype = state
+
+def share_array(data, min_size = 65536):
+    """
+    Move numpy arrays(over min_size bytes) into shared memory and replace them with SharedArray.
+    """
+    if isinstance(data, dict):
+        return {k:share_array(v, min_size = min_size) for k, v in data.items()}
+    elif isinstance(data, (tuple, list)):
+        return type(data)([share_array(v, min_size = min_size) for v in data])
+    elif SharedMemory is not None and isinstance(data, np.ndarray) and data.dtype != object and 0 < data.nbytes and min_size <= data.nbytes:
+        shm = open_shared_memory(size = data.nbytes)
+        np.ndarray(data.shape, dtype = data.dtype, buffer = shm.buf)[...] = data
+        shm.close()
+        data = SharedArray(shm.name, data.shape, data.dtype.str)
+    return data
+
+def restore_array(data, unlink = True):
+    """
+    Copy SharedArray into numpy array and release shared memory.(if unlink)
+    """
+    if isinstance(data, dict):
+        return {k:restore_array(v, unlink = unlink) for k, v in data.items()}
+    elif isinstance(data, (tuple, list)):
+        return type(data)([restore_array(v, unlink = unlink) for v in data])
+    elif isinstance(data, SharedArray):
+        shm = open_shared_memory(data.name)
+        try:
+            data = np.ndarray(data.shape, dtype = data.dtype, buffer = shm.buf).copy()
+        finally:
+            shm.close()
+            if unlink:
+                unlink_shared_memory(shm)
+    return data
+
+def release_array(data):
+    """
+    Release shared memory of SharedArray without copy.
+    """
+    if isinstance(data, dict):
+        data = list(data.values())
+    if isinstance(data, (tuple, list)):
+        for v in data:
+            release_array(v)
+    elif isinstance(data, SharedArray):
+        try:
+            shm = open_shared_memory(data.name)
+        except FileNotFoundError:
+            return
+        shm.close()
+        unlink_shared_memory(shm)
+
+worker_context = {}
+
+def init_worker(obj, initializer = None, initargs = ()):
+    worker_context["object"] = obj
+    np.random.seed((os.getpid() * 1000003 + time.time_ns()) % (2 ** 32)) #workers can inherit the same random state.(context = "fork" or forkserver with preloaded numpy)
+    if callable(initializer):
+        initializer(*initargs)
+
+def run_worker(args):
+    function, item, min_size = args
+    result = function(worker_context["object"], item)
+    if min_size is not None:
+        result = share_array(result, min_size = min_size)
+    return result
+
+class AsyncResult:
+    def __init__(self, result, restore = False):
+        self.result = result
+        self.restore = restore
+
+    def ready(self):
+        return self.result.ready()
+
+    def get(self, timeout = None):
+        result = self.result.get(timeout)
+        return restore_array(result) if self.restore else result
+
+class Executor:
+    def __init__(self, obj, executor = "thread", num_workers = 8, initializer = None, initargs = (), shared_memory = True, min_size = 65536, context = None):
+        """
+        Map function(obj, item) by "thread" or "process" pool.
+
+        executor > "thread", "process", worker count(thread) or pool(with imap)
+        initializer > called with initargs once by each worker process.
+        shared_memory > return numpy arrays(over min_size bytes) of worker process by shared memory instead of pickle.
+        context > multiprocessing start method.(default "forkserver" if available, otherwise "spawn")
+                  obj is pickled to each worker once at pool start and function by call, so both should be picklable in process mode.(each worker imports their modules, ex. tensorflow)
+                  "fork" isn't the default, since forking after the tensorflow runtime and its thread pools are started can deadlock the worker.
+
+        <example>
+        > executor = Executor(dataset, "process", num_workers = 32)
+        > data = list(executor.imap(function, indices)) #function(obj, item) should be picklable in process mode.
+        > result = executor.apply_async(function, index).get()
+        > executor.close()
+        """
+        if isinstance(executor, bool):
+            executor = "thread" if executor else 1
+        if isinstance(executor, int):
+            executor, num_workers = "thread", executor
+        self.obj = obj
+        self.executor = executor
+        self.num_workers = max(num_workers if isinstance(num_workers, int) else (os.cpu_count() or 1), 1)
+        self.initializer = initializer
+        self.initargs = initargs
+        self.min_size = min_size if shared_memory and SharedMemory is not None else None
+        if context is None:
+            context = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self.context = context
+        self.pool = None
+        self.finalizer = None
+
+    @property
+    def is_process(self):
+        return self.executor == "process"
+
+    def get_pool(self):
+        if self.pool is None:
+            if self.executor == "thread":
+                self.pool = ThreadPool(self.num_workers)
+            elif self.executor == "process":
+                self.pool = multiprocessing.get_context(self.context).Pool(self.num_workers, initializer = init_worker, initargs = (self.obj, self.initializer, self.initargs))
+            elif hasattr(self.executor, "imap"):
+                self.pool = self.executor
+            else:
+                raise ValueError("unknown executor '{0}'".format(self.executor))
+            if self.pool is not self.executor: #terminate own pool when executor is collected or at exit.(not closed by close)
+                self.finalizer = weakref.finalize(self, self.pool.terminate)
+        return self.pool
+
+    def imap(self, function, iterable, chunksize = 1):
+        pool = self.get_pool()
+        if self.is_process:
+            iter_data = pool.imap(run_worker, [(function, item, self.min_size) for item in iterable], chunksize = chunksize)
+            return (restore_array(data) for data in iter_data)
+        else:
+            return pool.imap(lambda item: function(self.obj, item), iterable)
+
+    def apply_async(self, function, item):
+        pool = self.get_pool()
+        if self.is_process:
+            return AsyncResult(pool.apply_async(run_worker, ((function, item, self.min_size),)), restore = True)
+        else:
+            return AsyncResult(pool.apply_async(function, (self.obj, item)))
+
+    def close(self):
+        if self.finalizer is not None:
+            self.finalizer.detach()
+            self.finalizer = None
+        if self.pool is not None and self.pool is not self.executor:
+            self.pool.close()
+            self.pool.join()
+        self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -1,3 +1,5 @@
+import struct
+
 import cv2
 import numpy as np
 
@@ -9,6 +11,40 @@ def load_image(path, bgr2rgb = True):
             image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
     return image
 
+def get_image_shape(path):
+    """
+    (h, w) of image by header(png, jpeg, gif, bmp) without decoding.(decode other formats)
+    """
+    if not isinstance(path, str):
+        return tuple(np.shape(path)[:2])
+    with open(path, "rb") as file:
+        head = file.read(26)
+        if head[:8] == b"\x89PNG\r\n\x1a\n":
+            w, h = struct.unpack(">II", head[16:24])
+            return (h, w)
+        elif head[:6] in [b"GIF87a", b"GIF89a"]:
+            w, h = struct.unpack("<HH", head[6:10])
+            return (h, w)
+        elif head[:2] == b"BM" and 26 <= len(head):
+            w, h = struct.unpack("<ii", head[18:26])
+            return (abs(h), w)
+        elif head[:2] == b"\xff\xd8":
+            file.seek(2)
+            while True:
+                marker = file.read(2)
+                if len(marker) < 2 or marker[0] != 0xFF:
+                    break
+                while marker[1] == 0xFF: #fill bytes
+                    marker = marker[1:] + file.read(1)
+                if 0xC0 <= marker[1] <= 0xCF and marker[1] not in [0xC4, 0xC8, 0xCC]: #start of frame
+                    h, w = struct.unpack(">xHH", file.read(7)[2:])
+                    return (h, w)
+                length = file.read(2)
+                if len(length) < 2:
+                    break
+                file.seek(struct.unpack(">H", length)[0] - 2, 1)
+    return tuple(np.shape(cv2.imread(path, cv2.IMREAD_UNCHANGED))[:2])
+
 def save_image(image, path, rgb2bgr = True):
     image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR) if rgb2bgr else image
     image = cv2.imwrite(path, image)
@@ -0,0 +1,162 @@
+import threading
+import weakref
+from collections import OrderedDict
+from multiprocessing.managers import SyncManager
+
+import numpy as np
+
+from .executor import share_array, restore_array, release_array
+
+def get_nbytes(data):
+    if isinstance(data, dict):
+        data = list(data.values())
+    if isinstance(data, (tuple, list)):
+        return sum([get_nbytes(v) for v in data])
+    return data.nbytes if isinstance(data, np.ndarray) else 0
+
+def copy_data(data):
+    if isinstance(data, dict):
+        return {k:copy_data(v) for k, v in data.items()}
+    elif isinstance(data, (tuple, list)):
+        return type(data)([copy_data(v) for v in data])
+    return data.copy() if isinstance(data, np.ndarray) else data
+
+class LRUMemory:
+    """
+    Ordered memory with byte-size limit. put returns the values that are evicted(or rejected).
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.memory = OrderedDict()
+        self.size = 0
+        self.hit = self.miss = self.evict = 0
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.hit += 1
+                return self.memory[key][0]
+            self.miss += 1
+            return None
+
+    def put(self, key, value, size):
+        evicted = []
+        with self.lock:
+            if key in self.memory or self.max_size < size:
+                return [value]
+            self.memory[key] = (value, size)
+            self.size += size
+            while self.max_size < self.size:
+                _, (v, s) = self.memory.popitem(last = False)
+                self.size -= s
+                self.evict += 1
+                evicted.append(v)
+        return evicted
+
+    def count_miss(self):
+        with self.lock:
+            self.hit -= 1
+            self.miss += 1
+
+    def clear(self):
+        with self.lock:
+            values = [v for v, s in self.memory.values()]
+            self.memory.clear()
+            self.size = 0
+        return values
+
+    def info(self):
+        with self.lock:
+            total = self.hit + self.miss
+            return {"hit":self.hit, "miss":self.miss, "hit_rate":self.hit / total if 0 < total else 0., "evict":self.evict,
+                    "count":len(self.memory), "size":self.size, "max_size":self.max_size}
+
+class LRUManager(SyncManager):
+    pass
+
+LRUManager.register("LRUMemory", LRUMemory)
+
+def clear_shared(memory):
+    try:
+        release_array(memory.clear())
+    except:
+        pass
+
+class LRUCache:
+    def __init__(self, max_size = 2 * 1024 ** 3, shared = False):
+        """
+        Least recently used cache with byte-size(numpy arrays) limit.
+
+        shared > share cache between worker processes.(index in manager process, arrays in shared memory)
+
+        <example>
+        > cache = LRUCache(4 * 1024 ** 3, shared = True)
+        > value = cache.get(key)
+        > if value is None:
+        >     value = load(key)
+        >     cache.put(key, value)
+        > cache.info() #{"hit", "miss", "hit_rate", "evict", "count", "size", "max_size"}
+        """
+        self.max_size = max_size
+        self.shared = shared
+        if shared:
+            self.manager = LRUManager()
+            self.manager.start()
+            self.memory = self.manager.LRUMemory(max_size)
+            self.finalizer = weakref.finalize(self, clear_shared, self.memory)
+        else:
+            self.manager = None
+            self.memory = LRUMemory(max_size)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["manager"] = None
+        state.pop("finalizer", None)
+        return state
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            if self.shared:
+                try:
+                    value = restore_array(value, unlink = False)
+                except FileNotFoundError: #evicted by other process.
+                    self.memory.count_miss()
+                    value = None
+            else:
+                value = copy_data(value)
+        return value
+
+    def put(self, key, value):
+        size = get_nbytes(value)
+        if self.max_size < size:
+            return False
+        if self.shared:
+            value = share_array(value)
+            evicted = self.memory.put(key, value, size)
+            release_array(evicted)
+        else:
+            self.memory.put(key, copy_data(value), size)
+        return True
+
+    def clear(self):
+        values = self.memory.clear()
+        if self.shared:
+            release_array(values)
+
+    def info(self):
+        return self.memory.info()
+
+    def __len__(self):
+        return self.info()["count"]
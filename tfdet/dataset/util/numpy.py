@@ -17,4 +17,15 @@ def pad(data, pad_width = None, val = 0):
             region = tuple([slice(None if l == 0 else l, None if r == 0 else -r) for l, r in pad_width])
             pad_data[region if not dummy else region[0]] = data
         data = pad_data
-    return data
\ No newline at end of file
+    return data
+
+def pad_stack(data, val = 0):
+    """
+    Stack arrays after padding them to the max shape.(same as padded_batch)
+    """
+    data = [np.array(d) if not isinstance(d, np.ndarray) else d for d in data]
+    shapes = [np.shape(d) for d in data]
+    if len(set(shapes)) < 2 or len(set([len(s) for s in shapes])) != 1:
+        return np.array(data)
+    max_shape = np.max(shapes, axis = 0)
+    return np.stack([pad(d, [[0, m - s] for s, m in zip(np.shape(d), max_shape)], val = val) for d in data], axis = 0)
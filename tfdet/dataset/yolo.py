@@ -7,6 +7,7 @@ from tfdet.builder import build_transform
 from tfdet.core.util import dict_function
 from tfdet.dataset.transform import load, resize, pad, filter_annotation, mosaic, mosaic9, mix_up, copy_paste, yolo_hsv, random_perspective, random_flip, compose
 from .dataset import Dataset
+from .util import LRUCache
 
 class YoloDataset(Dataset):
     def __init__(self, *args, transform = None, preprocess = None, 
@@ -17,7 +18,7 @@ class YoloDataset(Dataset):
                  min_scale = 2, min_instance_area = 1, iou_threshold = 0.3, copy_min_scale = 2, copy_min_instance_area = 1, copy_iou_threshold = 0.3, p_copy_paste_flip = 0.5, method = cv2.INTER_LINEAR,
                  p_mosaic = 1., p_mix_up = 0.15, p_copy_paste = 0., p_flip = 0.5, p_mosaic9 = 0.2,
                  min_area = 0., min_visibility = 0., e = 1e-12,
-                 shuffle = False, cache = None):
+                 shuffle = False, cache = None, executor = "thread", num_parallel_calls = 8, image_cache = None):
         """
         args > x_true, y_true, bbox_true, mask_true(optional) style args or dataset
         transform or preprocess > {'name':transform name or func, **kwargs} or transform name or func #find module in tfdet.dataset.transform and map kwargs.
@@ -33,7 +34,9 @@ class YoloDataset(Dataset):
                                               preprocess = [], #pre-apply transform
                                               shuffle = False, #when item 0 is called, shuffle indices.(Recommended by 1 GPU)
                                               cache = "dataset.cache", #save cache after preprocess)
+                                              image_cache = 4 * 1024 ** 3) #max bytes of loaded and resized images for mosaic, mix_up and copy_paste or tfdet.dataset.util.LRUCache(shared = True)
         > dataset[i] #or next(iter(dataset))
+        > dataset.image_cache.info() #hit, miss, hit_rate, evict, count, size, max_size
         
         2. dataset
         > dataset = tfdet.dataset.coco.load_dataset("./coco/annotations/instances_train2017.json", "./coco/train2017",
@@ -54,7 +57,7 @@ class YoloDataset(Dataset):
         > pipe = tfdet.dataset.pipeline.key_map(pipe, batch_size = 16, shuffle = False, prefetch = True)
         > next(iter(dataset))
         """
-        super(YoloDataset, self).__init__(*args, preprocess = preprocess, shuffle = shuffle, cache = cache, keys = ["x_true", "y_true", "bbox_true", "mask_true"])
+        super(YoloDataset, self).__init__(*args, preprocess = preprocess, shuffle = shuffle, cache = cache, keys = ["x_true", "y_true", "bbox_true", "mask_true"], executor = executor, num_parallel_calls = num_parallel_calls)
         self.old_get = super(YoloDataset, self).get
         transform = build_transform(transform, key = "name")
         self.postprocess = [transform] if not isinstance(transform, (list, tuple)) else transform
@@ -66,15 +69,24 @@ class YoloDataset(Dataset):
         self.min_scale, self.min_instance_area, self.iou_threshold, self.copy_min_scale, self.copy_min_instance_area, self.copy_iou_threshold, self.p_copy_paste_flip, self.method = min_scale, min_instance_area, iou_threshold, copy_min_scale, copy_min_instance_area, copy_iou_threshold, p_copy_paste_flip, method
         self.p_mosaic, self.p_mix_up, self.p_copy_paste, self.p_flip, self.p_mosaic9 = p_mosaic, p_mix_up, p_copy_paste, p_flip, p_mosaic9
         self.min_area, self.min_visibility, self.e = min_area, min_visibility, e
+        self.image_cache = LRUCache(image_cache) if isinstance(image_cache, int) and 0 < image_cache else (image_cache if isinstance(image_cache, LRUCache) else None)
         
     def load_image(self, index):
+        if self.image_cache is not None:
+            key = (int(index), tuple(np.ravel(self.image_shape).tolist()))
+            result = self.image_cache.get(key)
+            if result is not None:
+                return result
         if isinstance(self.args[0], Dataset):
             args = self.args[0].get(index)
         else:
             args = self.old_get(index)
         args = (args,) if not isinstance(args, tuple) else args
-        return dict_function(self.keys)([load, 
-                                         functools.partial(resize, image_shape = self.image_shape, keep_ratio = self.keep_ratio, method = self.method)])(*args)
+        result = dict_function(self.keys)([load, 
+                                           functools.partial(resize, image_shape = self.image_shape, keep_ratio = self.keep_ratio, method = self.method)])(*args)
+        if self.image_cache is not None:
+            self.image_cache.put(key, result)
+        return result
         
     def get(self, index, transform = None, preprocess = True):
         if transform is not None and preprocess:
@@ -27,7 +27,7 @@ def roi_sampler(true_indices, positive_indices, negative_indices, sampling_count
 
 def rcnn(feature, neck = neck, rpn_head = rpn_head, bbox_head = bbox_head, mask_head = None, semantic_head = None,
          cascade = False, interleaved = False, mask_info_flow = False,
-         proposal_count = 1000, iou_threshold = 0.7, score_threshold = float('-inf'), soft_nms = False, valid_inside_anchor = False, performance_count = 5000,
+         proposal_count = 1000, iou_threshold = 0.7, score_threshold = float('-inf'), soft_nms = False, suppression = "greedy", candidate_count = 500, valid_inside_anchor = False, performance_count = 5000,
          rpn_mean = [0., 0., 0., 0.], rpn_std = [1., 1., 1., 1.], rpn_clip_ratio = 16 / 1000, 
          cls_mean = [0., 0., 0., 0.], cls_std = [0.1, 0.1, 0.2, 0.2], cls_clip_ratio = 16 / 1000,
          batch_size = 1,
@@ -50,7 +50,7 @@ def rcnn(feature, neck = neck, rpn_head = rpn_head, bbox_head = bbox_head, mask_
         feature = neck(name = "neck")(feature)
     
     rpn_y_pred, rpn_bbox_pred, anchors = rpn_head(feature)
-    proposals = Rpn2Proposal(max(proposal_count, train_proposal_count) if train else proposal_count, iou_threshold = iou_threshold, soft_nms = soft_nms, valid_inside_anchor = valid_inside_anchor, performance_count = performance_count,
+    proposals = Rpn2Proposal(max(proposal_count, train_proposal_count) if train else proposal_count, iou_threshold = iou_threshold, soft_nms = soft_nms, suppression = suppression, candidate_count = candidate_count, valid_inside_anchor = valid_inside_anchor, performance_count = performance_count,
                              mean = rpn_mean, std = rpn_std, clip_ratio = rpn_clip_ratio,
                              batch_size = batch_size, dtype = tf.float32, name = "proposals")([rpn_y_pred, rpn_bbox_pred, anchors])
     
@@ -146,7 +146,7 @@ def faster_rcnn(feature, n_class = 21, image_shape = [1024, 1024],
                 scale = [32, 64, 128, 256, 512], ratio = [0.5, 1, 2], octave = 1,
                 rpn_n_feature = 256, rpn_feature_share = True,
                 cls_n_feature = 1024, use_bias = None,
-                proposal_count = 1000, iou_threshold = 0.7, score_threshold = float('-inf'), soft_nms = False, valid_inside_anchor = False, performance_count = 5000,
+                proposal_count = 1000, iou_threshold = 0.7, score_threshold = float('-inf'), soft_nms = False, suppression = "greedy", candidate_count = 500, valid_inside_anchor = False, performance_count = 5000,
                 pool_size = 7, method = "bilinear",
                 mean = [0., 0., 0., 0.], std = [1., 1., 1., 1.], clip_ratio = 16 / 1000, 
                 batch_size = 1,
@@ -166,7 +166,7 @@ def faster_rcnn(feature, n_class = 21, image_shape = [1024, 1024],
                                    convolution = cls_convolution, normalize = cls_normalize, activation = cls_activation)
     return rcnn(feature, neck = neck, rpn_head = _rpn_head, bbox_head = _bbox_head,
                 cascade = False, interleaved = False, mask_info_flow = False,
-                proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, soft_nms = soft_nms, valid_inside_anchor = valid_inside_anchor, performance_count = performance_count,
+                proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, soft_nms = soft_nms, suppression = suppression, candidate_count = candidate_count, valid_inside_anchor = valid_inside_anchor, performance_count = performance_count,
                 rpn_mean = mean, rpn_std = std, rpn_clip_ratio = clip_ratio, batch_size = batch_size,
                 train = train, assign = assign, sampler = sampler, train_proposal_count = train_proposal_count, add_gt_in_sampler = add_gt_in_sampler)
 
@@ -174,7 +174,7 @@ def mask_rcnn(feature, n_class = 21, image_shape = [1024, 1024], interleaved = F
               scale = [32, 64, 128, 256, 512], ratio = [0.5, 1, 2], octave = 1,
               rpn_n_feature = 256, rpn_feature_share = True,
               cls_n_feature = 1024, mask_n_feature = 256, mask_n_depth = 4, mask_scale = 2, use_bias = None,
-              proposal_count = 1000, iou_threshold = 0.7, score_threshold = float('-inf'), soft_nms = False, valid_inside_anchor = False, performance_count = 5000,
+              proposal_count = 1000, iou_threshold = 0.7, score_threshold = float('-inf'), soft_nms = False, suppression = "greedy", candidate_count = 500, valid_inside_anchor = False, performance_count = 5000,
               pool_size = 7, mask_pool_size = 14, method = "bilinear",
               rpn_mean = [0., 0., 0., 0.], rpn_std = [1., 1., 1., 1.], rpn_clip_ratio = 16 / 1000, 
               cls_mean = [0., 0., 0., 0.], cls_std = [0.1, 0.1, 0.2, 0.2], cls_clip_ratio = 16 / 1000,
@@ -199,7 +199,7 @@ def mask_rcnn(feature, n_class = 21, image_shape = [1024, 1024], interleaved = F
                                    convolution = mask_convolution, normalize = mask_normalize, activation = mask_activation)
     return rcnn(feature, neck = neck, rpn_head = _rpn_head, bbox_head = _bbox_head, mask_head = _mask_head,
                 cascade = False, interleaved = interleaved, mask_info_flow = False,
-                proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, soft_nms = soft_nms, valid_inside_anchor = valid_inside_anchor, performance_count = performance_count,
+                proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, soft_nms = soft_nms, suppression = suppression, candidate_count = candidate_count, valid_inside_anchor = valid_inside_anchor, performance_count = performance_count,
                 rpn_mean = rpn_mean, rpn_std = rpn_std, rpn_clip_ratio = rpn_clip_ratio, 
                 cls_mean = cls_mean, cls_std = cls_std, cls_clip_ratio = cls_clip_ratio, 
                 batch_size = batch_size,
@@ -209,7 +209,7 @@ def cascade_rcnn(feature, n_class = 21, image_shape = [1024, 1024], mask = False
                  scale = [32, 64, 128, 256, 512], ratio = [0.5, 1, 2], octave = 1,
                  rpn_n_feature = 256, rpn_feature_share = True,
                  cls_n_feature = 1024, mask_n_feature = 256, mask_n_depth = 4, mask_scale = 2, use_bias = None,
-                 proposal_count = 1000, iou_threshold = 0.7, score_threshold = float('-inf'), soft_nms = False, valid_inside_anchor = False, performance_count = 5000,
+                 proposal_count = 1000, iou_threshold = 0.7, score_threshold = float('-inf'), soft_nms = False, suppression = "greedy", candidate_count = 500, valid_inside_anchor = False, performance_count = 5000,
                  pool_size = 7, mask_pool_size = 14, method = "bilinear",
                  rpn_mean = [0., 0., 0., 0.], rpn_std = [1., 1., 1., 1.], rpn_clip_ratio = 16 / 1000, 
                  cls_mean = [0., 0., 0., 0.], cls_std = [0.1, 0.1, 0.2, 0.2], cls_clip_ratio = 16 / 1000,
@@ -236,7 +236,7 @@ def cascade_rcnn(feature, n_class = 21, image_shape = [1024, 1024], mask = False
                                        convolution = mask_convolution, normalize = mask_normalize, activation = mask_activation)
     return rcnn(feature, neck = neck, rpn_head = _rpn_head, bbox_head = _bbox_head, mask_head = _mask_head,
                 cascade = True, interleaved = interleaved, mask_info_flow = mask_info_flow,
-                proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, soft_nms = soft_nms, valid_inside_anchor = valid_inside_anchor, performance_count = performance_count,
+                proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, soft_nms = soft_nms, suppression = suppression, candidate_count = candidate_count, valid_inside_anchor = valid_inside_anchor, performance_count = performance_count,
                 rpn_mean = rpn_mean, rpn_std = rpn_std, rpn_clip_ratio = rpn_clip_ratio, 
                 cls_mean = cls_mean, cls_std = cls_std, cls_clip_ratio = cls_clip_ratio, 
                 batch_size = batch_size,
@@ -246,7 +246,7 @@ def hybrid_task_cascade_rcnn(feature, n_class = 21, image_shape = [1024, 1024],
                              scale = [32, 64, 128, 256, 512], ratio = [0.5, 1, 2], octave = 1,
                              rpn_n_feature = 256, rpn_feature_share = True,
                              cls_n_feature = 1024, mask_n_feature = 256, mask_n_depth = 4, mask_scale = 2, semantic_level = 1, semantic_n_feature = 256, semantic_n_depth = 4, use_bias = None,
-                             proposal_count = 1000, iou_threshold = 0.7, score_threshold = float('-inf'), soft_nms = False, valid_inside_anchor = False, performance_count = 5000,
+                             proposal_count = 1000, iou_threshold = 0.7, score_threshold = float('-inf'), soft_nms = False, suppression = "greedy", candidate_count = 500, valid_inside_anchor = False, performance_count = 5000,
                              pool_size = 7, mask_pool_size = 14, method = "bilinear",
                              rpn_mean = [0., 0., 0., 0.], rpn_std = [1., 1., 1., 1.], rpn_clip_ratio = 16 / 1000, 
                              cls_mean = [0., 0., 0., 0.], cls_std = [0.1, 0.1, 0.2, 0.2], cls_clip_ratio = 16 / 1000,
@@ -276,7 +276,7 @@ def hybrid_task_cascade_rcnn(feature, n_class = 21, image_shape = [1024, 1024],
         _semantic_head = functools.partial(semantic_head, n_class = n_class, level = semantic_level, n_feature = semantic_n_feature, n_depth = semantic_n_depth, use_bias = use_bias, method = method, logits_activation = semantic_logits_activation, convolution = semantic_convolution, normalize = semantic_normalize, activation = semantic_activation)
     return rcnn(feature, neck = neck, rpn_head = _rpn_head, bbox_head = _bbox_head, mask_head = _mask_head, semantic_head = _semantic_head,
                 cascade = True, interleaved = interleaved, mask_info_flow = mask_info_flow,
-                proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, soft_nms = soft_nms, valid_inside_anchor = valid_inside_anchor, performance_count = performance_count,
+                proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, soft_nms = soft_nms, suppression = suppression, candidate_count = candidate_count, valid_inside_anchor = valid_inside_anchor, performance_count = performance_count,
                 rpn_mean = rpn_mean, rpn_std = rpn_std, rpn_clip_ratio = rpn_clip_ratio, 
                 cls_mean = cls_mean, cls_std = cls_std, cls_clip_ratio = cls_clip_ratio, 
                 batch_size = batch_size,
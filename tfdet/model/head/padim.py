@@ -1,8 +1,6 @@
 import tensorflow as tf
-import cv2
-import numpy as np
 
-from tfdet.core.ops import feature_extract, mahalanobis
+from tfdet.core.ops import feature_extract, mahalanobis, mahalanobis_factor, mahalanobis_batch, gaussian_blur
 
 class FeatureExtractor(tf.keras.layers.Layer):
     def __init__(self, sampling_index = None, memory_reduce = False, **kwargs):
@@ -21,7 +19,11 @@ class FeatureExtractor(tf.keras.layers.Layer):
         return config
         
 class Head(tf.keras.layers.Layer):
-    def __init__(self, mean, cvar_inv = None, image_shape = [224, 224], sigma = 4, metric = mahalanobis, method = "bilinear", batch_size = 1, **kwargs):
+    def __init__(self, mean, cvar_inv = None, image_shape = [224, 224], sigma = 4, metric = mahalanobis, method = "bilinear", batch_size = 1, rank = None, half = False, **kwargs):
+        """
+        metric = mahalanobis > all positions at once by factor of cvar_inv.(rank = None > cholesky(exact), rank = int > low rank + isotropic rest, half > float16 factor)
+        other metric > loop by position with batch_size parallel iterations.
+        """
         super(Head, self).__init__(**kwargs) 
         if isinstance(mean, (tuple, list)):
             mean, cvar_inv = mean
@@ -32,26 +34,34 @@ class Head(tf.keras.layers.Layer):
         self.metric = metric
         self.method = method
         self.batch_size = batch_size
+        self.rank = rank
+        self.half = half
         
         self.kernel = (2 * round(4 * sigma) + 1,) * 2
+        if self.metric is mahalanobis:
+            factor, self.scale = mahalanobis_factor(cvar_inv, rank = self.rank) #by original precision of cvar_inv
+            self.factor = tf.cast(factor, tf.float16 if self.half else tf.float32)
     
     def call(self, inputs):
         b = tf.shape(inputs)[0]
         h, w, c = tf.keras.backend.int_shape(inputs)[1:]
         feature = tf.reshape(inputs, [b, h * w, c])
-        mask = tf.zeros((h * w, b, 1))
-        mask = tf.while_loop(lambda index, mask: index < (h * w),
-                             lambda index, mask: (index + 1, tf.tensor_scatter_nd_update(mask, tf.stack([tf.ones(b, dtype = tf.int32) * index, tf.range(b)], axis = -1), mahalanobis(feature[:, index], self.mean[index], self.cvar_inv[index]))),
-                             (0, mask),
-                             parallel_iterations = self.batch_size)[1]
-        mask = tf.reshape(tf.transpose(mask, [1, 0, 2]), [b, h, w, 1])
+        if self.metric is mahalanobis:
+            mask = tf.reshape(mahalanobis_batch(tf.cast(feature, tf.float32), self.mean, self.factor, self.scale), [b, h, w, 1])
+        else:
+            mask = tf.zeros((h * w, b, 1))
+            mask = tf.while_loop(lambda index, mask: index < (h * w),
+                                 lambda index, mask: (index + 1, tf.tensor_scatter_nd_update(mask, tf.stack([tf.ones(b, dtype = tf.int32) * index, tf.range(b)], axis = -1), tf.reshape(self.metric(feature[:, index], self.mean[index], self.cvar_inv[index]), [b, 1]))),
+                                 (0, mask),
+                                 parallel_iterations = self.batch_size)[1]
+            mask = tf.reshape(tf.transpose(mask, [1, 0, 2]), [b, h, w, 1])
 
         #upsampling
         mask = tf.image.resize(mask, self.image_shape, method = self.method)
         
         #gaussian smoothing
         if 0 < self.sigma:
-            mask = tf.py_function(lambda *args: np.array([cv2.GaussianBlur(m, self.kernel, self.sigma) for m in args[0].numpy()]), inp = [mask], Tout = mask.dtype)
+            mask = gaussian_blur(mask, self.sigma, size = self.kernel[0])
             mask = tf.reshape(mask, [-1, *self.image_shape, 1])
         return tf.expand_dims(tf.reduce_max(mask, axis = (1, 2, 3)), axis = -1), mask
     
@@ -61,12 +71,14 @@ class Head(tf.keras.layers.Layer):
         config["sigma"] = self.sigma
         config["method"] = self.method
         config["batch_size"] = self.batch_size
+        config["rank"] = self.rank
+        config["half"] = self.half
         return config
 
-def padim_head(feature, mean = None, cvar_inv = None, image_shape = [224, 224], sampling_index = None, sigma = 4, metric = mahalanobis, method = "bilinear", memory_reduce = False, batch_size = 1):
+def padim_head(feature, mean = None, cvar_inv = None, image_shape = [224, 224], sampling_index = None, sigma = 4, metric = mahalanobis, method = "bilinear", memory_reduce = False, batch_size = 1, rank = None, half = False):
     feature = FeatureExtractor(sampling_index = sampling_index, memory_reduce = memory_reduce, name = "feature_extractor")(feature)
     if mean is not None:
-        score, mask = Head(mean = mean, cvar_inv = cvar_inv, image_shape = image_shape, sigma = sigma, metric = metric, method = method, batch_size = batch_size, name = "padim")(feature)
+        score, mask = Head(mean = mean, cvar_inv = cvar_inv, image_shape = image_shape, sigma = sigma, metric = metric, method = method, batch_size = batch_size, rank = rank, half = half, name = "padim")(feature)
         return score, mask
     else:
         return feature
\ No newline at end of file
@@ -1,8 +1,6 @@
 import tensorflow as tf
-import cv2
-import numpy as np
 
-from tfdet.core.ops import feature_extract, euclidean_matrix
+from tfdet.core.ops import feature_extract, euclidean_topk, KNNIndex, gaussian_blur
 
 class FeatureExtractor(tf.keras.layers.Layer):
     def __init__(self, sampling_index = None, pool_size = 3, memory_reduce = False, **kwargs):
@@ -23,13 +21,17 @@ class FeatureExtractor(tf.keras.layers.Layer):
         return config
         
 class Head(tf.keras.layers.Layer):
-    def __init__(self, feature_vector, image_shape = [224, 224], k = 9, sigma = 4, method = "bilinear", **kwargs):
+    def __init__(self, feature_vector, image_shape = [224, 224], k = 9, sigma = 4, method = "bilinear", batch_size = 16384, **kwargs):
+        """
+        feature_vector = memory bank(exact search by batch_size chunk of memory bank, batch_size = None > full distance matrix) or KNNIndex(approximate search)
+        """
         super(Head, self).__init__(**kwargs)
         self.feature_vector = feature_vector
         self.image_shape = image_shape
         self.k = k
         self.sigma = sigma
         self.method = method
+        self.batch_size = batch_size
         
         self.kernel = (2 * round(4 * sigma) + 1,) * 2
     
@@ -37,7 +39,10 @@ class Head(tf.keras.layers.Layer):
         b = tf.shape(inputs)[0]
         h, w, c = tf.keras.backend.int_shape(inputs)[1:]
         feature = tf.reshape(inputs, [b * h * w, c])
-        score = tf.sort(euclidean_matrix(feature, self.feature_vector), axis = -1)[..., :self.k]
+        if isinstance(self.feature_vector, KNNIndex):
+            score = self.feature_vector.search(feature, k = self.k)
+        else:
+            score = euclidean_topk(feature, self.feature_vector, k = self.k, batch_size = self.batch_size)
         mask = tf.reshape(score[..., 0], [b, h, w, 1])
         score = tf.reshape(score, [b, h * w, -1])
         #conf = tf.gather_nd(score, tf.stack([tf.range(b), tf.cast(tf.argmax(score[..., 0], axis = -1), tf.int32)], axis = -1))
@@ -52,7 +57,7 @@ class Head(tf.keras.layers.Layer):
         
         #gaussian smoothing
         if 0 < self.sigma:
-            mask = tf.py_function(lambda *args: np.array([cv2.GaussianBlur(m, self.kernel, self.sigma) for m in args[0].numpy()]), inp = [mask], Tout = mask.dtype)
+            mask = gaussian_blur(mask, self.sigma, size = self.kernel[0])
             mask = tf.reshape(mask, [-1, *self.image_shape, 1])
         return score, mask
     
@@ -62,12 +67,13 @@ class Head(tf.keras.layers.Layer):
         config["image_shape"] = self.image_shape
         config["sigma"] = self.sigma
         config["method"] = self.method
+        config["batch_size"] = self.batch_size
         return config
         
-def patch_core_head(feature, feature_vector = None, image_shape = [224, 224], k = 9, sampling_index = None, pool_size = 3, sigma = 4, method = "bilinear", memory_reduce = False):
+def patch_core_head(feature, feature_vector = None, image_shape = [224, 224], k = 9, sampling_index = None, pool_size = 3, sigma = 4, method = "bilinear", memory_reduce = False, batch_size = 16384):
     feature = FeatureExtractor(sampling_index = sampling_index, pool_size = pool_size, memory_reduce = memory_reduce, name = "feature_extractor")(feature)
     if feature_vector is not None:
-        score, mask = Head(feature_vector = feature_vector, image_shape = image_shape, k = k, sigma = sigma, method = method, name = "patch_core")(feature)
+        score, mask = Head(feature_vector = feature_vector, image_shape = image_shape, k = k, sigma = sigma, method = method, batch_size = batch_size, name = "patch_core")(feature)
         return score, mask
     else:
         return feature
\ No newline at end of file
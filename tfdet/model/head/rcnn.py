@@ -208,10 +208,13 @@ class RoiMask(tf.keras.layers.Layer):
         return config
     
 class Rpn2Proposal(FilterDetection):
-    def __init__(self, proposal_count = 1000, iou_threshold = 0.7, score_threshold = float('-inf'), soft_nms = False, valid_inside_anchor = False, performance_count = 5000,
+    def __init__(self, proposal_count = 1000, iou_threshold = 0.7, score_threshold = float('-inf'), soft_nms = False, suppression = "greedy", candidate_count = 500, valid_inside_anchor = False, performance_count = 5000,
                  mean = [0., 0., 0., 0.], std = [1., 1., 1., 1.], clip_ratio = 16 / 1000,
                  batch_size = 1, dtype = tf.float32, **kwargs):
-        super(Rpn2Proposal, self).__init__(proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, soft_nms = soft_nms, valid_inside_anchor = valid_inside_anchor, ignore_label = None, performance_count = performance_count,
+        if suppression == "matrix":
+            #matrix nms drops only by decayed score over score_threshold(-inf for rpn), so it would keep every candidate.
+            raise ValueError("suppression 'matrix' isn't supported for rpn proposal, use 'greedy' or 'fast'")
+        super(Rpn2Proposal, self).__init__(proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, soft_nms = soft_nms, suppression = suppression, candidate_count = candidate_count, valid_inside_anchor = valid_inside_anchor, ignore_label = None, performance_count = performance_count,
                                            mean = mean, std = std, clip_ratio = clip_ratio,
                                            batch_size = batch_size, dtype = dtype, **kwargs)   
 
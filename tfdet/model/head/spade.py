@@ -1,8 +1,6 @@
 import tensorflow as tf
-import cv2
-import numpy as np
 
-from tfdet.core.ops import feature_extract, euclidean, euclidean_matrix
+from tfdet.core.ops import feature_extract, euclidean, euclidean_matrix, gaussian_blur
 
 class FeatureExtractor(tf.keras.layers.Layer):
     def __init__(self, sampling_index = None, **kwargs):
@@ -49,7 +47,7 @@ class Head(tf.keras.layers.Layer):
         
         #gaussian smoothing
         if 0 < self.sigma:
-            mask = tf.py_function(lambda *args: np.array([cv2.GaussianBlur(m, self.kernel, self.sigma) for m in args[0].numpy()]), inp = [mask], Tout = mask.dtype)
+            mask = gaussian_blur(mask, self.sigma, size = self.kernel[0])
             mask = tf.reshape(mask, [-1, *self.image_shape, 1])
         return score, mask
     
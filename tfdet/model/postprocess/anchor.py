@@ -1,11 +1,10 @@
 import tensorflow as tf
 
 from tfdet.core.bbox import delta2bbox
-from tfdet.core.ops import multiclass_nms
-from tfdet.core.util import map_fn
+from tfdet.core.ops import batched_multiclass_nms
 
 class FilterDetection(tf.keras.layers.Layer):
-    def __init__(self, proposal_count = 100, iou_threshold = 0.5, score_threshold = 0.05, soft_nms = False, valid_inside_anchor = False, ignore_label = 0, performance_count = 5000,
+    def __init__(self, proposal_count = 100, iou_threshold = 0.5, score_threshold = 0.05, soft_nms = False, suppression = "greedy", candidate_count = 500, valid_inside_anchor = False, ignore_label = 0, performance_count = 5000,
                  mean = [0., 0., 0., 0.], std = [1., 1., 1., 1.], clip_ratio = 16 / 1000, 
                  batch_size = 1, dtype = tf.float32, 
                  tensorrt = False, **kwargs):
@@ -15,6 +14,8 @@ class FilterDetection(tf.keras.layers.Layer):
         self.iou_threshold = iou_threshold
         self.score_threshold = score_threshold
         self.soft_nms = soft_nms
+        self.suppression = suppression
+        self.candidate_count = candidate_count
         self.valid_inside_anchor = valid_inside_anchor
         self.ignore_label = ignore_label
         self.performance_count = performance_count
@@ -52,9 +53,8 @@ class FilterDetection(tf.keras.layers.Layer):
             y_pred = tf.multiply(y_pred, conf_pred)
         
         if not self.tensorrt:
-            anchors = tf.tile(tf.expand_dims(anchors, axis = 0), [tf.shape(y_pred)[0], 1, 1])
-            out = map_fn(multiclass_nms, y_pred, bbox_pred, anchors, dtype = (self.dtype, self.dtype), batch_size = self.batch_size,
-                         proposal_count = self.proposal_count, soft_nms = self.soft_nms, iou_threshold = self.iou_threshold, score_threshold = self.score_threshold, ignore_label = self.ignore_label, performance_count = self.performance_count,
+            out = batched_multiclass_nms(y_pred, bbox_pred, anchors, batch_size = self.batch_size,
+                         proposal_count = self.proposal_count, soft_nms = self.soft_nms, suppression = self.suppression, candidate_count = self.candidate_count, iou_threshold = self.iou_threshold, score_threshold = self.score_threshold, ignore_label = self.ignore_label, performance_count = self.performance_count,
                          coder_func = delta2bbox, mean = self.mean, std = self.std, clip_ratio = self.clip_ratio)
         else:
             bbox_pred = delta2bbox(anchors, bbox_pred, mean = self.mean, std = self.std, clip_ratio = self.clip_ratio)
@@ -68,6 +68,8 @@ class FilterDetection(tf.keras.layers.Layer):
         config["iou_threshold"] = self.iou_threshold
         config["score_threshold"] = self.score_threshold
         config["soft_nms"] = self.soft_nms
+        config["suppression"] = self.suppression
+        config["candidate_count"] = self.candidate_count
         config["valid_inside_anchor"] = self.valid_inside_anchor
         config["ignore_label"] = self.ignore_label
         config["performance_count"] = self.performance_count
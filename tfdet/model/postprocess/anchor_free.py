@@ -1,11 +1,10 @@
 import tensorflow as tf
 
 from tfdet.core.bbox import offset2bbox
-from tfdet.core.ops import multiclass_nms
-from tfdet.core.util import map_fn
+from tfdet.core.ops import batched_multiclass_nms
 
 class FilterDetection(tf.keras.layers.Layer):
-    def __init__(self, proposal_count = 100, iou_threshold = 0.5, score_threshold = 0.05, soft_nms = False, ignore_label = 0, performance_count = 5000, 
+    def __init__(self, proposal_count = 100, iou_threshold = 0.5, score_threshold = 0.05, soft_nms = False, suppression = "greedy", candidate_count = 500, ignore_label = 0, performance_count = 5000, 
                  batch_size = 1, dtype = tf.float32,
                  tensorrt = False, **kwargs):
         kwargs["dtype"] = dtype
@@ -14,6 +13,8 @@ class FilterDetection(tf.keras.layers.Layer):
         self.iou_threshold = iou_threshold
         self.score_threshold = score_threshold
         self.soft_nms = soft_nms
+        self.suppression = suppression
+        self.candidate_count = candidate_count
         self.ignore_label = ignore_label
         self.performance_count = performance_count
         self.batch_size = batch_size
@@ -35,9 +36,8 @@ class FilterDetection(tf.keras.layers.Layer):
             y_pred = tf.sqrt(y_pred)
             
         if not self.tensorrt:
-            points = tf.tile(tf.expand_dims(points, axis = 0), [tf.shape(y_pred)[0], 1, 1])
-            out = map_fn(multiclass_nms, y_pred, bbox_pred, points, dtype = (self.dtype, self.dtype), batch_size = self.batch_size,
-                         proposal_count = self.proposal_count, soft_nms = self.soft_nms, iou_threshold = self.iou_threshold, score_threshold = self.score_threshold, ignore_label = self.ignore_label, performance_count = self.performance_count, coder_func = offset2bbox)
+            out = batched_multiclass_nms(y_pred, bbox_pred, points, batch_size = self.batch_size,
+                         proposal_count = self.proposal_count, soft_nms = self.soft_nms, suppression = self.suppression, candidate_count = self.candidate_count, iou_threshold = self.iou_threshold, score_threshold = self.score_threshold, ignore_label = self.ignore_label, performance_count = self.performance_count, coder_func = offset2bbox)
         else:
             bbox_pred = offset2bbox(points, bbox_pred)
             bbox_pred = tf.clip_by_value(bbox_pred, 0, 1)
@@ -50,6 +50,8 @@ class FilterDetection(tf.keras.layers.Layer):
         config["iou_threshold"] = self.iou_threshold
         config["score_threshold"] = self.score_threshold
         config["soft_nms"] = self.soft_nms
+        config["suppression"] = self.suppression
+        config["candidate_count"] = self.candidate_count
         config["ignore_label"] = self.ignore_label
         config["performance_count"] = self.performance_count
         config["batch_size"] = self.batch_size
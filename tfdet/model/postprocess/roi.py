@@ -2,11 +2,10 @@ import tensorflow as tf
 import numpy as np
 
 from tfdet.core.bbox import delta2bbox
-from tfdet.core.ops import multiclass_nms
-from tfdet.core.util import map_fn
+from tfdet.core.ops import batched_multiclass_nms
 
 class FilterDetection(tf.keras.layers.Layer):
-    def __init__(self, proposal_count = 100, iou_threshold = 0.5, score_threshold = 0.05, soft_nms = False, ensemble = True, valid_inside_anchor = False, ignore_label = 0, performance_count = 5000,
+    def __init__(self, proposal_count = 100, iou_threshold = 0.5, score_threshold = 0.05, soft_nms = False, suppression = "greedy", candidate_count = 500, ensemble = True, valid_inside_anchor = False, ignore_label = 0, performance_count = 5000,
                  mean = [0., 0., 0., 0.], std = [0.1, 0.1, 0.2, 0.2], clip_ratio = 16 / 1000,
                  batch_size = 1, dtype = tf.float32,
                  tensorrt = False, **kwargs):
@@ -16,6 +15,8 @@ class FilterDetection(tf.keras.layers.Layer):
         self.iou_threshold = iou_threshold
         self.score_threshold = score_threshold
         self.soft_nms = soft_nms
+        self.suppression = suppression
+        self.candidate_count = candidate_count
         self.ensemble = ensemble
         self.valid_inside_anchor = valid_inside_anchor
         self.ignore_label = ignore_label
@@ -62,16 +63,11 @@ class FilterDetection(tf.keras.layers.Layer):
                 y_pred = tf.gather(y_pred, valid_indices, axis = 1)
                 bbox_pred = tf.gather(bbox_pred, valid_indices, axis = 1)
                 proposals = tf.gather(proposals, valid_indices)
-            if not self.tensorrt:
-                proposals = tf.tile(tf.expand_dims(proposals, axis = 0), [tf.shape(y_pred)[0], 1, 1])
                 
-        dtype = (self.dtype, self.dtype)
-        if mask_pred is not None:
-            dtype  = (self.dtype, self.dtype, self.dtype)
         args = [l for l in [y_pred, bbox_pred, proposals, mask_pred] if l is not None]
         if not self.tensorrt:
-            out = map_fn(multiclass_nms, *args, dtype = dtype, batch_size = self.batch_size, 
-                         proposal_count = self.proposal_count, iou_threshold = self.iou_threshold, score_threshold = self.score_threshold, soft_nms = self.soft_nms, ignore_label = self.ignore_label, performance_count = self.performance_count,
+            out = batched_multiclass_nms(*args, batch_size = self.batch_size, 
+                         proposal_count = self.proposal_count, iou_threshold = self.iou_threshold, score_threshold = self.score_threshold, soft_nms = self.soft_nms, suppression = self.suppression, candidate_count = self.candidate_count, ignore_label = self.ignore_label, performance_count = self.performance_count,
                          coder_func = delta2bbox, mean = self.mean, std = std, clip_ratio = self.clip_ratio)
         else:
             raise ValueError("Conversion of rcnn is not yet supported.")
@@ -83,6 +79,8 @@ class FilterDetection(tf.keras.layers.Layer):
         config["iou_threshold"] = self.iou_threshold
         config["score_threshold"] = self.score_threshold
         config["soft_nms"] = self.soft_nms
+        config["suppression"] = self.suppression
+        config["candidate_count"] = self.candidate_count
         config["ensemble"] = self.ensemble
         config["valid_inside_anchor"] = self.valid_inside_anchor
         config["ignore_label"] = self.ignore_label
@@ -9,8 +9,8 @@ def focal_loss(y_true, y_pred, alpha = .25, gamma = 2., weight = None, reduce =
     return focal_binary_cross_entropy(y_true, y_pred, alpha = alpha, gamma = gamma, weight = weight, reduce = reduce)
 
 def train_model(input, y_pred, bbox_pred, points, conf_pred = None,
-                assign = point, sampler = None,
-                proposal_count = 100, iou_threshold = 0.5, score_threshold = 0.05, soft_nms = False, ignore_label = 0, performance_count = 5000,
+                assign = point, sampler = None, batch_assign = None,
+                proposal_count = 100, iou_threshold = 0.5, score_threshold = 0.05, soft_nms = False, suppression = "greedy", candidate_count = 500, ignore_label = 0, performance_count = 5000,
                 class_loss = focal_loss, bbox_loss = iou, conf_loss = binary_cross_entropy,
                 regularize = True, weight_decay = 1e-4,
                 decode_bbox = True, class_weight = None, background = False, 
@@ -35,11 +35,11 @@ def train_model(input, y_pred, bbox_pred, points, conf_pred = None,
     args = [arg for arg in [y_pred, bbox_pred, points, regress_range, conf_pred] if arg is not None]
     out = AnchorFreeLoss(class_loss = class_loss, bbox_loss = bbox_loss, conf_loss = conf_loss,
                          decode_bbox = decode_bbox, weight = class_weight, background = background,
-                         assign = assign, sampler = sampler,
+                         assign = assign, sampler = sampler, batch_assign = batch_assign,
                          batch_size = batch_size,
                          missing_value = missing_value, dtype = tf.float32, name = "anchor_free_loss")([y_true, bbox_true], args)
     args = [arg for arg in [y_pred, bbox_pred, points, conf_pred] if arg is not None]
-    y_pred, bbox_pred = FilterDetection(proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, soft_nms = soft_nms, ignore_label = ignore_label, performance_count = performance_count,
+    y_pred, bbox_pred = FilterDetection(proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, soft_nms = soft_nms, suppression = suppression, candidate_count = candidate_count, ignore_label = ignore_label, performance_count = performance_count,
                                         batch_size = batch_size, dtype = tf.float32, name = "filter_detection")(args)
     model = tf.keras.Model([input, y_true, bbox_true], [y_pred, bbox_pred])
     
@@ -1,8 +1,9 @@
 import functools
+import inspect
 
 import tensorflow as tf
 
-from tfdet.core.assign import max_iou
+from tfdet.core.assign import max_iou, batched_max_iou, get_batch_assign
 from tfdet.core.bbox import bbox2delta, delta2bbox
 from tfdet.core.loss import focal_binary_cross_entropy, smooth_l1, weight_reduce_loss
 from tfdet.core.util import map_fn
@@ -11,7 +12,7 @@ from .util import image_to_level
 class AnchorLoss(tf.keras.layers.Layer):
     def __init__(self, class_loss = focal_binary_cross_entropy, bbox_loss = smooth_l1,
                  decode_bbox = False, valid_inside_anchor = False, weight = None, background = False,
-                 assign = max_iou, sampler = None,
+                 assign = max_iou, sampler = None, batch_assign = None, level_assign = False,
                  mean = [0., 0., 0., 0.], std = [1., 1., 1., 1.], clip_ratio = 16 / 1000,
                  batch_size = 1,
                  missing_value = 0., dtype = tf.float32, **kwargs):
@@ -25,30 +26,41 @@ class AnchorLoss(tf.keras.layers.Layer):
         self.background = background
         self.assign = assign
         self.sampler = sampler
+        self.batch_assign = batch_assign
+        self.level_assign = level_assign
         self.mean = mean
         self.std = std
         self.clip_ratio = clip_ratio
         self.batch_size = batch_size
         self.missing_value = missing_value
+        if self.level_assign and "level_count" not in inspect.signature(self.assign).parameters:
+            raise ValueError("level_assign needs assign with level_count argument(ex. atss)")
         
         target = functools.partial(self.target, assign = self.assign, sampler = self.sampler, decode_bbox = self.decode_bbox, mean = self.mean, std = self.std)
         loss = functools.partial(self.loss, class_loss = self.class_loss, bbox_loss = self.bbox_loss, sampling = self.sampler is not None, weight = self.weight, background = self.background, missing_value = self.missing_value)
         target_eval = functools.partial(self.target, assign = self.assign, sampler = None, decode_bbox = self.decode_bbox, mean = self.mean, std = self.std)
         loss_eval = functools.partial(self.loss, class_loss = self.class_loss, bbox_loss = self.bbox_loss, sampling = False, weight = self.weight, background = self.background, missing_value = self.missing_value)
-        self.target_func = tf.keras.layers.Lambda(lambda args: map_fn(target, *args, dtype = (tf.int8, self.dtype, self.dtype), batch_size = self.batch_size), dtype = self.dtype, name = "target")
+        self.target_func = tf.keras.layers.Lambda(lambda args: map_fn(target, *args[:4], dtype = (tf.int8, self.dtype, self.dtype), batch_size = self.batch_size, level_count = args[4] if self.level_assign else None), dtype = self.dtype, name = "target")
         self.loss_func = tf.keras.layers.Lambda(lambda args: loss(*args), dtype = self.dtype, name = "loss")
-        self.target_eval_func = tf.keras.layers.Lambda(lambda args: map_fn(target_eval, *args, dtype = (tf.int8, self.dtype, self.dtype), batch_size = self.batch_size), dtype = self.dtype, name = "target_eval")
+        self.target_eval_func = tf.keras.layers.Lambda(lambda args: map_fn(target_eval, *args[:4], dtype = (tf.int8, self.dtype, self.dtype), batch_size = self.batch_size, level_count = args[4] if self.level_assign else None), dtype = self.dtype, name = "target_eval")
+        if self.batch_assign is not None and self.batch_assign is not False: #target of padded batch without map_fn by image.(batch_assign = True > batched version of assign)
+            self.batch_assign = get_batch_assign(self.assign, self.batch_assign)
+            if self.sampler is None: #sampler is supported by image only, so train and eval targets stay by image with the same assign.
+                batch_target = functools.partial(self.batch_target, assign = self.batch_assign, decode_bbox = self.decode_bbox, mean = self.mean, std = self.std)
+                self.target_func = tf.keras.layers.Lambda(lambda args: batch_target(*args[:4]), dtype = self.dtype, name = "target")
+                self.target_eval_func = tf.keras.layers.Lambda(lambda args: batch_target(*args[:4]), dtype = self.dtype, name = "target_eval")
         self.loss_eval_func = tf.keras.layers.Lambda(lambda args: loss_eval(*args), dtype = self.dtype, name = "loss_eval")
         
     @staticmethod
     @tf.function
-    def target(y_true, bbox_true, y_pred, anchors, assign = max_iou, sampler = None, decode_bbox = False, mean = [0., 0., 0., 0.], std = [1., 1., 1., 1.]):
+    def target(y_true, bbox_true, y_pred, anchors, assign = max_iou, sampler = None, decode_bbox = False, mean = [0., 0., 0., 0.], std = [1., 1., 1., 1.], level_count = None):
         """
         Args:
             y_true = label #(padded_num_true, 1 or num_class)
             bbox_true = [[x1, y1, x2, y2], ...] #(padded_num_true, 4)
             y_pred = classifier logit #(num_anchors, num_class)
             anchors = [[x1, y1, x2, y2], ...] #(num_anchors, 4)
+            level_count = anchor count of each level #(n_level,), passed to assign that has level_count argument.(ex. atss, only if level_assign)
 
         Returns:
             state = -1 : negative / 0 : neutral / 1 : positive #(num_anchors, 1)
@@ -62,7 +74,10 @@ class AnchorLoss(tf.keras.layers.Layer):
         else:
             y_true = tf.gather(y_true, valid_indices)
 
-        true_indices, positive_indices, negative_indices = assign(y_true, bbox_true, y_pred, anchors)
+        if level_count is not None and "level_count" in inspect.signature(assign).parameters:
+            true_indices, positive_indices, negative_indices = assign(y_true, bbox_true, y_pred, anchors, level_count = level_count)
+        else:
+            true_indices, positive_indices, negative_indices = assign(y_true, bbox_true, y_pred, anchors)
         if sampler is not None:
             true_indices, positive_indices, negative_indices = sampler(true_indices, positive_indices, negative_indices)
 
@@ -87,6 +102,40 @@ class AnchorLoss(tf.keras.layers.Layer):
             _bbox_true = tf.tensor_scatter_nd_update(_bbox_true, _positive_indices, bbox_true)
         return state, _y_true, _bbox_true
     
+    @staticmethod
+    @tf.function
+    def batch_target(y_true, bbox_true, y_pred, anchors, assign = batched_max_iou, decode_bbox = False, mean = [0., 0., 0., 0.], std = [1., 1., 1., 1.]):
+        """
+        Args:
+            y_true = label #(N, padded_num_true, 1 or num_class)
+            bbox_true = [[x1, y1, x2, y2], ...] #(N, padded_num_true, 4)
+            y_pred = classifier logit #(N, num_anchors, num_class)
+            anchors = [[x1, y1, x2, y2], ...] #(num_anchors, 4) or (N, num_anchors, 4)
+
+        Returns:
+            state = -1 : negative / 0 : neutral / 1 : positive #(N, num_anchors, 1)
+            y_true = label #(N, num_anchors, 1 or num_class)
+            bbox_true = [[x1, y1, x2, y2], ...] #(N, num_anchors, 4)
+        """
+        bbox_true = tf.pad(tf.cast(bbox_true, tf.float32), [[0, 0], [0, 1], [0, 0]]) #padded true for the image without true.
+        if tf.keras.backend.int_shape(y_pred)[-1] == 1:
+            y_true = tf.ones_like(bbox_true[..., :1])
+        else:
+            y_true = tf.pad(tf.cast(y_true, tf.float32), [[0, 0], [0, 1], [0, 0]])
+        
+        match, true_indices = assign(y_true, bbox_true, y_pred, anchors)
+        state = tf.expand_dims(tf.cast(match, tf.int8), axis = -1)
+        positive_flag = tf.equal(state, 1)
+        
+        n_class = tf.shape(y_true)[-1]
+        background = tf.cond(tf.equal(n_class, 1), true_fn = lambda: tf.zeros([1], dtype = tf.float32), false_fn = lambda: tf.pad(tf.ones([1], dtype = tf.float32), [[0, n_class - 1]]))
+        _y_true = tf.where(positive_flag, tf.gather(y_true, true_indices, batch_dims = 1), background)
+        bbox_true = tf.gather(bbox_true, true_indices, batch_dims = 1)
+        if not decode_bbox:
+            bbox_true = bbox2delta(bbox_true, anchors, mean = mean, std = std)
+        _bbox_true = tf.where(positive_flag, bbox_true, 0.)
+        return state, _y_true, _bbox_true
+    
     @staticmethod
     @tf.function
     def loss(state_list, y_true_list, bbox_true_list, y_pred_list, bbox_pred_list, class_loss = focal_binary_cross_entropy, bbox_loss = smooth_l1, sampling = False, weight = None, background = False, missing_value = 0.):
@@ -165,16 +214,16 @@ class AnchorLoss(tf.keras.layers.Layer):
             bbox_pred_list = bbox_pred
             anchors_list = anchors
             
+        n_level = [tf.shape(anchor)[0] for anchor in anchors_list]
         concat_y_pred = tf.concat(y_pred_list, axis = -2)
         concat_anchors = tf.tile(tf.expand_dims(tf.concat(anchors_list, axis = 0), axis = 0), [tf.shape(bbox_true)[0], 1, 1])
         if training:
-            state, y_true, bbox_true = self.target_func([y_true, bbox_true, concat_y_pred, concat_anchors])
+            state, y_true, bbox_true = self.target_func([y_true, bbox_true, concat_y_pred, concat_anchors, tf.stack(n_level)])
         else:
-            state, y_true, bbox_true = self.target_eval_func([y_true, bbox_true, concat_y_pred, concat_anchors])
+            state, y_true, bbox_true = self.target_eval_func([y_true, bbox_true, concat_y_pred, concat_anchors, tf.stack(n_level)])
         if self.decode_bbox:
             bbox_pred_list = [delta2bbox(anchors_list[i], bbox_pred_list[i], mean = self.mean, std = self.std, clip_ratio = self.clip_ratio) for i in range(len(anchors_list))]
     
-        n_level = [tf.shape(anchor)[0] for anchor in anchors_list]
         state = image_to_level(state, n_level)
         y_true = image_to_level(y_true, n_level)
         bbox_true = image_to_level(bbox_true, n_level)
@@ -2,7 +2,7 @@ import functools
 
 import tensorflow as tf
 
-from tfdet.core.assign import point
+from tfdet.core.assign import point, batched_point, get_batch_assign
 from tfdet.core.bbox import bbox2offset, offset2bbox, offset2centerness
 from tfdet.core.loss import binary_cross_entropy, focal_binary_cross_entropy, iou, weight_reduce_loss
 from tfdet.core.util import map_fn
@@ -14,7 +14,7 @@ def focal_loss(y_true, y_pred, alpha = .25, gamma = 2., weight = None, reduce =
 class AnchorFreeLoss(tf.keras.layers.Layer):
     def __init__(self, class_loss = focal_loss, bbox_loss = iou, conf_loss = binary_cross_entropy,
                  decode_bbox = True, weight = None, background = False,
-                 assign = point, sampler = None,
+                 assign = point, sampler = None, batch_assign = None,
                  batch_size = 1,
                  missing_value = 0., dtype = tf.float32, **kwargs):
         kwargs["dtype"] = dtype
@@ -27,6 +27,7 @@ class AnchorFreeLoss(tf.keras.layers.Layer):
         self.background = background
         self.assign = assign
         self.sampler = sampler
+        self.batch_assign = batch_assign
         self.batch_size = batch_size
         self.missing_value = missing_value
         
@@ -39,6 +40,12 @@ class AnchorFreeLoss(tf.keras.layers.Layer):
         self.target_func = tf.keras.layers.Lambda(lambda args: map_fn(target, *args, dtype = (conf_dtype if 4 < len(args) and tf.keras.backend.int_shape(args[-1])[-1] == 1 else dtype), batch_size = self.batch_size), dtype = self.dtype, name = "target")
         self.loss_func = tf.keras.layers.Lambda(lambda args: loss(*args), dtype = self.dtype, name = "loss")
         self.target_eval_func = tf.keras.layers.Lambda(lambda args: map_fn(target_eval, *args, dtype = (conf_dtype if 4 < len(args) and tf.keras.backend.int_shape(args[-1])[-1] == 1 else dtype), batch_size = self.batch_size), dtype = self.dtype, name = "target_eval")
+        if self.batch_assign is not None and self.batch_assign is not False: #target of padded batch without map_fn by image.(batch_assign = True > batched version of assign)
+            self.batch_assign = get_batch_assign(self.assign, self.batch_assign)
+            if self.sampler is None: #sampler is supported by image only, so train and eval targets stay by image with the same assign.
+                batch_target = functools.partial(self.batch_target, assign = self.batch_assign, decode_bbox = self.decode_bbox)
+                self.target_func = tf.keras.layers.Lambda(lambda args: batch_target(*args), dtype = self.dtype, name = "target")
+                self.target_eval_func = tf.keras.layers.Lambda(lambda args: batch_target(*args), dtype = self.dtype, name = "target_eval")
         self.loss_eval_func = tf.keras.layers.Lambda(lambda args: loss_eval(*args), dtype = self.dtype, name = "loss_eval")
         
     @staticmethod
@@ -113,6 +120,56 @@ class AnchorFreeLoss(tf.keras.layers.Layer):
         else:
             return state, _y_true, _bbox_true
     
+    @staticmethod
+    @tf.function
+    def batch_target(y_true, bbox_true, y_pred, points, regress_range = None, conf_pred = None, assign = batched_point, decode_bbox = True):
+        """
+        Args:
+            y_true = label #(N, padded_num_true, 1 or num_class)
+            bbox_true = [[x1, y1, x2, y2], ...] #(N, padded_num_true, 4)
+            y_pred = classifier logit #(N, num_points, num_class)
+            points = [[x, y], ...] #(num_points, 2) or (N, num_points, 2)
+            regress_range = [[min_offset_range, max_offet_range], ...] #(num_points, 2) or (N, num_points, 2) (optional)
+            conf_pred = classifier confidence score #(N, num_points, 1) (optional)
+
+        Returns:
+            state = -1 : negative / 0 : neutral / 1 : positive #(N, num_points, 1)
+            y_true = label #(N, num_points, 1 or num_class)
+            bbox_true = [[x1, y1, x2, y2], ...] #(N, num_points, 4)
+            conf_true = confidence score #(N, num_points, 1) (optional)
+        """
+        if regress_range is not None and tf.keras.backend.int_shape(regress_range)[-1] == 1:
+            conf_pred = regress_range
+            regress_range = None
+        
+        bbox_true = tf.pad(tf.cast(bbox_true, tf.float32), [[0, 0], [0, 1], [0, 0]]) #padded true for the image without true.
+        if tf.keras.backend.int_shape(y_pred)[-1] == 1:
+            y_true = tf.ones_like(bbox_true[..., :1])
+        else:
+            y_true = tf.pad(tf.cast(y_true, tf.float32), [[0, 0], [0, 1], [0, 0]])
+        
+        if conf_pred is not None:
+            y_pred = tf.multiply(y_pred, conf_pred)
+            y_pred = tf.sqrt(y_pred)
+        
+        if regress_range is not None:
+            match, true_indices = assign(y_true, bbox_true, y_pred, points, regress_range = regress_range)
+        else:
+            match, true_indices = assign(y_true, bbox_true, y_pred, points)
+        state = tf.expand_dims(tf.cast(match, tf.int8), axis = -1)
+        positive_flag = tf.equal(state, 1)
+        
+        n_class = tf.shape(y_true)[-1]
+        background = tf.cond(tf.equal(n_class, 1), true_fn = lambda: tf.zeros([1], dtype = tf.float32), false_fn = lambda: tf.pad(tf.ones([1], dtype = tf.float32), [[0, n_class - 1]]))
+        _y_true = tf.where(positive_flag, tf.gather(y_true, true_indices, batch_dims = 1), background)
+        bbox_true = tf.gather(bbox_true, true_indices, batch_dims = 1)
+        _bbox_true = tf.where(positive_flag, bbox_true if decode_bbox else bbox2offset(bbox_true, points), 0.)
+        if conf_pred is not None:
+            conf_true = tf.where(positive_flag, offset2centerness(bbox2offset(bbox_true, points)), 0.)
+            return state, _y_true, _bbox_true, conf_true
+        else:
+            return state, _y_true, _bbox_true
+    
     @staticmethod
     @tf.function
     def loss(state_list, y_true_list, bbox_true_list, y_pred_list, bbox_pred_list, conf_true_list = None, conf_pred_list = None, class_loss = focal_loss, bbox_loss = iou, conf_loss = binary_cross_entropy, sampling = False, weight = None, background = False, missing_value = 0.):
@@ -192,7 +249,7 @@ class AnchorFreeLoss(tf.keras.layers.Layer):
     def call(self, inputs, outputs, training = None):
         y_true, bbox_true = inputs
         y_pred, bbox_pred, points = outputs[:3]
-        regress_range = conf = None
+        regress_range = conf_pred = None
         if 3 < len(outputs):
             regress_range = outputs[3]
         if 4 < len(outputs):
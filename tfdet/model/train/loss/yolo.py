@@ -2,7 +2,7 @@ import functools
 
 import tensorflow as tf
 
-from tfdet.core.assign import max_iou
+from tfdet.core.assign import max_iou, batched_max_iou, get_batch_assign
 from tfdet.core.bbox import bbox2yolo, yolo2bbox
 from tfdet.core.loss import binary_cross_entropy, focal_binary_cross_entropy, ciou, weight_reduce_loss
 from tfdet.core.util import map_fn
@@ -14,7 +14,7 @@ def focal_loss(y_true, y_pred, alpha = .25, gamma = 2., weight = None, reduce =
 class YoloLoss(tf.keras.layers.Layer):
     def __init__(self, score_loss = binary_cross_entropy, class_loss = focal_loss, bbox_loss = ciou,
                  decode_bbox = True, valid_inside_anchor = False, weight = None,
-                 assign = max_iou, sampler = None,
+                 assign = max_iou, sampler = None, batch_assign = None,
                  clip_ratio = 16 / 1000,
                  batch_size = 1,
                  missing_value = 0., dtype = tf.float32, **kwargs):
@@ -28,6 +28,7 @@ class YoloLoss(tf.keras.layers.Layer):
         self.weight = weight
         self.assign = assign
         self.sampler = sampler
+        self.batch_assign = batch_assign
         self.clip_ratio = clip_ratio
         self.batch_size = batch_size
         self.missing_value = missing_value
@@ -39,6 +40,12 @@ class YoloLoss(tf.keras.layers.Layer):
         self.target_func = tf.keras.layers.Lambda(lambda args: map_fn(target, *args, dtype = (tf.int8, self.dtype, self.dtype), batch_size = self.batch_size), dtype = self.dtype, name = "target")
         self.loss_func = tf.keras.layers.Lambda(lambda args: loss(*args), dtype = self.dtype, name = "loss")
         self.target_eval_func = tf.keras.layers.Lambda(lambda args: map_fn(target_eval, *args, dtype = (tf.int8, self.dtype, self.dtype), batch_size = self.batch_size), dtype = self.dtype, name = "target_eval")
+        if self.batch_assign is not None and self.batch_assign is not False: #target of padded batch without map_fn by image.(batch_assign = True > batched version of assign)
+            self.batch_assign = get_batch_assign(self.assign, self.batch_assign)
+            if self.sampler is None: #sampler is supported by image only, so train and eval targets stay by image with the same assign.
+                batch_target = functools.partial(self.batch_target, assign = self.batch_assign, decode_bbox = self.decode_bbox)
+                self.target_func = tf.keras.layers.Lambda(lambda args: batch_target(*args), dtype = self.dtype, name = "target")
+                self.target_eval_func = tf.keras.layers.Lambda(lambda args: batch_target(*args), dtype = self.dtype, name = "target_eval")
         self.loss_eval_func = tf.keras.layers.Lambda(lambda args: loss_eval(*args), dtype = self.dtype, name = "loss_eval")
         
     @staticmethod
@@ -89,6 +96,41 @@ class YoloLoss(tf.keras.layers.Layer):
             _bbox_true = tf.tensor_scatter_nd_update(_bbox_true, _positive_indices, bbox_true)
         return state, _y_true, _bbox_true
     
+    @staticmethod
+    @tf.function
+    def batch_target(y_true, bbox_true, score_pred, logit_pred, anchors, assign = batched_max_iou, decode_bbox = True):
+        """
+        Args:
+            y_true = label #(N, padded_num_true, 1 or num_class)
+            bbox_true = [[x1, y1, x2, y2], ...] #(N, padded_num_true, 4)
+            score_pred = classifier confidence score #(N, num_anchors, 1)
+            logit_pred = classifier logit #(N, num_anchors, num_class)
+            anchors = [[x1, y1, x2, y2], ...] #(num_anchors, 4) or (N, num_anchors, 4)
+
+        Returns:
+            state = -1 : negative / 0 : neutral / 1 : positive #(N, num_anchors, 1)
+            y_true = label #(N, num_anchors, 1 or num_class)
+            bbox_true = [[x1, y1, x2, y2], ...] #(N, num_anchors, 4)
+        """
+        bbox_true = tf.pad(tf.cast(bbox_true, tf.float32), [[0, 0], [0, 1], [0, 0]]) #padded true for the image without true.
+        if tf.keras.backend.int_shape(logit_pred)[-1] == 1:
+            y_true = tf.ones_like(bbox_true[..., :1])
+        else:
+            y_true = tf.pad(tf.cast(y_true, tf.float32), [[0, 0], [0, 1], [0, 0]])
+        
+        match, true_indices = assign(y_true, bbox_true, tf.multiply(logit_pred, score_pred), anchors)
+        state = tf.expand_dims(tf.cast(match, tf.int8), axis = -1)
+        positive_flag = tf.equal(state, 1)
+        
+        n_class = tf.shape(y_true)[-1]
+        background = tf.cond(tf.equal(n_class, 1), true_fn = lambda: tf.zeros([1], dtype = tf.float32), false_fn = lambda: tf.pad(tf.ones([1], dtype = tf.float32), [[0, n_class - 1]]))
+        _y_true = tf.where(positive_flag, tf.gather(y_true, true_indices, batch_dims = 1), background)
+        bbox_true = tf.gather(bbox_true, true_indices, batch_dims = 1)
+        if not decode_bbox:
+            bbox_true = bbox2yolo(bbox_true, anchors)
+        _bbox_true = tf.where(positive_flag, bbox_true, 0.)
+        return state, _y_true, _bbox_true
+    
     @staticmethod
     @tf.function
     def loss(state_list, y_true_list, bbox_true_list, conf_pred_list, y_pred_list, bbox_pred_list, score_loss = binary_cross_entropy, class_loss = focal_loss, bbox_loss = ciou, sampling = False, weight = None, missing_value = 0.):
@@ -3,23 +3,128 @@ import numpy as np
 
 from ..head.padim import FeatureExtractor
 
-def decode(fv):
-    w = np.identity(np.shape(fv)[-1]) * 0.01
-    cvar = np.array([np.cov(f, rowvar = False) for f in fv]) + w
-    cvar_inv = np.array([np.linalg.inv(v) for v in cvar])
-    return cvar_inv
+def inverse_covariance(cvar, eps = 0.01):
+    """
+    cvar = covariance by position #(P, C, C)
+    """
+    cvar = cvar + np.identity(np.shape(cvar)[-1], dtype = cvar.dtype) * eps
+    return np.linalg.inv(cvar)
 
-def train(feature):
+def decode(fv, eps = 0.01):
+    """
+    fv = feature by position #(P, N, C)
+    """
+    fv = np.asarray(fv, dtype = np.float64)
+    fv = fv - np.mean(fv, axis = 1, keepdims = True)
+    cvar = np.matmul(np.transpose(fv, [0, 2, 1]), fv) / max(np.shape(fv)[1] - 1, 1)
+    return inverse_covariance(cvar, eps = eps)
+
+class Accumulator:
+    def __init__(self, batch_size = 64, eps = 0.01, dtype = np.float64):
+        """
+        Streaming mean and covariance by position.(Welford with parallel update of batch)
+        Memory is bounded by (P, C, C) + batch_size * (P, C) regardless of the number of train images.
+
+        batch_size = features are buffered until batch_size for update.
+        dtype = accumulation dtype(covariance of batch is calculated by dtype of feature)
+
+        <example>
+        > accumulator = Accumulator()
+        > for x in tr_pipe:
+        >     accumulator.update(model.predict_on_batch(x))
+        > mean, cvar_inv = accumulator.result()
+        """
+        self.batch_size = batch_size
+        self.eps = eps
+        self.dtype = dtype
+        self.count = 0
+        self.mean = self.m2 = None
+        self.buffer = []
+
+    def update(self, feature):
+        """
+        feature = (B, H, W, C) or (B, P, C)
+        """
+        feature = feature.numpy() if tf.is_tensor(feature) else np.asarray(feature)
+        if not np.issubdtype(feature.dtype, np.floating):
+            feature = feature.astype(np.float32)
+        b, c = np.shape(feature)[0], np.shape(feature)[-1]
+        if 0 < b:
+            self.buffer.append(np.reshape(feature, [b, -1, c]))
+            if self.batch_size <= sum([len(f) for f in self.buffer]):
+                self.flush()
+        return self
+
+    def flush(self):
+        if len(self.buffer) == 0:
+            return self
+        feature = np.concatenate(self.buffer, axis = 0) if 1 < len(self.buffer) else self.buffer[0]
+        self.buffer = []
+        b = len(feature)
+        mean = np.mean(feature, axis = 0, dtype = self.dtype)
+        feature = np.transpose(feature - mean.astype(feature.dtype), [1, 0, 2]) #(P, B, C)
+        m2 = np.matmul(np.transpose(feature, [0, 2, 1]), feature).astype(self.dtype)
+        if self.count == 0:
+            self.mean, self.m2 = mean, m2
+        else:
+            count = self.count + b
+            delta = mean - self.mean
+            self.m2 += m2
+            self.m2 += (delta[..., None] * delta[:, None]) * (self.count * b / count)
+            self.mean += delta * (b / count)
+        self.count += b
+        return self
+
+    def covariance(self):
+        self.flush()
+        return self.m2 / max(self.count - 1, 1)
+
+    def result(self):
+        self.flush()
+        if self.count == 0:
+            raise ValueError("no feature is accumulated")
+        return self.mean.astype(np.float32), inverse_covariance(self.covariance(), eps = self.eps).astype(np.float32)
+
+def train(feature, model = None, batch_size = 64, eps = 0.01, dtype = np.float64):
+    """
+    feature = feature(tensor, ndarray or list of feature by image) or iterable of feature batch(ex. pipeline, generator)
+    model = feature extractor #if model is not None, feature is iterable of input batch and features are extracted by batch.
+    batch_size = accumulation size of feature
+
+    <example>
+    > feature_vector = train(model.predict(tr_pipe))
+    > feature_vector = train(tr_pipe, model = model) #streaming with bounded memory
+    > out = tfdet.model.detector.padim(x, feature_vector)
+    """
     if tf.is_tensor(feature):
         b, h, w, c = tf.keras.backend.int_shape(feature)
         feature = tf.reshape(feature, [-1, h * w, c])
         mean = tf.reduce_mean(feature, axis = 0)
-        cvar_inv = tf.py_function(lambda *args: decode(args[0].numpy()), inp = [tf.transpose(feature, [1, 0, 2])], Tout = feature.dtype)
-        cvar_inv = tf.reshape(cvar_inv, [h * w, c, c])
+        centered = tf.transpose(feature - mean, [1, 0, 2]) #(P, N, C)
+        cvar = tf.matmul(centered, centered, transpose_a = True) / tf.cast(tf.maximum(tf.shape(feature)[0] - 1, 1), feature.dtype)
+        cvar = cvar + tf.eye(c, dtype = feature.dtype) * eps
+        cvar_inv = tf.linalg.cholesky_solve(tf.linalg.cholesky(cvar), tf.eye(c, batch_shape = [h * w], dtype = feature.dtype))
+        return mean, cvar_inv
+
+    if isinstance(feature, (tuple, list)): #feature by image(H, W, C) or feature batch(B, H, W, C)
+        feature = np.asarray(feature)
+        if feature.ndim == 5:
+            feature = np.reshape(feature, [-1, *np.shape(feature)[-3:]])
+    
+    accumulator = Accumulator(batch_size = batch_size, eps = eps, dtype = dtype)
+    if isinstance(feature, np.ndarray):
+        for index in range(0, len(feature), max(batch_size, 1)):
+            batch = feature[index:index + max(batch_size, 1)]
+            if model is not None:
+                batch = model.predict_on_batch(batch)
+            accumulator.update(batch)
     else:
-        b, h, w, c = np.shape(feature)
-        feature = np.reshape(feature, [-1, h * w, c])
-        mean = np.mean(feature, axis = 0)
-        cvar_inv = decode(np.transpose(feature, [1, 0, 2]))
-        cvar_inv = np.reshape(cvar_inv, [h * w, c, c])
-    return mean, cvar_inv
\ No newline at end of file
+        for batch in feature:
+            if isinstance(batch, (tuple, list)):
+                batch = batch[0]
+            if model is not None:
+                batch = model.predict_on_batch(batch)
+            if len(np.shape(batch)) != 4:
+                raise ValueError("feature batch should be (B, H, W, C), but got shape {0}".format(tuple(np.shape(batch))))
+            accumulator.update(batch)
+    return accumulator.result()
@@ -1,10 +1,17 @@
 import tensorflow as tf
 import numpy as np
 
-from tfdet.core.ops import core_sampling
+from tfdet.core.ops import core_sampling, KNNIndex
 from ..head.patch_core import FeatureExtractor
 
-def train(feature, n_sample = 0.001, n_feature = "auto", eps = 0.9):
+def train(feature, n_sample = 0.001, n_feature = "auto", eps = 0.9, index = None):
+    """
+    index = None > memory bank(exact search), True or dict of KNNIndex arguments > KNNIndex of memory bank(approximate search)
+    
+    <example>
+    > feature_vector = train(feature, index = {"n_list":"auto", "n_probe":8})
+    > out = tfdet.model.detector.patch_core(x, feature_vector)
+    """
     if tf.is_tensor(feature):
         b, h, w, c = tf.keras.backend.int_shape(feature)
         feature = tf.reshape(feature, [-1, c])
@@ -15,4 +22,6 @@ def train(feature, n_sample = 0.001, n_feature = "auto", eps = 0.9):
         feature = np.reshape(feature, [-1, c])
         feature = core_sampling(feature, n_sample = n_sample, n_feature = n_feature, eps = eps)
         feature = np.reshape(feature, [-1, c])
+    if index is not None and index is not False:
+        feature = KNNIndex(feature.numpy() if tf.is_tensor(feature) else feature, **(index if isinstance(index, dict) else {}))
     return feature
\ No newline at end of file
@@ -17,7 +17,7 @@ def rpn_assign(y_true, bbox_true, y_pred, bbox_pred, positive_threshold = 0.7, n
 
 def train_model(input, rpn_y_pred, rpn_bbox_pred, anchors, cls_y_pred, cls_bbox_pred, proposals, cls_mask_pred = None, semantic_pred = None, train_tag = None,
                 rpn_assign = rpn_assign, rpn_sampler = random_sampler,
-                proposal_count = 100, iou_threshold = 0.5, score_threshold = 0.05, soft_nms = False, ensemble = True, valid_inside_anchor = True, ignore_label = 0, performance_count = 5000,
+                proposal_count = 100, iou_threshold = 0.5, score_threshold = 0.05, soft_nms = False, suppression = "greedy", candidate_count = 500, ensemble = True, valid_inside_anchor = True, ignore_label = 0, performance_count = 5000,
                 rpn_mean = [0., 0., 0., 0.], rpn_std = [1., 1., 1., 1.], rpn_clip_ratio = 16 / 1000, 
                 cls_mean = [0., 0., 0., 0.], cls_std = [0.1, 0.1, 0.2, 0.2], cls_clip_ratio = 16 / 1000,
                 method = "bilinear",
@@ -75,7 +75,7 @@ def train_model(input, rpn_y_pred, rpn_bbox_pred, anchors, cls_y_pred, cls_bbox_
     
     input = [input] + [arg for arg in [y_true, bbox_true, mask_true] if arg is not None]
     args = [arg for arg in [cls_y_pred, cls_bbox_pred, proposals, cls_mask_pred] if arg is not None]
-    out = FilterDetection(proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, soft_nms = soft_nms, ensemble = ensemble, valid_inside_anchor = valid_inside_anchor, ignore_label = ignore_label, performance_count = performance_count,
+    out = FilterDetection(proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, soft_nms = soft_nms, suppression = suppression, candidate_count = candidate_count, ensemble = ensemble, valid_inside_anchor = valid_inside_anchor, ignore_label = ignore_label, performance_count = performance_count,
                            mean = cls_mean, std = cls_std, clip_ratio = cls_clip_ratio,
                            batch_size = batch_size, dtype = tf.float32, name = "filter_detection")(args)
     model = tf.keras.Model(input, list(out))
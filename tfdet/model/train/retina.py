@@ -6,8 +6,8 @@ from .loss import AnchorLoss
 from ..postprocess.anchor import FilterDetection
 
 def train_model(input, y_pred, bbox_pred, anchors,
-                assign = max_iou, sampler = None, valid_inside_anchor = False,
-                proposal_count = 100, iou_threshold = 0.5, score_threshold = 0.05, soft_nms = False, ignore_label = 0, performance_count = 5000,
+                assign = max_iou, sampler = None, batch_assign = None, level_assign = False, valid_inside_anchor = False,
+                proposal_count = 100, iou_threshold = 0.5, score_threshold = 0.05, soft_nms = False, suppression = "greedy", candidate_count = 500, ignore_label = 0, performance_count = 5000,
                 mean = [0., 0., 0., 0.], std = [1., 1., 1., 1.], clip_ratio = 16 / 1000,
                 class_loss = focal_binary_cross_entropy, bbox_loss = smooth_l1,
                 regularize = True, weight_decay = 1e-4, 
@@ -18,11 +18,11 @@ def train_model(input, y_pred, bbox_pred, anchors,
     
     loss_class, loss_bbox = AnchorLoss(class_loss = class_loss, bbox_loss = bbox_loss,
                                        decode_bbox = decode_bbox, valid_inside_anchor = valid_inside_anchor, weight = class_weight, background = background,
-                                       assign = assign, sampler = sampler,
+                                       assign = assign, sampler = sampler, batch_assign = batch_assign, level_assign = level_assign,
                                        mean = mean, std = std, clip_ratio = clip_ratio,
                                        batch_size = batch_size,
                                        missing_value = missing_value, dtype = tf.float32, name = "anchor_loss")([y_true, bbox_true], [y_pred, bbox_pred, anchors])
-    y_pred, bbox_pred = FilterDetection(proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, soft_nms = soft_nms, valid_inside_anchor = valid_inside_anchor, ignore_label = ignore_label, performance_count = performance_count,
+    y_pred, bbox_pred = FilterDetection(proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, soft_nms = soft_nms, suppression = suppression, candidate_count = candidate_count, valid_inside_anchor = valid_inside_anchor, ignore_label = ignore_label, performance_count = performance_count,
                                         mean = mean, std = std, clip_ratio = clip_ratio,
                                         batch_size = batch_size, dtype = tf.float32, name = "filter_detection")([y_pred, bbox_pred, anchors])
     model = tf.keras.Model([input, y_true, bbox_true], [y_pred, bbox_pred])
@@ -9,8 +9,8 @@ def focal_loss(y_true, y_pred, alpha = .25, gamma = 2., weight = None, reduce =
     return focal_binary_cross_entropy(y_true, y_pred, alpha = alpha, gamma = gamma, weight = weight, reduce = reduce)
 
 def train_model(input, score_pred, logit_pred, bbox_pred, anchors,
-                assign = max_iou, sampler = None,
-                proposal_count = 100, iou_threshold = 0.5, score_threshold = 0.05, soft_nms = False, valid_inside_anchor = False, ignore_label = 0, performance_count = 5000,
+                assign = max_iou, sampler = None, batch_assign = None,
+                proposal_count = 100, iou_threshold = 0.5, score_threshold = 0.05, soft_nms = False, suppression = "greedy", candidate_count = 500, valid_inside_anchor = False, ignore_label = 0, performance_count = 5000,
                 clip_ratio = 16 / 1000,
                 score_loss = binary_cross_entropy, class_loss = focal_loss, bbox_loss = ciou,
                 regularize = True, weight_decay = 1e-4, 
@@ -21,11 +21,11 @@ def train_model(input, score_pred, logit_pred, bbox_pred, anchors,
     
     loss_score, loss_class, loss_bbox = YoloLoss(score_loss = score_loss, class_loss = class_loss, bbox_loss = bbox_loss,
                                                  decode_bbox = decode_bbox, valid_inside_anchor = valid_inside_anchor, weight = class_weight,
-                                                 assign = assign, sampler = sampler,
+                                                 assign = assign, sampler = sampler, batch_assign = batch_assign,
                                                  clip_ratio = clip_ratio,
                                                  batch_size = batch_size,
                                                  missing_value = missing_value, dtype = tf.float32, name = "yolo_loss")([y_true, bbox_true], [score_pred, logit_pred, bbox_pred, anchors])
-    y_pred, bbox_pred = FilterDetection(proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, soft_nms = soft_nms, valid_inside_anchor = valid_inside_anchor, ignore_label = ignore_label, performance_count = performance_count,
+    y_pred, bbox_pred = FilterDetection(proposal_count = proposal_count, iou_threshold = iou_threshold, score_threshold = score_threshold, soft_nms = soft_nms, suppression = suppression, candidate_count = candidate_count, valid_inside_anchor = valid_inside_anchor, ignore_label = ignore_label, performance_count = performance_count,
                                         clip_ratio = clip_ratio,
                                         batch_size = batch_size, dtype = tf.float32, name = "filter_detection")([score_pred, logit_pred, bbox_pred, anchors])
     model = tf.keras.Model([input, y_true, bbox_true], [y_pred, bbox_pred])
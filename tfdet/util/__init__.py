@@ -1,2 +1,3 @@
+from .benchmark import benchmark, benchmark_mean_average_precision, benchmark_knn, benchmark_nms, benchmark_atss, benchmark_target, benchmark_determinism
 from .metric import get_threshold
 from .visualize import draw_bbox
\ No newline at end of file
@@ -0,0 +1,289 @@
+import time
+
+import numpy as np
+
+def benchmark(function, *args, repeat = 10, warmup = 1, **kwargs):
+    """
+    Run function(*args, **kwargs) and return (mean elapsed seconds, last result).
+    """
+    result = None
+    for _ in range(warmup):
+        result = function(*args, **kwargs)
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        elapsed.append(time.perf_counter() - start)
+    return float(np.mean(elapsed)), result
+
+def random_detection(n_image = 100, n_class = 80, n_true = 20, n_pred = 100, image_shape = [640, 640], seed = 0):
+    """
+    Random (y_true, bbox_true, y_pred, bbox_pred) pairs, predictions are jittered copies of ground truth.
+    """
+    random = np.random.RandomState(seed)
+    h, w = image_shape[:2]
+    result = []
+    for _ in range(n_image):
+        nt = random.randint(0, n_true + 1)
+        np_ = random.randint(0, n_pred + 1)
+        xy = random.rand(nt, 2) * [w * 0.8, h * 0.8]
+        wh = random.rand(nt, 2) * [w * 0.3, h * 0.3] + 1
+        bbox_true = np.concatenate([xy, xy + wh], axis = -1).astype(np.float32)
+        y_true = random.randint(0, n_class, (nt, 1))
+        index = random.randint(0, max(nt, 1), np_)
+        bbox_pred = (bbox_true[index] if 0 < nt else random.rand(np_, 4) * [w, h, w, h]) + random.randn(np_, 4) * 0.05 * [w, h, w, h]
+        bbox_pred[:, 2:] = np.maximum(bbox_pred[:, 2:], bbox_pred[:, :2] + 1)
+        bbox_pred = np.clip(bbox_pred, 0.1, [w, h, w, h]).astype(np.float32)
+        y_pred = (random.rand(np_, n_class) ** 4 * 0.5).astype(np.float32)
+        if 0 < nt:
+            y_pred[np.arange(np_), y_true[index, 0]] += (random.rand(np_) * 0.5).astype(np.float32)
+        result.append((y_true, bbox_true, y_pred, bbox_pred))
+    return result
+
+def benchmark_mean_average_precision(n_image = 100, n_class = 80, n_true = 20, n_pred = 100, iou_threshold = [0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95], scale_range = [None, 32, 96], repeat = 3, seed = 0):
+    """
+    Compare MeanAveragePrecision.add by loop and by vectorized matching.(evaluate > elapsed seconds of evaluate)
+
+    <example>
+    > tfdet.util.benchmark_mean_average_precision(n_image = 50, n_class = 80)
+    {'loop': 0.59, 'vectorize': 0.026, 'speedup': 22.9, 'evaluate': 0.006, 'equal': True}
+    """
+    from tfdet.core.metric import MeanAveragePrecision
+    data = random_detection(n_image = n_image, n_class = n_class, n_true = n_true, n_pred = n_pred, seed = seed)
+    def run(vectorize):
+        metric = MeanAveragePrecision(iou_threshold = iou_threshold, scale_range = scale_range, vectorize = vectorize)
+        for args in data:
+            metric.add(*args)
+        return metric
+    result = {}
+    for key, vectorize in [("loop", False), ("vectorize", True)]:
+        result[key], result["{0}_metric".format(key)] = benchmark(run, vectorize, repeat = repeat, warmup = 0)
+    loop_metric, vectorize_metric = result.pop("loop_metric"), result.pop("vectorize_metric")
+    result["speedup"] = result["loop"] / max(result["vectorize"], 1e-12)
+    result["evaluate"] = benchmark(vectorize_metric.evaluate, repeat = repeat)[0]
+    result["equal"] = bool(np.array_equal(loop_metric.evaluate(reduce = False), vectorize_metric.evaluate(reduce = False)) and np.array_equal(loop_metric._num_true, vectorize_metric._num_true))
+    return result
+
+def benchmark_knn(n_bank = 100000, n_query = 4096, n_channel = 256, n_cluster = 100, k = 9, batch_size = 16384, repeat = 3, seed = 0, **kwargs):
+    """
+    Compare k nearest distance of PatchCore Head by full matrix, chunked top-k and KNNIndex(kwargs > KNNIndex arguments).
+    
+    <example>
+    > tfdet.util.benchmark_knn(n_bank = 100000, n_query = 4096, n_channel = 256)
+    {'chunk': 5.5, 'index': 0.35, 'index_build': 5.9, 'index_error': 4e-05, 'index_nbytes': 102725876, 'bank_nbytes': 102400000} #full matrix is skipped over 512MB.
+    """
+    import tensorflow as tf
+    from tfdet.core.ops import euclidean_matrix, euclidean_topk, KNNIndex
+    random = np.random.RandomState(seed)
+    center = random.randn(n_cluster, n_channel).astype(np.float32) * 3
+    bank = (center[random.randint(0, n_cluster, n_bank)] + random.randn(n_bank, n_channel)).astype(np.float32)
+    query = (center[random.randint(0, n_cluster, n_query)] + random.randn(n_query, n_channel)).astype(np.float32)
+    result = {}
+    if n_bank * n_query * 4 < 512 * 1024 ** 2:
+        full = tf.function(lambda x: tf.sort(euclidean_matrix(x, bank), axis = -1)[..., :k])
+        result["full"] = benchmark(full, query, repeat = repeat)[0]
+    chunk = tf.function(lambda x: euclidean_topk(x, bank, k = k, batch_size = batch_size))
+    result["chunk"], exact = benchmark(chunk, query, repeat = repeat)
+    start = time.perf_counter()
+    index = KNNIndex(bank, **kwargs)
+    build = time.perf_counter() - start
+    search = tf.function(lambda x: index.search(x, k = k))
+    result["index"], approximate = benchmark(search, query, repeat = repeat)
+    result["index_build"] = build
+    result["index_error"] = float(np.max(np.abs(exact.numpy() - approximate.numpy())))
+    result["index_nbytes"] = index.nbytes
+    result["bank_nbytes"] = bank.nbytes
+    return result
+
+def benchmark_nms(batch_size = [1, 8, 32], n_class = [20, 80, 365], n_anchor = 5000, proposal_count = 100, repeat = 3, seed = 0, **kwargs):
+    """
+    Compare FilterDetection nms by map_fn(multiclass_nms by image, nms by class) and batched_multiclass_nms on CPU.(kwargs > nms arguments)
+    "fast" and "matrix" are elapsed seconds of batched_multiclass_nms by parallel suppression.(not equal to greedy nms)
+
+    <example>
+    > tfdet.util.benchmark_nms(batch_size = [1, 8, 32], n_class = [20, 80, 365])
+    {(1, 20): {'loop': 0.0047, 'batch': 0.0053, 'fast': 0.0064, 'matrix': 0.0066, 'speedup': 0.88, 'equal': True}, ..., (32, 365): {'loop': 2.08, 'batch': 0.81, 'fast': 1.0, 'matrix': 0.96, 'speedup': 2.56, 'equal': True}} #single cpu core
+    """
+    import tensorflow as tf
+    from tfdet.core.ops import multiclass_nms, batched_multiclass_nms
+    from tfdet.core.util import map_fn
+    batch_size = [batch_size] if isinstance(batch_size, int) else batch_size
+    n_class = [n_class] if isinstance(n_class, int) else n_class
+    random = np.random.RandomState(seed)
+    xy = random.rand(n_anchor, 2) * 0.8
+    anchors = np.concatenate([xy, xy + random.rand(n_anchor, 2) * 0.2 + 0.01], axis = -1).astype(np.float32)
+    result = {}
+    for b in batch_size:
+        for c in n_class:
+            y_pred = (1 / (1 + np.exp(-(random.randn(b, n_anchor, c) * 1.5 - 6)))).astype(np.float32) #about 2% of scores are over 0.05
+            bbox_pred = (random.randn(b, n_anchor, 4) * 0.2).astype(np.float32)
+            with tf.device("/cpu:0"):
+                loop = tf.function(lambda y_pred, bbox_pred: map_fn(multiclass_nms, y_pred, bbox_pred, tf.tile(tf.expand_dims(anchors, axis = 0), [tf.shape(y_pred)[0], 1, 1]), dtype = (tf.float32, tf.float32), batch_size = b, proposal_count = proposal_count, **kwargs))
+                batch = tf.function(lambda y_pred, bbox_pred: batched_multiclass_nms(y_pred, bbox_pred, anchors, batch_size = b, proposal_count = proposal_count, **kwargs))
+                r = {}
+                r["loop"], loop_out = benchmark(loop, y_pred, bbox_pred, repeat = repeat)
+                r["batch"], batch_out = benchmark(batch, y_pred, bbox_pred, repeat = repeat)
+                for suppression in ["fast", "matrix"]:
+                    parallel = tf.function(lambda y_pred, bbox_pred: batched_multiclass_nms(y_pred, bbox_pred, anchors, proposal_count = proposal_count, suppression = suppression, **kwargs))
+                    r[suppression] = benchmark(parallel, y_pred, bbox_pred, repeat = repeat)[0]
+            r["speedup"] = r["loop"] / max(r["batch"], 1e-12)
+            r["equal"] = True
+            for y1, b1, y2, b2 in zip(*[o.numpy() for o in [*loop_out, *batch_out]]): #order of same scores and the last bit of decoded bbox(by vectorization) can differ.
+                i1, i2 = np.lexsort(y1.T), np.lexsort(y2.T)
+                r["equal"] = r["equal"] and bool(np.array_equal(y1[i1], y2[i2]) and np.allclose(b1[i1], b2[i2], rtol = 0, atol = 1e-6))
+            result[(b, c)] = r
+    return result
+
+def benchmark_atss(n_anchor = [1000, 10000, 50000], n_true = 20, n_level = 5, k = 9, repeat = 3, seed = 0):
+    """
+    Compare atss assignment by dense sort of all anchors(previous implementation), top-k of all anchors and top-k by level.(level_count)
+    "equal" is the comparison of dense and top-k of all anchors.
+
+    <example>
+    > tfdet.util.benchmark_atss(n_anchor = [1000, 10000, 50000])
+    {1000: {'dense': 0.005, 'topk': 0.0015, 'level': 0.0016, 'speedup': 3.3, 'equal': True}, ..., 50000: {'dense': 0.34, 'topk': 0.011, 'level': 0.014, 'speedup': 29.4, 'equal': True}} #single cpu core
+    """
+    import tensorflow as tf
+    from tfdet.core.assign import atss
+    from tfdet.core.bbox import overlap_bbox, isin
+    from tfdet.core.ops import euclidean_matrix
+    n_anchor = [n_anchor] if isinstance(n_anchor, int) else n_anchor
+    random = np.random.RandomState(seed)
+    
+    @tf.function
+    def dense(bbox_true, bbox_pred, threshold = 0.01):
+        k_ = tf.minimum(k, tf.shape(bbox_pred)[0])
+        overlaps = overlap_bbox(bbox_true, bbox_pred)
+        sort_indices = tf.argsort(euclidean_matrix(bbox_true, bbox_pred), axis = -1)
+        candidate_overlaps = tf.gather(overlaps, sort_indices[..., :k_], batch_dims = -1)
+        candidate_threshold = tf.reduce_mean(candidate_overlaps, axis = -1) + tf.math.reduce_std(candidate_overlaps, axis = -1)
+        candidate_flag = tf.greater_equal(candidate_overlaps, tf.expand_dims(candidate_threshold, axis = -1))
+        candidate_flag = tf.concat([candidate_flag, tf.zeros((tf.shape(bbox_true)[0], tf.shape(bbox_pred)[0] - k_), dtype = tf.bool)], axis = -1)
+        candidate_flag = tf.gather(candidate_flag, tf.argsort(sort_indices, axis = -1), batch_dims = -1)
+        overlaps = tf.transpose(tf.where(tf.logical_and(candidate_flag, isin(bbox_true, bbox_pred, mode = "rect")), overlaps, 0))
+        positive_indices = tf.where(threshold <= tf.reduce_max(overlaps, axis = -1))[:, 0]
+        return tf.argmax(tf.gather(overlaps, positive_indices), axis = -1), positive_indices
+    
+    result = {}
+    for n in n_anchor:
+        level_count = [max(n * 4 ** (n_level - 1 - i) // sum([4 ** j for j in range(n_level)]), 1) for i in range(n_level)] #(P3 > P7) anchor count is about 1/4 of the previous level.
+        level_count[0] += n - sum(level_count)
+        anchors = []
+        for count in level_count:
+            size = 0.05 * 2 ** len(anchors) * (random.rand(count, 2) * 0.5 + 0.75) #jittered scale and ratio(avoid same iou of candidates)
+            xy = random.rand(count, 2) * (1 - size)
+            anchors.append(np.concatenate([xy, xy + size], axis = -1))
+        anchors = np.concatenate(anchors, axis = 0).astype(np.float32)
+        xy = random.rand(n_true, 2) * 0.7
+        bbox_true = np.concatenate([xy, xy + random.rand(n_true, 2) * 0.3 + 0.01], axis = -1).astype(np.float32)
+        y_true = np.zeros([n_true, 1], dtype = np.float32)
+        with tf.device("/cpu:0"):
+            topk = tf.function(lambda bbox_true, bbox_pred: atss(y_true, bbox_true, None, bbox_pred)[:2])
+            level = tf.function(lambda bbox_true, bbox_pred: atss(y_true, bbox_true, None, bbox_pred, level_count = level_count)[:2])
+            r = {}
+            r["dense"], dense_out = benchmark(dense, bbox_true, anchors, repeat = repeat)
+            r["topk"], topk_out = benchmark(topk, bbox_true, anchors, repeat = repeat)
+            r["level"] = benchmark(level, bbox_true, anchors, repeat = repeat)[0]
+        r["speedup"] = r["dense"] / max(r["topk"], 1e-12)
+        r["equal"] = bool(all([np.array_equal(a.numpy(), b.numpy()) for a, b in zip(dense_out, topk_out)]))
+        result[n] = r
+    return result
+
+def benchmark_target(batch_size = [1, 8, 32], n_anchor = [6400, 1600, 400, 100, 25], n_class = 80, n_true = 20, repeat = 3, seed = 0):
+    """
+    Compare AnchorLoss by map_fn(target by image) and by batch_assign(batched_max_iou) with static batch size on CPU.
+    "node" is the node count of graph(with function library).
+
+    <example>
+    > tfdet.util.benchmark_target(batch_size = [1, 8, 32])
+    {1: {'loop': 0.045, 'batch': 0.044, 'loop_node': 1190, 'batch_node': 1108, 'speedup': 1.02, 'equal': True}, ..., 32: {'loop': 1.37, 'batch': 1.38, 'loop_node': 1717, 'batch_node': 1108, 'speedup': 1.0, 'equal': True}} #single cpu core(step time is dominated by loss)
+    """
+    import tensorflow as tf
+    from tfdet.core.assign import batched_max_iou
+    from tfdet.model.train.loss import AnchorLoss
+    batch_size = [batch_size] if isinstance(batch_size, int) else batch_size
+    random = np.random.RandomState(seed)
+    anchors = []
+    for n in n_anchor:
+        xy = random.rand(n, 2) * 0.9
+        anchors.append(np.concatenate([xy, xy + random.rand(n, 2) * 0.1 + 0.01], axis = -1).astype(np.float32))
+    result = {}
+    for b in batch_size:
+        xy = random.rand(b, n_true, 2) * 0.7
+        bbox_true = np.concatenate([xy, xy + random.rand(b, n_true, 2) * 0.3 + 0.01], axis = -1).astype(np.float32)
+        bbox_true[:, random.randint(1, n_true + 1):] = 0 #padded true
+        y_true = random.randint(0, n_class, (b, n_true, 1)).astype(np.float32)
+        y_pred = [random.rand(b, n, n_class).astype(np.float32) for n in n_anchor]
+        bbox_pred = [(random.randn(b, n, 4) * 0.1).astype(np.float32) for n in n_anchor]
+        r = {}
+        with tf.device("/cpu:0"):
+            for key, batch_assign in [("loop", None), ("batch", batched_max_iou)]:
+                layer = AnchorLoss(batch_assign = batch_assign)
+                function = tf.function(lambda y_true, bbox_true, y_pred, bbox_pred: layer([y_true, bbox_true], [y_pred, bbox_pred, anchors], training = True))
+                graph_def = function.get_concrete_function(y_true, bbox_true, y_pred, bbox_pred).graph.as_graph_def()
+                r["{0}_node".format(key)] = len(graph_def.node) + sum([len(f.node_def) for f in graph_def.library.function])
+                r[key], r["{0}_out".format(key)] = benchmark(function, y_true, bbox_true, y_pred, bbox_pred, repeat = repeat)
+        loop_out, batch_out = r.pop("loop_out"), r.pop("batch_out")
+        r["speedup"] = r["loop"] / max(r["batch"], 1e-12)
+        r["equal"] = bool(np.allclose(np.array(tf.nest.flatten(loop_out)), np.array(tf.nest.flatten(batch_out)), rtol = 1e-5))
+        result[b] = {k:r[k] for k in ["loop", "batch", "loop_node", "batch_node", "speedup", "equal"]}
+    return result
+
+def determinism_train_step(level, batch_size = 16, image_shape = [64, 64], n_step = 20, seed = 0, threads = None):
+    """
+    Train a small conv model in a fresh process by determinism level and return (seconds per step, weight checksum).
+    """
+    import tensorflow as tf
+    from tfdet.core.util import set_seed, set_threads
+    if level == "none":
+        set_threads(threads, threads)
+    elif level == "seed":
+        set_seed(seed, inter_op_threads = threads, intra_op_threads = threads)
+    elif level == "determinism":
+        set_seed(seed, determinism = True, inter_op_threads = threads, intra_op_threads = threads)
+    elif level == "single_thread":
+        set_seed(seed, determinism = True, inter_op_threads = 1, intra_op_threads = 1)
+    else:
+        raise ValueError("unknown level '{0}'".format(level))
+    random = np.random.RandomState(0)
+    x = random.rand(batch_size, *image_shape, 3).astype(np.float32)
+    y = random.randint(0, 10, batch_size)
+    model = tf.keras.Sequential([tf.keras.layers.Input([*image_shape, 3]),
+                                 tf.keras.layers.Conv2D(32, 3, padding = "same", activation = "relu"), tf.keras.layers.Dropout(0.1),
+                                 tf.keras.layers.Conv2D(64, 3, strides = 2, padding = "same", activation = "relu"),
+                                 tf.keras.layers.Conv2D(64, 3, strides = 2, padding = "same", activation = "relu"),
+                                 tf.keras.layers.GlobalAveragePooling2D(), tf.keras.layers.Dense(10)])
+    model.compile(tf.keras.optimizers.SGD(1e-2), tf.keras.losses.SparseCategoricalCrossentropy(from_logits = True))
+    model.train_on_batch(x, y)
+    start = time.perf_counter()
+    for _ in range(n_step):
+        model.train_on_batch(x, y)
+    elapsed = (time.perf_counter() - start) / n_step
+    return elapsed, float(sum([np.sum(np.abs(np.array(w), dtype = np.float64)) for w in model.trainable_weights]))
+
+def benchmark_determinism(level = ["none", "seed", "determinism", "single_thread"], batch_size = 16, image_shape = [64, 64], n_step = 20, seed = 0, threads = None):
+    """
+    Throughput cost of each reproducibility level.(each run in a fresh "spawn" process, because thread pools can't be changed after initialization)
+    none > default, seed > set_seed, determinism > set_seed(determinism = True), single_thread > + 1 inter/intra op thread(old set_seed)
+    "reproducible" is whether two runs end with the same weights.
+
+    <example>
+    > tfdet.util.benchmark_determinism()
+    {'none': {'step': 0.070, 'throughput': 229.6, 'relative': 1.0, 'reproducible': False}, 'seed': {..., 'reproducible': True}, 'determinism': {...}, 'single_thread': {...}} #single cpu core(thread count has no effect)
+    """
+    import multiprocessing
+    level = [level] if isinstance(level, str) else level
+    context = multiprocessing.get_context("spawn")
+    result = {}
+    for key in level:
+        out = []
+        for _ in range(2):
+            with context.Pool(1) as pool:
+                out.append(pool.apply(determinism_train_step, (key, batch_size, image_shape, n_step, seed, threads)))
+        step = min([o[0] for o in out])
+        result[key] = {"step":step, "throughput":batch_size / max(step, 1e-12), "reproducible":out[0][1] == out[1][1]}
+    base = result[level[0]]["step"]
+    for key in level:
+        result[key]["relative"] = base / max(result[key]["step"], 1e-12)
+        result[key] = {k:result[key][k] for k in ["step", "throughput", "relative", "reproducible"]}
+    return result